@@ -14,6 +14,20 @@ volatile float motorSpeed = 0.0;
 
 int samplingInterval = 100; // อ่านทุก 100ms
 bool sendSensorData = false;
+bool binaryMode = false;                // "b,1" = binary frames, "b,0" = ASCII text
+bool rawMode = false;                   // "w,1" = every sample, "w,0" = window maxima every shiftStep samples
+uint16_t frameSeq = 0;
+
+// Binary telemetry frame (little endian, packed, 19 bytes), decoded by telemetry.py
+struct __attribute__((packed)) TelemetryFrame {
+    uint8_t sync[2];        // 0xAA 0x55
+    uint16_t seq;
+    uint32_t timestamp;     // millis() when the sample was taken
+    uint8_t direction;
+    float speed;
+    float current;
+    uint16_t crc;           // CRC-16/CCITT-FALSE over seq..current
+};
 
 const int windowSize = 50;              // เก็บข้อมูล 5 วินาที
 const int shiftStep = 10;               // อัพเดททุก 1 วินาที
@@ -86,8 +100,11 @@ void loop() {
         
         loopCount++;
         
-        // Only send data every shiftStep iterations (like in TCPIP code)
-        if (loopCount % shiftStep == 0) {
+        if (rawMode) {
+            // Every sample as taken; the host aggregates for display
+            sendSensorValues(motorSpeed, current);
+        } else if (loopCount % shiftStep == 0) {
+            // Only send data every shiftStep iterations (like in TCPIP code)
             // Calculate max values in window (or average if preferred)
             float maxSpeed = 0.0;
             float maxCurrent = 0.0;
@@ -128,13 +145,50 @@ void processCommand() {
             encoderCount = 0;
             Serial.println("Encoder count reset");
             break;
+        case 'b':
+            binaryMode = (value == 1);
+            frameSeq = 0;
+            Serial.println("Binary telemetry " + String(binaryMode ? "enabled" : "disabled"));
+            break;
+        case 'w':
+            rawMode = (value == 1);
+            Serial.println("Raw telemetry " + String(rawMode ? "enabled" : "disabled"));
+            break;
         default:
             Serial.println("Unknown command");
             break;
     }
 }
 
+uint16_t crc16(const uint8_t *data, size_t length) {
+    uint16_t crc = 0xFFFF;
+    for (size_t i = 0; i < length; i++) {
+        crc ^= (uint16_t)data[i] << 8;
+        for (uint8_t bit = 0; bit < 8; bit++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+        }
+    }
+    return crc;
+}
+
+void sendSensorFrame(float speed, float current) {
+    TelemetryFrame frame;
+    frame.sync[0] = 0xAA;
+    frame.sync[1] = 0x55;
+    frame.seq = frameSeq++;
+    frame.timestamp = millis();
+    frame.direction = motorDirection ? 1 : 0;
+    frame.speed = speed;
+    frame.current = current;
+    frame.crc = crc16((const uint8_t *)&frame.seq, sizeof(frame) - sizeof(frame.sync) - sizeof(frame.crc));
+    Serial.write((const uint8_t *)&frame, sizeof(frame));
+}
+
 void sendSensorValues(float speed, float current) {
+    if (binaryMode) {
+        sendSensorFrame(speed, current);
+        return;
+    }
     Serial.print(motorDirection ? 1 : 0);
     Serial.print(",");
     Serial.print(speed);
@@ -1,34 +1,13 @@
-class PID_Controller:
-    def __init__(self, Kp, Ki, Kd, setpoint):
-        self.Kp = Kp
-        self.Ki = Ki
-        self.Kd = Kd
-        self.setpoint = setpoint
-        self.previous_error = 0
-        self.integral = 0
-
-    def compute(self, process_variable, TIME):
-        # calculate eror
-        error = self.setpoint - process_variable
-
-        # proportional term
-        P_out = self.Kp * error
+from lti_controller import LTIController
 
-        # Integral term
-        self.integral += error * TIME
-        I_out = self.Ki * self.integral
 
-        #Derivative term
-        derivative = (error - self.previous_error)/TIME
-        D_out = self.Kd * derivative
+class PID_Controller(LTIController):
+    """PID controller: LTIController with an unfiltered derivative (Tf = 0)."""
 
-        # compute total output
-        output = P_out + I_out + D_out
-
-        # update previous error
-        self.previous_error = error
-
-        return output
-    
+    __slots__ = ()
 
+    def __init__(self, Kp, Ki, Kd, setpoint):
+        super(PID_Controller, self).__init__(Kp=Kp, Ki=Ki, Kd=Kd, setpoint=setpoint)
 
+    # Same call as before: compute(process_variable[, dt])
+    compute = LTIController.step
@@ -1,29 +1,13 @@
-class PI_Controller:
-    def __init__(self, Kp, Ki, setpoint):
-        self.Kp = Kp
-        self.Ki = Ki
-        self.setpoint = setpoint
-        self.previous_error = 0
-        self.integral = 0
-
-    def compute(self, process_variable, dt):
-        # calculate eror
-        error = self.setpoint - process_variable
-
-        # proportional term
-        P_out = self.Kp * error
+from lti_controller import LTIController
 
-        # Integral term
-        self.integral += error * dt
-        I_out = self.Ki * self.integral
 
-        # compute total output
-        output = P_out + I_out 
+class PI_Controller(LTIController):
+    """Proportional-integral controller: LTIController with Kd = 0."""
 
-        # update previous error
-        self.previous_error = error
-
-        return output
-    
+    __slots__ = ()
 
+    def __init__(self, Kp, Ki, setpoint):
+        super(PI_Controller, self).__init__(Kp=Kp, Ki=Ki, setpoint=setpoint)
 
+    # Same call as before: compute(process_variable[, dt])
+    compute = LTIController.step
@@ -1,24 +1,13 @@
-class P_Controller:
-    def __init__(self, Kp, setpoint):
-        self.Kp = Kp
-        self.setpoint = setpoint
-        self.previous_error = 0
-        self.integral = 0
-
-    def compute(self, process_variable):
-        # calculate eror
-        error = self.setpoint - process_variable
+from lti_controller import LTIController
 
-        # proportional term
-        P_out = self.Kp * error
 
-        # compute total output
-        output = P_out 
+class P_Controller(LTIController):
+    """Proportional controller: LTIController with Ki = Kd = 0."""
 
-        # update previous error
-        self.previous_error = error
-
-        return output
-    
+    __slots__ = ()
 
+    def __init__(self, Kp, setpoint):
+        super(P_Controller, self).__init__(Kp=Kp, setpoint=setpoint)
 
+    # Same call as before: compute(process_variable[, dt])
+    compute = LTIController.step
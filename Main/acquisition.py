@@ -0,0 +1,309 @@
+"""Acquisition and control in a child process.
+
+The child owns the serial port: it reads and parses telemetry, runs the
+controller and writes commands, all outside the GUI process and its GIL.
+Samples are published through a SharedRing; the GUI only copies snapshots
+out of it. Commands and controller settings go to the child over a queue,
+errors and status snapshots come back over another.
+"""
+import multiprocessing
+import threading
+import time
+from queue import Empty
+
+import numpy as np
+import serial
+
+from bounded_queue import BoundedQueue, DROP_OLDEST
+from command_writer import CommandWriter
+from control_loop import ControlLoop, SampleTrigger
+from recorder import to_records
+from serial_reader import SerialReader
+from shared_ring import SharedRing
+from telemetry_worker import TelemetryWorker
+
+RING_CAPACITY = 1 << 18     # Records; minutes of telemetry at the fastest sampling interval
+STATUS_INTERVAL = 0.5       # Seconds between status snapshots sent to the GUI
+
+
+def control_command(controller, calibration, rpm_setpoint, direction, current_speed, dt):
+    """Controller update: measured speed in RPM -> motor command in PWM (0-255).
+
+    current_speed and dt may also be arrays of samples (sample-triggered
+    mode): the controller steps through all of them in one batch and the
+    command for the newest sample is returned.
+    """
+    if np.ndim(current_speed):
+        rpm_correction = controller.step_batch(current_speed, dt)[-1]
+        current_speed = current_speed[-1]
+    else:
+        rpm_correction = controller.step(current_speed, dt)
+
+    # Convert the corrected target speed back to PWM through the calibration (feedforward + correction)
+    control_output = calibration.rpm_to_pwm(rpm_setpoint + rpm_correction, direction)
+
+    # Ensure control output is within valid range for motor speed (0-255)
+    control_output = max(0, min(255, int(control_output)))
+
+    # Safety check: Prevent sending 0 if motor was running (avoid sudden stops)
+    if control_output == 0 and current_speed > 5:
+        control_output = 10  # Minimum safe speed to maintain some movement
+    return control_output
+
+
+class Acquisition:
+    """Serial reader, telemetry worker, controller and command writer, without any GUI.
+
+    Runs in the child process with a SharedRing as `sink`; headless.py runs it
+    in-process with a Recorder instead. Any object with write(records) will do.
+
+    Messages on `commands`:
+        ('command', line, force)                        write a command line
+        ('controller', controller, rpm_setpoint, calibration)   controller is None to disable it
+        ('sample_triggered', enabled)
+        ('stop',)
+    Messages on `events`:
+        ('error', title, message, disconnect)
+        ('status', dict)
+    """
+
+    def __init__(self, port, sink, commands, events, control_rate=20.0, sample_triggered=False,
+                 binary_mode=False, queue_size=1000, queue_policy=DROP_OLDEST):
+        self.port = port
+        self.sink = sink
+        self.commands = commands
+        self.events = events
+        self.keep_receiving = True
+
+        # Controller settings, replaced as a whole by the GUI
+        self.controller = None
+        self.rpm_setpoint = 0
+        self.calibration = None
+        self.control_lock = threading.Lock()
+        self.sample_triggered = sample_triggered
+
+        self.command_pwm = 0
+        self.direction = 0
+        self.latest_speed = None
+        self.last_control_output = 0
+        self.sink_failed = False
+
+        self.serial_reader = SerialReader(port, binary_mode=binary_mode)
+        self.data_queue = BoundedQueue(queue_size, queue_policy)
+        self.telemetry_worker = TelemetryWorker(self.data_queue, self.process_samples, on_text=self.handle_replies)
+        self.command_writer = CommandWriter(port, on_error=self.command_write_failed)
+        self.control_loop = ControlLoop(self.execute_controller, rate_hz=control_rate)
+        self.sample_trigger = SampleTrigger(self.execute_controller_on_samples)
+        self.receive_thread = threading.Thread(target=self.receive_data, name="SerialReader", daemon=True)
+
+    def run(self):
+        """Start the threads and serve the command queue until ('stop',)."""
+        self.command_writer.start()
+        self.telemetry_worker.start()
+        self.control_loop.start()
+        self.receive_thread.start()
+        next_status = 0.0
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= next_status:
+                    self.events.put(('status', self.status()))
+                    next_status = now + STATUS_INTERVAL
+                try:
+                    message = self.commands.get(timeout=max(0.0, next_status - time.monotonic()))
+                except Empty:
+                    continue
+                if message[0] == 'stop':
+                    break
+                self.handle_message(message)
+        finally:
+            self.shutdown()
+
+    def handle_message(self, message):
+        kind = message[0]
+        if kind == 'command':
+            self.send(message[1], message[2])
+        elif kind == 'controller':
+            with self.control_lock:
+                self.controller, self.rpm_setpoint, self.calibration = message[1:]
+            # The next sample only starts the sample clock
+            self.sample_trigger.reset()
+        elif kind == 'sample_triggered':
+            self.sample_trigger.reset()
+            self.sample_triggered = message[1]
+
+    def shutdown(self):
+        """Stop the motor and streaming, flush the writer and release the port."""
+        with self.control_lock:
+            self.controller = None
+        self.control_loop.stop()
+        self.send('s,0', force=True)
+        self.send('a,0')
+        self.command_writer.stop()
+        self.keep_receiving = False
+        self.receive_thread.join(timeout=1.0)
+        self.telemetry_worker.stop()
+        self.port.close()
+        self.events.put(('status', self.status()))
+
+    def send(self, command, force=False):
+        self.command_writer.send(command, force)
+        if command.startswith('s,'):
+            self.command_pwm = int(command[2:])
+        elif command.startswith('d,'):
+            self.direction = int(command[2:])
+        elif command.startswith('b,'):
+            self.serial_reader.set_binary_mode(command == 'b,1')
+
+    def receive_data(self):
+        try:
+            self.serial_reader.run(lambda: self.keep_receiving, self.handle_batch)
+        except Exception as e:
+            if self.keep_receiving:
+                self.events.put(('error', "Communication Error", f"Lost the serial port: {e}", True))
+            self.keep_receiving = False
+
+    def handle_batch(self, batch):
+        self.data_queue.put((batch, time.perf_counter()))
+
+    def process_samples(self, samples):
+        """Telemetry worker thread: publish the samples and, per sample, drive the controller."""
+        if not self.sink_failed:
+            try:
+                self.sink.write(to_records(samples, self.command_pwm))
+            except Exception as e:
+                # Control carries on without the sink; report it once
+                self.sink_failed = True
+                self.events.put(('error', "Recording Error", f"{e}\nSamples are no longer recorded.", False))
+        self.latest_speed = float(samples['speed'][-1])
+        if self.sample_triggered:
+            self.sample_trigger.feed(samples['timestamp'], samples['speed'])
+
+    def handle_replies(self, lines, arrival_time):
+        for line in lines:
+            self.command_writer.on_reply(line, arrival_time)
+
+    def execute_controller(self, dt):
+        """ControlLoop thread (timer mode)."""
+        if not self.sample_triggered and self.latest_speed is not None:
+            self.control(self.latest_speed, dt)
+
+    def execute_controller_on_samples(self, dts, speeds):
+        """Telemetry worker thread (sample-triggered mode)."""
+        if self.sample_triggered:
+            self.control(speeds, dts)
+
+    def control(self, current_speed, dt):
+        with self.control_lock:
+            if self.controller is None:
+                return
+            try:
+                control_output = control_command(self.controller, self.calibration, self.rpm_setpoint,
+                                                 self.direction, current_speed, dt)
+            except Exception as e:
+                self.controller = None
+                self.events.put(('error', "Controller Error",
+                                 f"Controller computation failed: {e}\nController has been disabled.", False))
+                return
+        self.last_control_output = control_output
+        self.send(f"s,{control_output}")
+
+    def command_write_failed(self, error):
+        with self.control_lock:
+            self.controller = None
+        self.events.put(('error', "Communication Error",
+                         f"Failed to send command: {error}\nController has been disabled.", True))
+
+    def status(self):
+        return {
+            'control': self.control_loop.status(),
+            'trigger': self.sample_trigger.status(),
+            'queue': self.data_queue.status(),
+            'commands': self.command_writer.status(),
+            'control_output': self.last_control_output,
+            'speed': self.latest_speed,
+            'samples': self.telemetry_worker.samples,
+            'malformed_lines': self.telemetry_worker.malformed_lines,
+        }
+
+
+def run_acquisition(port_name, ring_name, commands, events, **settings):
+    """Child process entry point."""
+    ring = SharedRing(name=ring_name)
+    try:
+        port = serial.Serial(port_name, 115200, timeout=1)
+    except Exception as e:
+        events.put(('error', "Error", f"Failed to open port: {e}", True))
+        ring.close()
+        return
+    try:
+        Acquisition(port, ring, commands, events, **settings).run()
+    finally:
+        ring.close()
+
+
+class AcquisitionProcess:
+    """The GUI side: starts the child and talks to it.
+
+    Stands in for the serial port object (is_open, close()). read_new()
+    returns the records published since the previous call; records the
+    reader fell more than a ring's length behind on are counted in `lost`.
+    """
+
+    def __init__(self, port_name, capacity=RING_CAPACITY, **settings):
+        context = multiprocessing.get_context('spawn')
+        self.ring = SharedRing(capacity)
+        self.commands = context.Queue()
+        self.events = context.Queue()
+        self.process = context.Process(target=run_acquisition, name="Acquisition", daemon=True,
+                                       args=(port_name, self.ring.name, self.commands, self.events),
+                                       kwargs=settings)
+        self.process.start()
+        self.sequence = 0
+        self.lost = 0
+        self.status = {}
+
+    @property
+    def is_open(self):
+        return self.process.is_alive()
+
+    def send(self, command, force=False):
+        self.commands.put(('command', command, force))
+
+    def configure_controller(self, controller, rpm_setpoint=0, calibration=None):
+        """Hand a copy of the controller to the child; None disables control."""
+        self.commands.put(('controller', controller, rpm_setpoint, calibration))
+
+    def set_sample_triggered(self, enabled):
+        self.commands.put(('sample_triggered', enabled))
+
+    def read_new(self):
+        records, self.sequence, lost = self.ring.read_since(self.sequence)
+        self.lost += lost
+        return records
+
+    def poll_events(self):
+        """Keep the newest status; return the error events that arrived."""
+        errors = []
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except Empty:
+                return errors
+            if event[0] == 'status':
+                self.status = event[1]
+            else:
+                errors.append(event[1:])
+
+    def close(self, timeout=3.0):
+        """Stop the child (it stops the motor and closes the port) and free the ring."""
+        if self.ring is None:
+            return
+        if self.process.is_alive():
+            self.commands.put(('stop',))
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        self.ring.close()
+        self.ring = None
@@ -0,0 +1,215 @@
+"""PID gain autotuning against a plant model.
+
+    python autotune.py --method zn --tau 0.2 --gain 95
+
+Candidates are scored with simulator.simulate() in vectorized chunks spread
+over a ProcessPoolExecutor. Results are cached per plant and search settings,
+so asking again for the same motor is instant.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulator import simulate
+from sysid import load_model
+
+# Plant and test conditions, as accepted by simulator.simulate()
+DEFAULT_PLANT = {
+    'gain': 100.0,              # RPM per PWM step
+    'tau': 0.15,                # Time constant in seconds
+    'deadband': 10,             # PWM below which the motor stands still
+    'delay': 1,                 # Extra measurement delay in control periods
+    'dt': 0.05,                 # Control period in seconds
+    'setpoint': 100,            # Step size in PWM
+    'duration': 5.0,            # Simulated time per candidate
+    'rpm_to_pwm_scale': 0.01,
+}
+METHODS = ('grid', 'random', 'zn')
+DEFAULT_RANGES = {'Kp': (0.0, 3.0), 'Ki': (0.0, 2.0), 'Kd': (0.0, 0.2)}
+CACHE_PATH = 'autotune_cache.json'
+
+
+def cost(metrics, target, overshoot_weight=1.0, unsettled_penalty=100.0):
+    """Lower is better: IAE in target-seconds plus penalties for overshoot and never settling."""
+    value = metrics['iae'] / np.abs(target)
+    value = value + overshoot_weight * metrics['overshoot'] / 100.0
+    value = value + np.where(np.isfinite(metrics['settling_time']), 0.0, unsettled_penalty)
+    return np.where(np.isfinite(value), value, np.inf)
+
+
+def _evaluate_chunk(args):
+    """Score one chunk of candidates (runs in a worker process)."""
+    gains, plant = args
+    result = simulate(gains[:, 0], gains[:, 1], gains[:, 2], **plant)
+    return cost(result.metrics(), result.target)
+
+
+def evaluate(gains, plant, workers=None, chunk_size=2000):
+    """Cost of every row (Kp, Ki, Kd) of gains. Uses a process pool for large batches."""
+    gains = np.atleast_2d(np.asarray(gains, dtype=np.float64))
+    chunks = [(gains[i:i + chunk_size], plant) for i in range(0, len(gains), chunk_size)]
+    if workers == 1 or len(chunks) == 1:
+        return np.concatenate([_evaluate_chunk(chunk) for chunk in chunks])
+    # Spawned, not forked: the GUI calls this from a background thread of a threaded process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return np.concatenate(list(pool.map(_evaluate_chunk, chunks)))
+
+
+def grid_candidates(ranges=DEFAULT_RANGES, points=(30, 20, 10)):
+    axes = [np.linspace(low, high, n) for (low, high), n in zip((ranges['Kp'], ranges['Ki'], ranges['Kd']), points)]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+
+
+def random_candidates(ranges=DEFAULT_RANGES, count=5000, seed=None):
+    rng = np.random.default_rng(seed)
+    low = np.array([ranges['Kp'][0], ranges['Ki'][0], ranges['Kd'][0]])
+    high = np.array([ranges['Kp'][1], ranges['Ki'][1], ranges['Kd'][1]])
+    return low + (high - low) * rng.random((count, 3))
+
+
+def relay_experiment(plant, amplitude=50, steps=400):
+    """Relay feedback test on the plant model: returns (ultimate gain, ultimate period).
+
+    The PWM command switches between setpoint +/- amplitude depending on the
+    sign of the speed error. The resulting limit cycle gives Ku = 4 d / (pi a)
+    and Pu, with d the relay amplitude in controller (RPM) units and a the
+    speed oscillation amplitude. With a calibration table in the plant, the
+    target and d come from the measured PWM -> RPM mapping around the setpoint.
+    """
+    dt = plant['dt']
+    setpoint = plant['setpoint']
+    if plant.get('calibration') is not None:
+        table = plant['calibration']
+        low, target, high = np.interp([setpoint - amplitude, setpoint, setpoint + amplitude],
+                                      table['pwm'], table['rpm'])
+        relay_amplitude = (high - low) / 2.0
+    else:
+        target = setpoint / plant['rpm_to_pwm_scale']
+        relay_amplitude = amplitude / plant['rpm_to_pwm_scale']
+    alpha = 1.0 - np.exp(-dt / plant['tau'])
+
+    state = 0.0
+    history = [0.0] * (int(plant['delay']) + 1)
+    speed = np.empty(steps)
+    for k in range(steps):
+        command = setpoint + (amplitude if target - history[0] > 0 else -amplitude)
+        command = min(max(command, 0), 255)
+        drive = command if command > plant['deadband'] else 0
+        state += (plant['gain'] * drive - state) * alpha
+        speed[k] = state
+        history = history[1:] + [state]
+
+    # Use the second half, after the start-up transient
+    tail = speed[steps // 2:] - target
+    crossings = np.flatnonzero((tail[:-1] < 0) & (tail[1:] >= 0))
+    if len(crossings) < 2:
+        raise ValueError("Relay test did not oscillate")
+    period = float(np.mean(np.diff(crossings))) * dt
+    oscillation = (tail.max() - tail.min()) / 2.0
+    ultimate_gain = 4.0 * relay_amplitude / (np.pi * oscillation)
+    return ultimate_gain, period
+
+
+def ziegler_nichols(ultimate_gain, period):
+    """Classic Ziegler-Nichols PID gains from the ultimate gain and period."""
+    return np.array([0.6 * ultimate_gain, 1.2 * ultimate_gain / period, 0.075 * ultimate_gain * period])
+
+
+def refine(start, plant, iterations=8, population=500, spread=0.5, workers=None, seed=None):
+    """Local search: sample gains around the best so far and shrink the spread.
+
+    Steps are normal with a standard deviation of spread times each starting
+    gain, so the search can also drive a gain to zero (gains stay >= 0).
+    """
+    rng = np.random.default_rng(seed)
+    best = np.asarray(start, dtype=np.float64)
+    scale = np.abs(best) + 1e-3
+    best_cost = evaluate(best[None, :], plant, workers=1)[0]
+    for _ in range(iterations):
+        candidates = np.maximum(0.0, best + rng.normal(0.0, spread, (population, 3)) * scale)
+        costs = evaluate(candidates, plant, workers)
+        index = int(np.argmin(costs))
+        if costs[index] < best_cost:
+            best, best_cost = candidates[index], costs[index]
+        spread *= 0.6
+    return best, best_cost
+
+
+def _cache_key(plant, method, settings):
+    text = json.dumps({'plant': plant, 'method': method, 'settings': settings}, sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _load_cache(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def autotune(plant=None, method='zn', workers=None, cache_path=CACHE_PATH, seed=0, **settings):
+    """Find Kp, Ki, Kd for the plant. Returns a dict with the gains, cost and metrics.
+
+    method: 'grid' (grid search), 'random' (random search) or 'zn' (relay test
+    and Ziegler-Nichols, then local refinement). Results are cached in
+    cache_path by plant parameters, method and settings (None disables caching).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown tuning method: {method}")
+    plant = dict(DEFAULT_PLANT, **(plant or {}))
+
+    key = _cache_key(plant, method, dict(settings, seed=seed))
+    cache = _load_cache(cache_path) if cache_path else {}
+    if key in cache:
+        return dict(cache[key], cached=True)
+
+    if method == 'zn':
+        ultimate_gain, period = relay_experiment(plant)
+        gains, best_cost = refine(ziegler_nichols(ultimate_gain, period), plant, workers=workers, seed=seed,
+                                  **settings)
+    else:
+        ranges = dict(DEFAULT_RANGES, **settings.get('ranges', {}))
+        if method == 'grid':
+            candidates = grid_candidates(ranges, settings.get('points', (30, 20, 10)))
+        else:
+            candidates = random_candidates(ranges, settings.get('count', 5000), seed)
+        costs = evaluate(candidates, plant, workers)
+        index = int(np.argmin(costs))
+        gains, best_cost = candidates[index], costs[index]
+
+    result = simulate(*gains, **plant)
+    metrics = {name: float(value[0]) for name, value in result.metrics().items()}
+    best = {'Kp': float(gains[0]), 'Ki': float(gains[1]), 'Kd': float(gains[2]),
+            'cost': float(best_cost), 'metrics': metrics, 'plant': plant, 'method': method}
+
+    if cache_path:
+        cache = _load_cache(cache_path)
+        cache[key] = best
+        with open(cache_path, 'w') as file:
+            json.dump(cache, file, indent=1)
+    return dict(best, cached=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="PID autotuning against a DC motor model")
+    parser.add_argument('--method', choices=METHODS, default='zn')
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--model', help="identified plant model (.model.json from sysid.py); overrides the plant options")
+    for name, value in DEFAULT_PLANT.items():
+        parser.add_argument('--' + name.replace('_', '-'), type=type(value), default=value)
+    args = parser.parse_args()
+
+    plant = {name: getattr(args, name) for name in DEFAULT_PLANT}
+    if args.model:
+        plant.update(load_model(args.model).plant(args.dt))
+    best = autotune(plant, args.method, workers=args.workers, cache_path=None if args.no_cache else CACHE_PATH)
+    print(f"Kp={best['Kp']:.4g} Ki={best['Ki']:.4g} Kd={best['Kd']:.4g} cost={best['cost']:.4g}"
+          f"{' (cached)' if best['cached'] else ''}")
+    for name, value in best['metrics'].items():
+        print(f"  {name}: {value:.4g}")
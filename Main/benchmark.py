@@ -0,0 +1,349 @@
+"""Benchmarks for the telemetry hot paths, runnable offline (no Arduino, no display).
+
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --tolerance 0.2
+
+Measures parsing throughput of synthetic "dir,speed,current" streams (ASCII
+lines and binary frames), plot buffer and history cost versus history
+length, the per-step cost of the P, PI and PID controllers, matplotlib
+refresh time on an offscreen Agg canvas and the end-to-end latency from a
+telemetry line written to a loop:// port to the speed command the
+Acquisition pipeline writes back. Inputs come from a fixed seed and every
+result is the best (or, for latency, the median) of several repeats.
+
+Results are saved as JSON. With --baseline, every result that is worse
+than the baseline by more than --tolerance is reported and the exit code
+is 1, so a regression shows up before the code reaches the bench.
+"""
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from queue import Queue
+
+import numpy as np
+import serial
+
+from acquisition import Acquisition
+from calibration import Calibration
+from history import MinMaxPyramid
+from P_Controller import P_Controller
+from PI_Cotroller import PI_Controller
+from PID_Controller import PID_Controller
+from ring_buffer import RingBuffer
+from serial_reader import LineSplitter
+from telemetry import FrameDecoder, encode_frames, frames_to_samples, parse_lines
+
+SEED = 1234
+HISTORY_LENGTHS = (100, 1000, 10000, 100000)
+BATCH_SIZE = 10         # Samples per serial read at the default sampling interval
+
+
+def timed(function, number, repeat=7):
+    """Best time per call of function() in seconds over `repeat` runs of `number` calls."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def result(value, unit, better='lower'):
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def telemetry(n):
+    """n synthetic samples: (direction, speed in RPM, current in A) arrays."""
+    rng = np.random.default_rng(SEED)
+    direction = np.zeros(n, dtype=np.uint8)
+    speed = 8000.0 + 50.0 * rng.standard_normal(n)
+    current = 0.4 + 0.02 * rng.standard_normal(n)
+    return direction, speed, current
+
+
+def bench_parse(quick):
+    n = 20000 if quick else 200000
+    direction, speed, current = telemetry(n)
+    lines = [f"{d},{s:.2f},{c:.2f}" for d, s, c in zip(direction, speed, current)]
+    stream = ('\n'.join(lines) + '\n').encode('ascii')
+    frames = encode_frames(np.arange(n), np.arange(n) * 10, direction, speed, current)
+    # One chunk per serial read, as SerialReader hands them over
+    chunk = BATCH_SIZE * len(stream) // n
+    frame_chunk = BATCH_SIZE * len(frames) // n
+
+    def parse_batches():
+        for start in range(0, n, BATCH_SIZE):
+            parse_lines(lines[start:start + BATCH_SIZE], 0.0, 1.0)
+
+    def split_and_parse():
+        splitter = LineSplitter()
+        for start in range(0, len(stream), chunk):
+            parse_lines(splitter.feed(stream[start:start + chunk]), 0.0, 1.0)
+
+    def decode_frames():
+        decoder = FrameDecoder()
+        for start in range(0, len(frames), frame_chunk):
+            frames_to_samples(decoder.feed(frames[start:start + frame_chunk]))
+
+    return {
+        'parse.ascii_lines': result(n / timed(parse_batches, 1, 3), 'samples/s', 'higher'),
+        'parse.ascii_bytes': result(n / timed(split_and_parse, 1, 3), 'samples/s', 'higher'),
+        'parse.binary_frames': result(n / timed(decode_frames, 1, 3), 'samples/s', 'higher'),
+    }
+
+
+def bench_buffers(quick):
+    results = {}
+    _, speed, _ = telemetry(max(HISTORY_LENGTHS))
+    batch = speed[:BATCH_SIZE]
+    number = 200 if quick else 2000
+    for length in HISTORY_LENGTHS:
+        ring = RingBuffer(length)
+        ring.extend(speed[:length])
+        results[f'buffer.ring_extend.{length}'] = result(timed(lambda: ring.extend(batch), number), 's')
+        # The plots copy the window under the data lock
+        results[f'buffer.ring_copy.{length}'] = result(timed(lambda: np.array(ring.view()), number), 's')
+
+        history = MinMaxPyramid()
+        history.extend(speed[:length])
+        results[f'buffer.history_extend.{length}'] = result(timed(lambda: history.extend(batch), number), 's')
+        results[f'buffer.history_query.{length}'] = result(
+            timed(lambda: history.query(0, len(history)), number // 2), 's')
+    return results
+
+
+def bench_controllers(quick):
+    _, speed, _ = telemetry(1000)
+    controllers = {
+        'P': lambda: P_Controller(1.0, 8000.0),
+        'PI': lambda: PI_Controller(1.0, 0.1, 8000.0),
+        'PID': lambda: PID_Controller(1.0, 0.1, 0.05, 8000.0),
+    }
+    dts = np.full(len(speed), 0.01)
+    values = [float(value) for value in speed]
+    results = {}
+    for name, make in controllers.items():
+        controller = make()
+
+        def steps():
+            for value in values:
+                controller.step(value, 0.01)
+
+        batch_controller = make()
+        number = 2 if quick else 20
+        results[f'control.{name}.step'] = result(timed(steps, number) / len(values), 's')
+        results[f'control.{name}.step_batch'] = result(
+            timed(lambda: batch_controller.step_batch(speed, dts), number * 10) / len(speed), 's')
+    return results
+
+
+def bench_render(quick):
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+    except ImportError:
+        return {}
+    from blit_plot import BlitPlot
+
+    # Same figure as one live plot of the GUI at its default size and history length
+    length = 100
+    figure = Figure(figsize=(6.4, 3.2), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    plot = BlitPlot(canvas, ax, np.arange(length), "Motor Speed")
+    _, speed, _ = telemetry(length + 1000)
+    plot.update(speed[:length])
+    canvas.draw()
+
+    offsets = iter(range(10 ** 9))
+
+    def blit_update():
+        start = next(offsets) % 1000
+        plot.update(speed[start:start + length])
+
+    number = 20 if quick else 200
+    return {
+        'render.full_draw': result(timed(canvas.draw, max(number // 10, 2)), 's'),
+        'render.blit_update': result(timed(blit_update, number), 's'),
+    }
+
+
+class StampedPort:
+    """Serial port wrapper that timestamps every speed command written through it."""
+
+    def __init__(self, port):
+        self._port = port
+        self.command_written = threading.Event()
+        self.command_time = None
+
+    def __getattr__(self, name):
+        return getattr(self._port, name)
+
+    def __setattr__(self, name, value):
+        if name == 'timeout':
+            self._port.timeout = value
+        else:
+            super(StampedPort, self).__setattr__(name, value)
+
+    def write(self, data):
+        written = self._port.write(data)
+        if data.startswith(b's,'):
+            self.command_time = time.perf_counter()
+            self.command_written.set()
+        return written
+
+
+class NullSink:
+    def write(self, records):
+        pass
+
+
+def bench_latency(quick):
+    """Telemetry line written -> speed command written, through the real Acquisition threads.
+
+    loop:// echoes whatever is written, so the Acquisition reads its own
+    commands back as malformed lines, which costs a little extra parsing
+    (as firmware replies would).
+    """
+    port = StampedPort(serial.serial_for_url('loop://', timeout=1))
+    commands, events = Queue(), Queue()
+    acquisition = Acquisition(port, NullSink(), commands, events, sample_triggered=True)
+    calibration = Calibration.linear(0.01)
+    rpm_setpoint = calibration.pwm_to_rpm(100)
+    acquisition.handle_message(('controller', P_Controller(1.0, rpm_setpoint), rpm_setpoint, calibration))
+    thread = threading.Thread(target=acquisition.run, name="Acquisition", daemon=True)
+    thread.start()
+
+    n = 100 if quick else 1000
+    latencies = []
+    missed = 0
+    try:
+        # The first sample only starts the sample clock
+        port.write(b"0,10000.00,0.40\n")
+        time.sleep(0.05)
+        for i in range(n):
+            # Alternating speeds, so every sample changes the command (110 / 90 PWM)
+            speed = rpm_setpoint - 1000.0 if i % 2 == 0 else rpm_setpoint + 1000.0
+            port.command_written.clear()
+            start = time.perf_counter()
+            port.write(f"0,{speed:.2f},0.40\n".encode('ascii'))
+            if port.command_written.wait(1.0):
+                latencies.append(port.command_time - start)
+            else:
+                missed += 1
+    finally:
+        commands.put(('stop',))
+        thread.join(3.0)
+
+    if not latencies:
+        return {'latency.missed': result(missed, 'commands')}
+    latencies = np.array(latencies)
+    return {
+        'latency.median': result(float(np.median(latencies)), 's'),
+        'latency.p99': result(float(np.percentile(latencies, 99)), 's'),
+        'latency.missed': result(missed, 'commands'),
+    }
+
+
+BENCHMARKS = {
+    'parse': bench_parse,
+    'buffer': bench_buffers,
+    'control': bench_controllers,
+    'render': bench_render,
+    'latency': bench_latency,
+}
+
+
+def run(only=None, quick=False):
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        start = time.perf_counter()
+        measured = bench(quick)
+        if not measured:
+            print(f"{name}: skipped (matplotlib is not installed)" if name == 'render' else f"{name}: skipped")
+        for key, entry in measured.items():
+            print(f"{key:<36} {format_value(entry)}")
+        results.update(measured)
+        print(f"{name}: {time.perf_counter() - start:.1f} s", flush=True)
+    return results
+
+
+def format_value(entry):
+    value, unit = entry['value'], entry['unit']
+    if unit == 's':
+        return f"{value * 1e6:12.3f} us" if value < 1e-3 else f"{value * 1e3:12.3f} ms"
+    return f"{value:12.1f} {unit}" if isinstance(value, float) else f"{value:12d} {unit}"
+
+
+def metadata(quick):
+    try:
+        import matplotlib
+        matplotlib_version = matplotlib.__version__
+    except ImportError:
+        matplotlib_version = None
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pyserial': serial.__version__,
+        'matplotlib': matplotlib_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'seed': SEED,
+        'quick': quick,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every result worse than the baseline by more than tolerance (a fraction)."""
+    regressions = []
+    for key, entry in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        value, base = entry['value'], reference['value']
+        if entry['better'] == 'higher':
+            worse = base > 0 and value < base * (1 - tolerance)
+        else:
+            worse = value > base * (1 + tolerance)
+        if worse:
+            change = (value - base) / base * 100 if base else float('inf')
+            regressions.append(f"{key}: {format_value(entry).strip()} vs baseline "
+                               f"{format_value(reference).strip()} ({change:+.0f}%)")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the DC motor control hot paths")
+    parser.add_argument('--output', help="save the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON file of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown relative to the baseline (0.2 = 20%%)")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument('--quick', action='store_true', help="fewer iterations (less stable numbers)")
+    args = parser.parse_args()
+
+    results = run(args.only, args.quick)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': metadata(args.quick), 'results': results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if baseline['metadata'].get('machine') != platform.machine():
+            print("Note: the baseline was recorded on a different machine type")
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
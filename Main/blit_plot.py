@@ -0,0 +1,143 @@
+import numpy as np
+
+
+class BlitPlot:
+    """One line on a matplotlib axes, redrawn by blitting over a cached background.
+
+    The full figure (axes, ticks, legend) is drawn only when the canvas needs it:
+    first show, resize, or when new data leaves the current y-limits. Every
+    other update restores the cached background and redraws just the line,
+    which is a small fraction of a full draw_idle().
+    """
+
+    def __init__(self, canvas, ax, x, label, color=None, margin=0.1):
+        self.canvas = canvas
+        self.ax = ax
+        self.margin = margin
+        self.background = None
+
+        self.line, = ax.plot(x, np.zeros(len(x)), label=label, color=color, animated=True)
+        ax.legend(loc='upper left', fontsize='x-small')
+        ax.set_xlim(x[0], x[-1])
+        self.reset_limits()
+
+        # Any full redraw (first show, resize, rescale) refreshes the cached background
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def reset_limits(self, low=0.0, high=1.0):
+        self.ax.set_ylim(low, high)
+        self.background = None
+        self.canvas.draw_idle()
+
+    def update(self, y):
+        """Show new y data; rescales (full redraw) only if it leaves the y-limits."""
+        self.line.set_ydata(y)
+
+        low, high = self.ax.get_ylim()
+        y_min, y_max = float(np.min(y)), float(np.max(y))
+        if y_min < low or y_max > high:
+            low, high = min(low, y_min), max(high, y_max)
+            pad = self.margin * (high - low or 1.0)
+            self.ax.set_ylim(low - pad if y_min < low else low, high + pad if y_max > high else high)
+            self.background = None
+
+        if self.background is None or not self.canvas.supports_blit:
+            # Full redraw; _on_draw recaches the background and draws the line
+            self.canvas.draw_idle()
+            return
+
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.ax.bbox)
+
+
+class HistoryPlot:
+    """Zoomable view of a whole run, drawn from a MinMaxPyramid on the axes of a BlitPlot.
+
+    While shown, the live line is hidden. The mouse wheel zooms around the
+    cursor and dragging with the left button pans. Every change of the x-limits
+    re-queries the pyramid, so each frame draws at most about max_points points
+    however long the run is.
+    """
+
+    def __init__(self, live_plot, history, lock, max_points=2000, zoom_step=1.25):
+        self.live_plot = live_plot
+        self.canvas = live_plot.canvas
+        self.ax = live_plot.ax
+        self.history = history
+        self.lock = lock
+        self.max_points = max_points
+        self.zoom_step = zoom_step
+        self.active = False
+        self._pan_start = None
+
+        self.line, = self.ax.plot([], [], color=live_plot.line.get_color(), visible=False)
+        self.ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+        self.canvas.mpl_connect('scroll_event', self._on_scroll)
+        self.canvas.mpl_connect('button_press_event', self._on_press)
+        self.canvas.mpl_connect('motion_notify_event', self._on_motion)
+        self.canvas.mpl_connect('button_release_event', self._on_release)
+
+    def show(self):
+        """Switch the axes from the live window to the full run."""
+        self.active = True
+        self._live_xlim = self.ax.get_xlim()
+        self.live_plot.line.set_visible(False)
+        self.line.set_visible(True)
+        self.show_all()
+
+    def hide(self):
+        """Return the axes to the live window."""
+        self.active = False
+        self.line.set_visible(False)
+        self.live_plot.line.set_visible(True)
+        self.ax.set_xlim(*self._live_xlim)
+        self.live_plot.reset_limits()
+
+    def show_all(self):
+        with self.lock:
+            length = len(self.history)
+        self.ax.set_xlim(0, max(length, 1))
+
+    def refresh(self):
+        """Re-query the pyramid for the visible range and redraw."""
+        if not self.active:
+            return
+        start, stop = self.ax.get_xlim()
+        with self.lock:
+            x, y = self.history.query(start, stop, self.max_points)
+        self.line.set_data(x, y)
+        if len(y):
+            low, high = float(y.min()), float(y.max())
+            pad = 0.05 * (high - low or 1.0)
+            self.ax.set_ylim(low - pad, high + pad)
+        self.canvas.draw_idle()
+
+    def _on_xlim_changed(self, ax):
+        self.refresh()
+
+    def _on_scroll(self, event):
+        if not self.active or event.inaxes is not self.ax:
+            return
+        start, stop = self.ax.get_xlim()
+        scale = 1 / self.zoom_step if event.button == 'up' else self.zoom_step
+        center = event.xdata
+        self.ax.set_xlim(center - (center - start) * scale, center + (stop - center) * scale)
+
+    def _on_press(self, event):
+        if self.active and event.inaxes is self.ax and event.button == 1:
+            self._pan_start = (event.x, self.ax.get_xlim())
+
+    def _on_motion(self, event):
+        if self._pan_start is None:
+            return
+        press_x, (start, stop) = self._pan_start
+        shift = (press_x - event.x) * (stop - start) / self.ax.bbox.width
+        self.ax.set_xlim(start + shift, stop + shift)
+
+    def _on_release(self, event):
+        self._pan_start = None
@@ -0,0 +1,78 @@
+from queue import Queue, Full
+
+DROP_OLDEST = 'drop-oldest'
+DROP_NEWEST = 'drop-newest'
+BLOCK = 'block'
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class BoundedQueue(Queue):
+    """Queue with a fixed capacity and a policy for what happens when it is full.
+
+    drop-oldest  discard the oldest item to make room (freshest data wins)
+    drop-newest  discard the item being put (keeps what is already queued)
+    block        wait up to block_timeout seconds for room, then drop the new item
+
+    put() never raises Full and never blocks longer than block_timeout, so a
+    producer such as the serial reader cannot stall or grow memory without bound.
+    """
+
+    def __init__(self, maxsize=1000, policy=DROP_OLDEST, block_timeout=0.5):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        super(BoundedQueue, self).__init__(maxsize)
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        # Counters
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.high_water = 0
+
+    @property
+    def dropped(self):
+        return self.dropped_oldest + self.dropped_newest
+
+    def put(self, item, block=True, timeout=None):
+        if self.policy == BLOCK:
+            try:
+                super(BoundedQueue, self).put(item, True, self.block_timeout)
+            except Full:
+                with self.mutex:
+                    self.dropped_newest += 1
+                return
+            with self.mutex:
+                self.high_water = max(self.high_water, self._qsize())
+            return
+
+        with self.mutex:
+            if self._qsize() >= self.maxsize:
+                if self.policy == DROP_NEWEST:
+                    self.dropped_newest += 1
+                    return
+                self._get()
+                self.dropped_oldest += 1
+                # The discarded item will never see task_done()
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.high_water = max(self.high_water, self._qsize())
+            self.not_empty.notify()
+
+    def put_wait(self, item, timeout=None):
+        """Wait for room whatever the policy (for producers that must not lose data,
+        such as a replay running faster than real time). Raises Full on timeout."""
+        super(BoundedQueue, self).put(item, True, timeout)
+
+    def status(self):
+        with self.mutex:
+            return {
+                'depth': self._qsize(),
+                'maxsize': self.maxsize,
+                'policy': self.policy,
+                'high_water': self.high_water,
+                'dropped_oldest': self.dropped_oldest,
+                'dropped_newest': self.dropped_newest,
+            }
@@ -0,0 +1,184 @@
+"""Measured PWM <-> RPM calibration of the motor.
+
+A CalibrationSweep steps the motor through PWM 0-255 in both directions and
+measures the steady-state speed and current at each step. The result is a
+Calibration: one monotone table per direction, mapped both ways with
+np.interp. Calibration.linear() reproduces the old constant scale, so an
+uncalibrated motor behaves exactly as before.
+"""
+import json
+import threading
+
+import numpy as np
+
+CALIBRATION_PATH = 'calibration.json'
+
+
+class Calibration:
+    """PWM <-> RPM lookup tables per motor direction (0 = d,0 and 1 = d,1).
+
+    The measured speeds are made monotone (non-decreasing in PWM), so the
+    inverse mapping is well defined: the deadband maps to its upper edge and
+    0 RPM maps to PWM 0.
+    """
+
+    def __init__(self, pwm, rpm, current=None, source='sweep'):
+        self.pwm = np.asarray(pwm, dtype=np.float64)
+        self.rpm = {int(direction): np.asarray(values, dtype=np.float64) for direction, values in rpm.items()}
+        self.current = {int(direction): np.asarray(values, dtype=np.float64)
+                        for direction, values in (current or {}).items()}
+        self.source = source
+
+        self._forward = {}
+        self._inverse = {}
+        for direction, values in self.rpm.items():
+            monotone = np.maximum.accumulate(np.maximum(values, 0.0))
+            self._forward[direction] = monotone
+            # Keep the last PWM of every flat stretch so the inverse is strictly increasing
+            keep = np.concatenate((np.diff(monotone) > 0, [True]))
+            self._inverse[direction] = (monotone[keep], self.pwm[keep])
+
+    @classmethod
+    def linear(cls, scale=0.01):
+        """The uncalibrated mapping: PWM = RPM * scale in both directions."""
+        pwm = np.arange(256, dtype=np.float64)
+        return cls(pwm, {0: pwm / scale, 1: pwm / scale}, source='linear')
+
+    def _direction(self, direction):
+        return direction if direction in self.rpm else next(iter(self.rpm))
+
+    def pwm_to_rpm(self, pwm, direction=0):
+        """Steady-state speed in RPM for the PWM command(s)."""
+        result = np.interp(pwm, self.pwm, self._forward[self._direction(direction)])
+        return float(result) if np.ndim(result) == 0 else result
+
+    def rpm_to_pwm(self, rpm, direction=0):
+        """PWM command(s) (0-255, not rounded) that give the speed(s) in RPM."""
+        speeds, commands = self._inverse[self._direction(direction)]
+        result = np.where(np.asarray(rpm) > 0, np.interp(rpm, speeds, commands), 0.0)
+        return float(result) if result.ndim == 0 else result
+
+    def table(self, direction=0):
+        """The PWM -> RPM table of one direction as plain lists (e.g. for simulator.simulate())."""
+        return {'pwm': self.pwm.tolist(), 'rpm': self._forward[self._direction(direction)].tolist()}
+
+    def to_dict(self):
+        return {
+            'source': self.source,
+            'pwm': self.pwm.tolist(),
+            'rpm': {str(direction): values.tolist() for direction, values in self.rpm.items()},
+            'current': {str(direction): values.tolist() for direction, values in self.current.items()},
+        }
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+
+def load_calibration(path):
+    with open(path) as file:
+        data = json.load(file)
+    return Calibration(data['pwm'], data['rpm'], data.get('current'), data.get('source', 'sweep'))
+
+
+class CalibrationSweep:
+    """Measures a Calibration on the running motor, on its own thread.
+
+    send(command) writes one command line to the Arduino; the telemetry
+    pipeline passes every parsed sample batch to feed(). For each direction
+    the motor is stopped, the direction set, and the PWM stepped up through
+    pwm_values. After settle_time seconds at a step, the median speed and
+    current over measure_time seconds are taken. Before each direction the
+    motor stands still for stop_time seconds, long enough for the firmware's
+    max window (50 samples) to forget the previous run; going up in PWM the
+    window maximum is the newest value, so the steps themselves can be short.
+    on_done(calibration, error) is called from the sweep thread at the end
+    (calibration is None if it failed or was stopped).
+    """
+
+    def __init__(self, send, on_done, pwm_values=None, directions=(0, 1), settle_time=1.5, measure_time=1.5,
+                 stop_time=6.0):
+        self.send = send
+        self.on_done = on_done
+        self.pwm_values = np.arange(0, 256, 5) if pwm_values is None else np.asarray(pwm_values)
+        self.directions = directions
+        self.settle_time = settle_time
+        self.measure_time = measure_time
+        self.stop_time = stop_time
+        self.steps_done = 0
+        self.finished = False
+        self._collected = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def progress(self):
+        return self.steps_done / (len(self.pwm_values) * len(self.directions))
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="CalibrationSweep", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def feed(self, samples):
+        """Telemetry thread: collect samples while a step is being measured."""
+        with self._lock:
+            if self._collected is not None:
+                self._collected.append(samples)
+
+    def _measure(self):
+        """Steady-state (speed, current) medians after settling, or None if stopped."""
+        if self._stop_event.wait(self.settle_time):
+            return None
+        with self._lock:
+            self._collected = []
+        stopped = self._stop_event.wait(self.measure_time)
+        with self._lock:
+            collected, self._collected = self._collected, None
+        if stopped:
+            return None
+        if not collected:
+            raise RuntimeError("No telemetry received during the sweep; is streaming (A1) on?")
+        samples = np.concatenate(collected)
+        return float(np.median(samples['speed'])), float(np.median(samples['current']))
+
+    def _run(self):
+        rpm, current = {}, {}
+        calibration, error = None, None
+        try:
+            self.send('a,1')
+            for direction in self.directions:
+                # Stop before reversing
+                self.send('s,0')
+                if self._stop_event.wait(self.stop_time):
+                    break
+                self.send(f'd,{direction}')
+                rpm[direction] = np.empty(len(self.pwm_values))
+                current[direction] = np.empty(len(self.pwm_values))
+                for i, pwm in enumerate(self.pwm_values):
+                    self.send(f's,{int(pwm)}')
+                    measured = self._measure()
+                    if measured is None:
+                        break
+                    rpm[direction][i], current[direction][i] = measured
+                    self.steps_done += 1
+                if self._stop_event.is_set():
+                    break
+            else:
+                calibration = Calibration(self.pwm_values, rpm, current)
+        except Exception as e:
+            error = e
+        finally:
+            try:
+                self.send('s,0')
+            except Exception:
+                pass
+            self.finished = True
+        self.on_done(calibration, error)
@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import deque
+
+# Firmware reply line prefix -> command letter it acknowledges (lab1.ino)
+REPLIES = {
+    'Motor speed set to': 's',
+    'Sampling interval set to': 'i',
+    'Motor direction set to': 'd',
+    'Sensor data streaming': 'a',
+    'Encoder count reset': 'r',
+    'Binary telemetry': 'b',
+    'Raw telemetry': 'w',
+}
+
+
+class CommandWriter:
+    """Writes command lines to the Arduino on its own thread.
+
+    send() only queues, so neither the GUI nor the control loop waits for the
+    port. Speed commands are coalesced: an "s,N" replaces an "s,N" still
+    waiting at the end of the queue, and a speed equal to the last one sent is
+    not sent again (unless forced). Other commands keep their order.
+
+    Reply lines from the firmware are passed to on_reply(); each is matched
+    to the oldest unacknowledged command of its kind to measure the round-trip
+    latency. Replies only arrive as text, so this works in ASCII mode; in
+    binary mode unacknowledged commands simply expire after ack_timeout.
+    on_error(exception) is called from the writer thread if a write fails.
+    With a metrics.Registry, write durations and reply latencies are also
+    recorded as histograms.
+    """
+
+    def __init__(self, port, on_error=None, ack_timeout=2.0, metrics=None):
+        self.port = port
+        self.on_error = on_error
+        self.ack_timeout = ack_timeout
+        self._pending = deque()         # (command, force)
+        self._in_flight = deque()       # (letter, value, time written)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.last_speed = None          # Value of the last "s," written
+
+        # Counters
+        self.sent = 0
+        self.coalesced = 0
+        self.suppressed = 0
+        self.acknowledged = 0
+        self.unacknowledged = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+        self.write_histogram = self.latency_histogram = None
+        if metrics is not None:
+            self.write_histogram = metrics.histogram('command_write_seconds', "Duration of one command write")
+            self.latency_histogram = metrics.histogram('command_reply_seconds',
+                                                       "Time from writing a command to the firmware's reply")
+            metrics.counter('commands_sent_total', "Command lines written", lambda: self.sent)
+            metrics.counter('commands_coalesced_total', "Speed commands superseded before writing",
+                            lambda: self.coalesced)
+            metrics.counter('commands_suppressed_total', "Unchanged speed commands not written",
+                            lambda: self.suppressed)
+            metrics.counter('commands_acknowledged_total', "Commands answered by the firmware",
+                            lambda: self.acknowledged)
+            metrics.counter('commands_unacknowledged_total', "Commands without a reply", lambda: self.unacknowledged)
+            metrics.gauge('commands_pending', "Commands waiting to be written", lambda: len(self._pending))
+
+    def start(self):
+        with self._condition:
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="CommandWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Write what is still queued (up to timeout) and stop the thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def reset(self):
+        """Forget the last speed sent, e.g. after the Arduino was reset."""
+        with self._condition:
+            self.last_speed = None
+            self._in_flight.clear()
+
+    def send(self, command, force=False):
+        """Queue one command line (without newline). force: send even if unchanged."""
+        with self._condition:
+            if command.startswith('s,'):
+                if self._pending and self._pending[-1][0].startswith('s,'):
+                    # Superseded before it was written
+                    self._pending.pop()
+                    self.coalesced += 1
+                elif not force and command[2:] == self.last_speed:
+                    self.suppressed += 1
+                    return
+            self._pending.append((command, force))
+            self._condition.notify()
+
+    def flush(self, timeout=1.0):
+        """Wait until the queue is written; returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def on_reply(self, line, arrival_time=None):
+        """Match a firmware reply line to its command. Returns True if it acknowledged one."""
+        now = arrival_time if arrival_time is not None else time.perf_counter()
+        line = line.strip()
+        letter = next((letter for prefix, letter in REPLIES.items() if line.startswith(prefix)), None)
+        if letter is None:
+            return False
+        words = line.split()
+        value = {'s': words[-1], 'd': words[-1], 'i': words[-2]}.get(letter)
+
+        with self._condition:
+            self._expire(now)
+            for index, (sent_letter, sent_value, sent_time) in enumerate(self._in_flight):
+                if sent_letter == letter and (value is None or sent_value == value):
+                    # The firmware answers in order: earlier commands without a reply were lost
+                    self.unacknowledged += index
+                    for _ in range(index + 1):
+                        self._in_flight.popleft()
+                    latency = now - sent_time
+                    self.acknowledged += 1
+                    self.last_latency = latency
+                    self.max_latency = max(self.max_latency, latency)
+                    self.total_latency += latency
+                    if self.latency_histogram is not None:
+                        self.latency_histogram.observe(latency)
+                    return True
+        return False
+
+    def status(self):
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'sent': self.sent,
+                'coalesced': self.coalesced,
+                'suppressed': self.suppressed,
+                'acknowledged': self.acknowledged,
+                'unacknowledged': self.unacknowledged,
+                'last_latency': self.last_latency,
+                'max_latency': self.max_latency,
+                'mean_latency': self.total_latency / self.acknowledged if self.acknowledged else 0.0,
+            }
+
+    def _expire(self, now):
+        while self._in_flight and now - self._in_flight[0][2] > self.ack_timeout:
+            self._in_flight.popleft()
+            self.unacknowledged += 1
+
+    def write_pending(self):
+        """Write everything queued so far on the calling thread; returns False if a write failed.
+
+        For owners without the writer thread, e.g. an asyncio event loop
+        (rig_manager.py) that calls this after send().
+        """
+        while True:
+            with self._condition:
+                if not self._pending:
+                    return True
+                command, force = self._pending.popleft()
+                if command.startswith('s,') and not force and command[2:] == self.last_speed:
+                    # The value changed back before this was written
+                    self.suppressed += 1
+                    self._condition.notify_all()
+                    continue
+
+            write_start = time.perf_counter()
+            try:
+                self.port.write((command + '\n').encode('utf-8'))
+            except Exception as e:
+                with self._condition:
+                    self._pending.clear()
+                    self._running = False
+                    self._condition.notify_all()
+                if self.on_error is not None:
+                    self.on_error(e)
+                return False
+
+            sent_time = time.perf_counter()
+            if self.write_histogram is not None:
+                self.write_histogram.observe(sent_time - write_start)
+            letter, _, value = command.partition(',')
+            with self._condition:
+                if letter == 's':
+                    self.last_speed = value
+                self._expire(sent_time)
+                self._in_flight.append((letter, value or None, sent_time))
+                self.sent += 1
+                self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and self._running:
+                    self._condition.wait()
+                if not self._pending:
+                    return  # Stopped and nothing left to write
+            if not self.write_pending():
+                return
@@ -0,0 +1,203 @@
+import threading
+import time
+
+import numpy as np
+
+
+class ControlLoop:
+    """Runs a control step at a fixed rate on its own thread, outside the Qt event loop.
+
+    Ticks are scheduled against absolute time.perf_counter() deadlines, so the
+    period does not drift with the step's own execution time and is not affected
+    by wall-clock adjustments. When the thread wakes up more than one period
+    late, the missed ticks are skipped (and counted) instead of being run in a
+    burst. step(dt) receives the measured time since the previous tick.
+
+    The GUI must not touch the loop's counters directly; status() returns a
+    consistent snapshot that is safe to read from any thread. With a
+    metrics.Registry, the tick lateness (jitter) and step duration are also
+    recorded as histograms.
+    """
+
+    def __init__(self, step, rate_hz=20.0, metrics=None):
+        self.step = step
+        self.period = 1.0 / rate_hz
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+        self.lateness_histogram = self.duration_histogram = None
+        if metrics is not None:
+            self.lateness_histogram = metrics.histogram('control_tick_lateness_seconds',
+                                                        "How late each control tick started after its deadline")
+            self.duration_histogram = metrics.histogram('control_step_seconds', "Duration of one control step")
+            metrics.counter('control_ticks_total', "Control ticks run", lambda: self.ticks)
+            metrics.counter('control_missed_deadlines_total', "Control ticks skipped because the thread was late",
+                            lambda: self.missed_deadlines)
+            metrics.counter('control_overruns_total', "Control steps longer than one period", lambda: self.overruns)
+            metrics.counter('control_errors_total', "Exceptions escaping the control step", lambda: self.errors)
+
+    def _reset_stats(self):
+        self.ticks = 0
+        self.missed_deadlines = 0   # Ticks skipped because the thread woke up too late
+        self.overruns = 0           # Ticks whose step took longer than one period
+        self.errors = 0             # Exceptions escaping step()
+        self.last_dt = 0.0
+        self.last_lateness = 0.0    # How late the last tick started after its deadline
+        self.max_lateness = 0.0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+
+    @property
+    def rate_hz(self):
+        return 1.0 / self.period
+
+    def set_rate(self, rate_hz):
+        """Change the tick rate; applies from the next deadline on."""
+        if rate_hz <= 0:
+            raise ValueError("rate must be positive")
+        self.period = 1.0 / rate_hz
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        with self._lock:
+            self._reset_stats()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ControlLoop", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def status(self):
+        """Thread-safe snapshot of the loop statistics."""
+        with self._lock:
+            return {
+                'rate_hz': self.rate_hz,
+                'ticks': self.ticks,
+                'missed_deadlines': self.missed_deadlines,
+                'overruns': self.overruns,
+                'errors': self.errors,
+                'last_dt': self.last_dt,
+                'last_lateness': self.last_lateness,
+                'max_lateness': self.max_lateness,
+                'last_duration': self.last_duration,
+                'max_duration': self.max_duration,
+            }
+
+    def _run(self):
+        clock = time.perf_counter
+        last_tick = clock()
+        deadline = last_tick + self.period
+
+        while not self._stop_event.is_set():
+            wait = deadline - clock()
+            if wait > 0 and self._stop_event.wait(wait):
+                break
+
+            now = clock()
+            lateness = now - deadline
+            dt = now - last_tick
+            last_tick = now
+
+            failed = False
+            try:
+                self.step(dt)
+            except Exception:
+                failed = True
+            duration = clock() - now
+
+            # Next deadline on the fixed grid; skip whole periods we are already past
+            period = self.period
+            deadline += period
+            missed = 0
+            behind = clock() - deadline
+            if behind > 0:
+                missed = int(behind // period) + 1
+                deadline += missed * period
+
+            if self.lateness_histogram is not None:
+                self.lateness_histogram.observe(lateness)
+                self.duration_histogram.observe(duration)
+
+            with self._lock:
+                self.ticks += 1
+                self.missed_deadlines += missed
+                self.overruns += duration > period
+                self.errors += failed
+                self.last_dt = dt
+                self.last_lateness = lateness
+                self.max_lateness = max(self.max_lateness, self.last_lateness)
+                self.last_duration = duration
+                self.max_duration = max(self.max_duration, duration)
+
+
+class SampleTrigger:
+    """Runs the control step once per new telemetry sample instead of on a timer.
+
+    dt comes from the sample timestamps, not from the host clock at the time
+    the step runs. A sample whose timestamp does not advance past the last
+    accepted one is a duplicate (or out of order) and is counted and skipped.
+    step(dts, values) is called once per batch with one dt per fresh sample.
+    """
+
+    def __init__(self, step):
+        self.step = step
+        self._lock = threading.Lock()
+        self.last_timestamp = None
+        self.samples = 0
+        self.duplicates = 0
+        self.last_dt = 0.0
+
+    def reset(self):
+        """Forget the previous sample so the next one only starts the clock."""
+        with self._lock:
+            self.last_timestamp = None
+
+    def feed(self, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values)
+        if len(timestamps) == 0:
+            return
+
+        with self._lock:
+            # A sample is fresh if it is newer than everything accepted before it
+            previous = -np.inf if self.last_timestamp is None else self.last_timestamp
+            newest_before = np.maximum.accumulate(np.concatenate(([previous], timestamps)))[:-1]
+            fresh = timestamps > newest_before
+            self.duplicates += int(len(timestamps) - np.count_nonzero(fresh))
+
+            times = timestamps[fresh]
+            values = values[fresh]
+            if len(times) == 0:
+                return
+            if self.last_timestamp is None:
+                # The first sample after a reset has no dt; it only starts the clock
+                self.last_timestamp = times[0]
+                times = times[1:]
+                values = values[1:]
+                if len(times) == 0:
+                    return
+
+            dts = np.diff(np.concatenate(([self.last_timestamp], times)))
+            self.last_timestamp = times[-1]
+            self.samples += len(times)
+            self.last_dt = float(dts[-1])
+
+        self.step(dts, values)
+
+    def status(self):
+        with self._lock:
+            return {
+                'samples': self.samples,
+                'duplicates': self.duplicates,
+                'last_dt': self.last_dt,
+            }
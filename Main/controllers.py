@@ -0,0 +1,16 @@
+from P_Controller import P_Controller
+from PI_Cotroller import PI_Controller
+from PID_Controller import PID_Controller
+
+CONTROLLERS = ('none', 'P', 'PI', 'PID')
+
+
+def make_controller(kind, Kp, Ki, Kd, rpm_setpoint):
+    """P, PI or PID controller for an RPM setpoint; None for 'none'."""
+    if kind == 'P':
+        return P_Controller(Kp, rpm_setpoint)
+    if kind == 'PI':
+        return PI_Controller(Kp, Ki, rpm_setpoint)
+    if kind == 'PID':
+        return PID_Controller(Kp, Ki, Kd, rpm_setpoint)
+    return None
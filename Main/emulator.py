@@ -0,0 +1,257 @@
+"""Emulates Arduino/lab1.ino on a pseudo-terminal so the GUI can run without hardware.
+
+    python emulator.py --tau 0.2 --interval 10
+
+prints the pty device (e.g. /dev/pts/5). serial.Serial / the GUI port box can
+open that path exactly like a real COM port. Linux and macOS only (pty).
+"""
+import argparse
+import os
+import select
+import threading
+import time
+
+import numpy as np
+
+from telemetry import encode_frames
+
+
+class MotorModel:
+    """First-order DC motor seen through the lab1.ino encoder and current sensor.
+
+    speed' = (gain * pwm - speed) / tau, in RPM. The encoder ISR measures speed
+    as 60e6 / (12 * pulse interval in us), so the reading is quantized by the
+    micros() resolution and, when the motor stops, keeps its last value (no
+    more pulses arrive). The current sensor is an offset plus a PWM-dependent
+    term, read through the 10-bit ADC.
+    """
+
+    def __init__(self, gain=100.0, tau=0.15, deadband=10, speed_noise=0.0,
+                 current_offset=0.05, current_per_pwm=0.004, current_noise=0.0,
+                 micros_resolution=4, pulses_per_rev=12, seed=None):
+        self.gain = gain                    # Steady-state RPM per PWM step
+        self.tau = tau                      # Time constant in seconds
+        self.deadband = deadband            # PWM below which the motor does not turn
+        self.speed_noise = speed_noise      # RPM (1 sigma), before quantization
+        self.current_offset = current_offset
+        self.current_per_pwm = current_per_pwm
+        self.current_noise = current_noise  # Volts (1 sigma)
+        self.micros_resolution = micros_resolution
+        self.pulses_per_rev = pulses_per_rev
+        self.rng = np.random.default_rng(seed)
+        self.speed = 0.0
+        self.measured_speed = 0.0
+
+    def step(self, pwm, dt):
+        """Advance the motor by dt seconds at the given PWM (0-255)."""
+        target = self.gain * (pwm if pwm > self.deadband else 0)
+        # Exact discretization of the first-order lag, stable for any dt
+        self.speed += (target - self.speed) * (1.0 - np.exp(-dt / self.tau))
+
+    def read_speed(self):
+        """Speed as the encoder ISR would report it."""
+        speed = self.speed + (self.rng.normal(0.0, self.speed_noise) if self.speed_noise else 0.0)
+        if speed > 1.0:
+            interval_us = 60e6 / (self.pulses_per_rev * speed)
+            interval_us = max(100.0, round(interval_us / self.micros_resolution) * self.micros_resolution)
+            self.measured_speed = 60e6 / (self.pulses_per_rev * interval_us)
+        return self.measured_speed
+
+    def read_current(self, pwm):
+        """Current sensor voltage as analogRead(A0) * 5 / 1023."""
+        volts = self.current_offset + self.current_per_pwm * pwm
+        if self.current_noise:
+            volts += self.rng.normal(0.0, self.current_noise)
+        return round(min(max(volts, 0.0), 5.0) * 1023 / 5.0) * 5.0 / 1023
+
+
+class Lab1Emulator:
+    """The lab1.ino command set and telemetry output, driven by a MotorModel.
+
+    Commands: a (streaming), s (speed), i (sampling interval), d (direction),
+    r (reset encoder), b (binary frames), w (raw samples). Like the firmware,
+    samples are taken every interval_ms into a window_size window and the
+    window maxima are sent every shift_step samples, or every sample as taken
+    in raw mode.
+    """
+
+    def __init__(self, model=None, interval_ms=100, window_size=50, shift_step=10):
+        self.model = model or MotorModel()
+        self.interval_ms = interval_ms
+        self.window_size = window_size
+        self.shift_step = shift_step
+
+        self.streaming = False
+        self.binary_mode = False
+        self.raw_mode = False
+        self.pwm = 0
+        self.direction = 0
+        self.frame_seq = 0
+        self.speed_window = np.zeros(window_size)
+        self.current_window = np.zeros(window_size)
+        self.window_index = 0
+        self.loop_count = 0
+        self.samples_sent = 0
+
+        self.start_time = time.monotonic()
+        self.last_update = self.start_time
+        self.next_sample = self.start_time
+
+        self._command_buffer = bytearray()
+        self._master = None
+        self._slave = None
+        self.port = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def millis(self, now):
+        return int((now - self.start_time) * 1000) & 0xFFFFFFFF
+
+    def process_command(self, line):
+        """Handle one command line and return the firmware's reply line."""
+        command = line[:1]
+        try:
+            value = int(line[2:]) if len(line) > 2 else 0
+        except ValueError:
+            value = 0
+
+        if command == 'a':
+            self.streaming = value == 1
+            return "Sensor data streaming " + ("enabled" if self.streaming else "disabled")
+        if command == 's':
+            self.pwm = min(max(value, 0), 255)
+            return f"Motor speed set to {value}"
+        if command == 'i':
+            self.interval_ms = value
+            return f"Sampling interval set to {value} ms"
+        if command == 'd':
+            self.direction = 1 if value else 0
+            return f"Motor direction set to {value}"
+        if command == 'r':
+            return "Encoder count reset"
+        if command == 'b':
+            self.binary_mode = value == 1
+            self.frame_seq = 0
+            return "Binary telemetry " + ("enabled" if self.binary_mode else "disabled")
+        if command == 'w':
+            self.raw_mode = value == 1
+            return "Raw telemetry " + ("enabled" if self.raw_mode else "disabled")
+        return "Unknown command"
+
+    def feed_commands(self, data):
+        """Handle received bytes; returns the reply bytes."""
+        self._command_buffer += data
+        replies = []
+        while b'\n' in self._command_buffer:
+            line, _, rest = self._command_buffer.partition(b'\n')
+            self._command_buffer = bytearray(rest)
+            replies.append(self.process_command(line.decode('ascii', errors='ignore').strip()) + '\r\n')
+        return ''.join(replies).encode('ascii')
+
+    def update(self, now):
+        """Advance the model to `now` and return the telemetry bytes due by then."""
+        out = []
+        while self.next_sample <= now:
+            sample_time = self.next_sample
+            self.model.step(self.pwm, sample_time - self.last_update)
+            self.last_update = sample_time
+            self.next_sample += max(self.interval_ms, 1) / 1000.0
+            if self.streaming:
+                out.append(self._take_sample(sample_time))
+        self.model.step(self.pwm, now - self.last_update)
+        self.last_update = now
+        return b''.join(out)
+
+    def _take_sample(self, sample_time):
+        speed = self.speed_window[self.window_index] = self.model.read_speed()
+        current = self.current_window[self.window_index] = self.model.read_current(self.pwm)
+        self.window_index = (self.window_index + 1) % self.window_size
+        self.loop_count += 1
+        if not self.raw_mode:
+            if self.loop_count % self.shift_step:
+                return b''
+            speed = self.speed_window.max()
+            current = self.current_window.max()
+
+        self.samples_sent += 1
+        if self.binary_mode:
+            frame = encode_frames(self.frame_seq, self.millis(sample_time), self.direction, speed, current)
+            self.frame_seq = (self.frame_seq + 1) & 0xFFFF
+            return frame
+        # Serial.print(float) prints two decimals
+        return f"{self.direction},{speed:.2f},{current:.2f}\r\n".encode('ascii')
+
+    # --- pseudo-terminal ---
+
+    def open_pty(self):
+        """Create the pty and return the device path to open with serial.Serial."""
+        import tty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        return self.port
+
+    def _write(self, data):
+        if not data:
+            return
+        try:
+            os.write(self._master, data)
+        except (BlockingIOError, OSError):
+            pass  # Nobody reading: the bytes are lost, as on a real UART
+
+    def serve(self):
+        """Run until stop(): answer commands and stream telemetry on the pty."""
+        if self._master is None:
+            self.open_pty()
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            timeout = max(0.0, min(self.next_sample - now, 0.05))
+            readable, _, _ = select.select([self._master], [], [], timeout)
+            if readable:
+                try:
+                    self._write(self.feed_commands(os.read(self._master, 4096)))
+                except OSError:
+                    pass
+            self._write(self.update(time.monotonic()))
+
+    def start(self):
+        """Serve on a background thread; returns the pty device path."""
+        port = self.open_pty()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.serve, name="Lab1Emulator", daemon=True)
+        self._thread.start()
+        return port
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="lab1.ino emulator on a pseudo-terminal")
+    parser.add_argument('--gain', type=float, default=100.0, help="steady-state RPM per PWM step")
+    parser.add_argument('--tau', type=float, default=0.15, help="motor time constant in seconds")
+    parser.add_argument('--deadband', type=int, default=10, help="PWM below which the motor stands still")
+    parser.add_argument('--speed-noise', type=float, default=0.0, help="speed noise in RPM (1 sigma)")
+    parser.add_argument('--current-noise', type=float, default=0.0, help="current noise in volts (1 sigma)")
+    parser.add_argument('--interval', type=int, default=100, help="initial sampling interval in ms")
+    parser.add_argument('--shift-step', type=int, default=10, help="samples per telemetry output")
+    parser.add_argument('--window', type=int, default=50, help="samples in the max window")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    model = MotorModel(gain=args.gain, tau=args.tau, deadband=args.deadband, speed_noise=args.speed_noise,
+                       current_noise=args.current_noise, seed=args.seed)
+    emulator = Lab1Emulator(model, interval_ms=args.interval, window_size=args.window, shift_step=args.shift_step)
+    print(f"Emulated lab1.ino on {emulator.open_pty()} (Ctrl+C to stop)")
+    try:
+        emulator.serve()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,144 @@
+"""Run the motor controller without the GUI: no Qt, no matplotlib, no display.
+
+    python headless.py /dev/ttyACM0 --controller PID --setpoint 80 --kp 1 --ki 0.1 --kd 0.05 --duration 3600
+
+Connects to the port, starts streaming, runs the selected controller with
+the same serial, parsing, control and command code as the GUI (the
+Acquisition pipeline of acquisition.py) and streams every sample to a
+recording file. A line of statistics is printed every --stats-interval
+seconds. Ctrl+C (or --duration) stops the motor and closes the recording.
+"""
+import argparse
+import os
+import threading
+import time
+from queue import Queue, Empty
+
+import serial
+
+from acquisition import Acquisition
+from bounded_queue import DROP_OLDEST, POLICIES
+from calibration import Calibration, load_calibration, CALIBRATION_PATH
+from controllers import make_controller, CONTROLLERS
+from recorder import Recorder, RECORD_DTYPE, EXTENSION as RECORDING_EXTENSION
+
+
+def format_status(status, elapsed, sample_triggered=False):
+    """One line of statistics from an Acquisition status snapshot."""
+    speed = status['speed'] if status['speed'] is not None else float('nan')
+    if sample_triggered:
+        trigger = status['trigger']
+        control = (f"control per sample dt {trigger['last_dt'] * 1000:.1f} ms, "
+                   f"duplicates {trigger['duplicates']}")
+    else:
+        loop = status['control']
+        control = (f"control dt {loop['last_dt'] * 1000:.1f} ms, late max {loop['max_lateness'] * 1000:.1f} ms, "
+                   f"missed {loop['missed_deadlines']}, overruns {loop['overruns']}")
+    queue = status['queue']
+    commands = status['commands']
+    return (f"{elapsed:8.1f} s | speed {speed:8.1f} RPM | pwm {status['control_output']:3d} | "
+            f"samples {status['samples']} (malformed {status['malformed_lines']}) | {control} | "
+            f"queue {queue['depth']} (max {queue['high_water']}), "
+            f"dropped {queue['dropped_oldest'] + queue['dropped_newest']} | "
+            f"commands {commands['sent']}, reply {commands['last_latency'] * 1000:.0f} ms "
+            f"(max {commands['max_latency'] * 1000:.0f} ms)")
+
+
+def run(port_name, controller='PID', setpoint=0, Kp=1.0, Ki=0.1, Kd=0.05, direction=0, interval=None,
+        control_rate=20.0, sample_triggered=False, binary_mode=False, raw_mode=False, duration=None,
+        stats_interval=1.0, record_dir='recordings', calibration_path=CALIBRATION_PATH, queue_size=1000,
+        queue_policy=DROP_OLDEST):
+    """Drive the motor until duration (seconds) has passed or Ctrl+C; returns the recording path."""
+    calibration = (load_calibration(calibration_path) if os.path.exists(calibration_path)
+                   else Calibration.linear(0.01))
+    rpm_setpoint = calibration.pwm_to_rpm(setpoint, direction)
+    port = serial.Serial(port_name, 115200, timeout=1)
+
+    path = os.path.join(record_dir, time.strftime("session_%Y%m%d_%H%M%S") + RECORDING_EXTENSION)
+    recorder = Recorder(path, dtype=RECORD_DTYPE, metadata={'headless': True, 'controller': controller,
+                                                             'setpoint': setpoint, 'Kp': Kp, 'Ki': Ki, 'Kd': Kd})
+    recorder.start()
+
+    commands, events = Queue(), Queue()
+    acquisition = Acquisition(port, recorder, commands, events, control_rate=control_rate,
+                              sample_triggered=sample_triggered, queue_size=queue_size, queue_policy=queue_policy)
+    thread = threading.Thread(target=acquisition.run, name="Acquisition", daemon=True)
+    thread.start()
+
+    # Same start-up sequence as the GUI buttons; the setpoint is the feedforward command
+    commands.put(('command', f'd,{direction}', True))
+    if interval is not None:
+        commands.put(('command', f'i,{interval}', True))
+    if binary_mode:
+        commands.put(('command', 'b,1', True))
+    if raw_mode:
+        commands.put(('command', 'w,1', True))
+    commands.put(('command', 'a,1', True))
+    commands.put(('command', f's,{setpoint}', True))
+    commands.put(('controller', make_controller(controller, Kp, Ki, Kd, rpm_setpoint), rpm_setpoint, calibration))
+    print(f"{port_name}: {controller} controller, setpoint {setpoint} PWM = {rpm_setpoint:.0f} RPM "
+          f"({calibration.source} calibration), recording to {path}")
+
+    start = time.monotonic()
+    next_stats = start + stats_interval
+    status = None
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            try:
+                event = events.get(timeout=0.1)
+            except Empty:
+                event = None
+            if event is not None and event[0] == 'status':
+                status = event[1]
+            elif event is not None:
+                _, title, message, disconnect = event
+                print(f"{title}: {message}")
+                if disconnect:
+                    break
+            now = time.monotonic()
+            if status is not None and now >= next_stats:
+                print(format_status(status, now - start, sample_triggered), flush=True)
+                next_stats += stats_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Stops the motor and streaming, then closes the port
+        commands.put(('stop',))
+        thread.join(3.0)
+        recorder.stop()
+    print(f"Recording saved to {path}")
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="DC motor control without the GUI")
+    parser.add_argument('port', help="serial port of the Arduino (e.g. COM3 or /dev/ttyACM0)")
+    parser.add_argument('--controller', choices=CONTROLLERS, default='PID')
+    parser.add_argument('--setpoint', type=int, default=0, help="target speed as PWM (0-255), as in the GUI")
+    parser.add_argument('--kp', type=float, default=1.0)
+    parser.add_argument('--ki', type=float, default=0.1)
+    parser.add_argument('--kd', type=float, default=0.05)
+    parser.add_argument('--direction', type=int, choices=(0, 1), default=0)
+    parser.add_argument('--interval', type=int, default=None, help="firmware sampling interval in ms")
+    parser.add_argument('--control-rate', type=float, default=20.0, help="controller update rate in Hz")
+    parser.add_argument('--sample-triggered', action='store_true',
+                        help="run one controller step per received sample instead of at --control-rate")
+    parser.add_argument('--binary', action='store_true', help="binary telemetry frames instead of ASCII lines")
+    parser.add_argument('--raw', action='store_true',
+                        help="stream and record every sample instead of the firmware's window maxima")
+    parser.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    parser.add_argument('--stats-interval', type=float, default=1.0, help="seconds between statistics lines")
+    parser.add_argument('--record-dir', default='recordings', help="directory for the streamed recordings")
+    parser.add_argument('--calibration', default=CALIBRATION_PATH, help="PWM <-> RPM calibration file")
+    parser.add_argument('--queue-size', type=int, default=1000, help="max. serial reads waiting to be parsed")
+    parser.add_argument('--queue-policy', choices=POLICIES, default=DROP_OLDEST,
+                        help="what to do when the telemetry queue is full")
+    args = parser.parse_args()
+
+    if not 0 <= args.setpoint <= 255:
+        parser.error("--setpoint must be 0-255")
+    run(args.port, args.controller, args.setpoint, args.kp, args.ki, args.kd, direction=args.direction,
+        interval=args.interval, control_rate=args.control_rate, sample_triggered=args.sample_triggered,
+        binary_mode=args.binary, raw_mode=args.raw, duration=args.duration, stats_interval=args.stats_interval,
+        record_dir=args.record_dir, calibration_path=args.calibration, queue_size=args.queue_size,
+        queue_policy=args.queue_policy)
@@ -0,0 +1,198 @@
+import numpy as np
+
+
+class GrowableArray:
+    """Append-only 1-D array with amortized O(1) appends (capacity doubles when full)."""
+
+    def __init__(self, dtype=np.float64, capacity=4096):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def extend(self, values):
+        n = len(values)
+        if self.size + n > len(self._data):
+            capacity = max(2 * len(self._data), self.size + n)
+            data = np.empty(capacity, dtype=self._data.dtype)
+            data[:self.size] = self._data[:self.size]
+            self._data = data
+        self._data[self.size:self.size + n] = values
+        self.size += n
+
+    def view(self):
+        return self._data[:self.size]
+
+    def clear(self):
+        self.size = 0
+
+
+class MinMaxPyramid:
+    """History of one channel as a min/max decimation pyramid, with bounded raw detail.
+
+    Level k holds the min and max of every block of base_block * factor**k
+    samples, where base_block = factor**memory_level (64 by default). Only
+    complete blocks are stored and new ones are computed from the level below
+    as samples arrive, so the cost of keeping the pyramid current is a small
+    constant per sample. Raw samples are kept only for the most recent `tail`
+    samples, so an hours-long run costs about 2 / base_block of its raw size.
+
+    query() picks the coarsest resolution that still gives enough points for
+    the requested range. Resolutions finer than base_block need raw samples:
+    older than the tail they come from source(start, stop), which returns the
+    same values that were passed to extend() (e.g. read back from the
+    recording), or None if it cannot. Without them query() falls back to the
+    finest level kept. Because it returns the min/max envelope rather than
+    every n-th sample, short spikes (such as the window maxima sent by
+    lab1.ino) stay visible at any zoom level.
+    """
+
+    def __init__(self, factor=8, memory_level=2, tail=65536, source=None):
+        if factor < 2:
+            raise ValueError("factor must be at least 2")
+        self.factor = factor
+        self.base_block = factor ** memory_level
+        if tail < self.base_block:
+            raise ValueError("tail must hold at least one block of the finest level kept")
+        self.tail_length = tail
+        self.source = source
+        self.tail = GrowableArray()
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+        self.tail.clear()
+        self.tail_start = 0     # Sample index of tail[0]
+        self.levels = [(GrowableArray(), GrowableArray())]   # Block sizes base_block, base_block * factor, ...
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        if len(values) == 0:
+            return
+        self.tail.extend(values)
+        self.count += len(values)
+
+        # Reduce the raw blocks that completed since last time into the finest level kept
+        block = self.base_block
+        mins, maxs = self.levels[0]
+        done = len(mins)
+        complete = self.count // block
+        if complete > done:
+            raw = self.tail.view()[done * block - self.tail_start:complete * block - self.tail_start]
+            mins.extend(raw.reshape(-1, block).min(axis=1))
+            maxs.extend(raw.reshape(-1, block).max(axis=1))
+
+        lower_min, lower_max = mins.view(), maxs.view()
+        level = 1
+        while len(lower_min) >= self.factor:
+            if level == len(self.levels):
+                self.levels.append((GrowableArray(), GrowableArray()))
+            mins, maxs = self.levels[level]
+
+            done = len(mins)
+            complete = len(lower_min) // self.factor
+            if complete > done:
+                start, stop = done * self.factor, complete * self.factor
+                mins.extend(lower_min[start:stop].reshape(-1, self.factor).min(axis=1))
+                maxs.extend(lower_max[start:stop].reshape(-1, self.factor).max(axis=1))
+
+            lower_min, lower_max = mins.view(), maxs.view()
+            level += 1
+
+        # Drop old raw samples in one copy every `tail` samples; the unreduced ones are always kept
+        if len(self.tail) > 2 * self.tail_length:
+            recent = self.tail.view()[-self.tail_length:].copy()
+            self.tail.clear()
+            self.tail.extend(recent)
+            self.tail_start = self.count - self.tail_length
+
+    def raw(self, start, stop):
+        """Raw samples [start, stop) from the tail and the source, or None if not available."""
+        if start >= self.tail_start:
+            return self.tail.view()[start - self.tail_start:stop - self.tail_start]
+        if self.source is None:
+            return None
+        older = self.source(start, min(stop, self.tail_start))
+        if older is None or len(older) != min(stop, self.tail_start) - start:
+            return None
+        older = np.asarray(older, dtype=np.float64)
+        if stop <= self.tail_start:
+            return older
+        return np.concatenate((older, self.tail.view()[:stop - self.tail_start]))
+
+    def query(self, start, stop, max_points=2000):
+        """Return (x, y) to draw samples [start, stop) with at most ~max_points points.
+
+        x is in sample indices. When decimated, every block contributes its
+        min and its max at the block's first index, so the line traces the
+        envelope of the signal.
+        """
+        start = max(0, int(start))
+        stop = min(self.count, int(np.ceil(stop)))
+        if stop <= start:
+            return np.empty(0), np.empty(0)
+
+        # Raw samples if they fit; otherwise the finest block size with few enough blocks
+        block = 1
+        if stop - start > max_points:
+            block = self.factor
+            while block < self.base_block and 2 * (stop - start) / block > max_points:
+                block *= self.factor
+
+        if block < self.base_block:
+            first = start // block * block
+            raw = self.raw(first, stop)
+            if raw is not None:
+                if block == 1:
+                    return np.arange(start, stop), raw
+                x = np.arange(first, stop, block)
+                lows = np.minimum.reduceat(raw, x - first)
+                highs = np.maximum.reduceat(raw, x - first)
+                return np.repeat(x, 2), np.column_stack((lows, highs)).reshape(-1)
+
+        level = 0
+        block = self.base_block
+        while level + 1 < len(self.levels) and 2 * (stop - start) / block > max_points:
+            level += 1
+            block *= self.factor
+
+        mins, maxs = self.levels[level]
+        first = start // block
+        last = min(-(-stop // block), len(mins))
+        lows = mins.view()[first:last]
+        highs = maxs.view()[first:last]
+        x = np.arange(first, last) * block
+
+        # Samples after the last complete block are not in the level yet
+        tail_start = max(last * block, start)
+        if tail_start < stop:
+            low, high = self._envelope(tail_start, stop)
+            lows = np.append(lows, low)
+            highs = np.append(highs, high)
+            x = np.append(x, tail_start)
+
+        return np.repeat(x, 2), np.column_stack((lows, highs)).reshape(-1)
+
+    def _envelope(self, start, stop):
+        """(min, max) of samples [start, stop), from the finest level kept and the unreduced raw samples.
+
+        start is rounded down to the finest level's block, which at the
+        resolution this is drawn at makes no visible difference.
+        """
+        block = self.base_block
+        mins, maxs = self.levels[0]
+        reduced = len(mins) * block
+        lows, highs = [], []
+        if start < reduced:
+            blocks = slice(start // block, -(-min(stop, reduced) // block))
+            lows.append(mins.view()[blocks].min())
+            highs.append(maxs.view()[blocks].max())
+        if stop > reduced:
+            raw = self.tail.view()[max(start, reduced) - self.tail_start:stop - self.tail_start]
+            lows.append(raw.min())
+            highs.append(raw.max())
+        return min(lows), max(highs)
@@ -15,8 +15,8 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
-from PySide6.QtWidgets import (QApplication, QComboBox, QGroupBox, QLineEdit,
-    QPushButton, QSizePolicy, QWidget)
+from PySide6.QtWidgets import (QApplication, QCheckBox, QComboBox, QGroupBox,
+    QLineEdit, QPushButton, QSizePolicy, QWidget)
 
 class Ui_formWidget(object):
     def setupUi(self, formWidget):
@@ -29,6 +29,9 @@ class Ui_formWidget(object):
         self.port_select_comboBox = QComboBox(self.port_groupBox)
         self.port_select_comboBox.setObjectName(u"port_select_comboBox")
         self.port_select_comboBox.setGeometry(QRect(20, 30, 111, 24))
+        self.refresh_pushButton = QPushButton(self.port_groupBox)
+        self.refresh_pushButton.setObjectName(u"refresh_pushButton")
+        self.refresh_pushButton.setGeometry(QRect(20, 56, 111, 20))
         self.connect_Button = QPushButton(self.port_groupBox)
         self.connect_Button.setObjectName(u"connect_Button")
         self.connect_Button.setGeometry(QRect(140, 30, 75, 24))
@@ -44,6 +47,12 @@ class Ui_formWidget(object):
         self.current_widget = QWidget(self.graph_groupBox)
         self.current_widget.setObjectName(u"current_widget")
         self.current_widget.setGeometry(QRect(20, 260, 751, 200))
+        self.history_checkBox = QCheckBox(self.graph_groupBox)
+        self.history_checkBox.setObjectName(u"history_checkBox")
+        self.history_checkBox.setGeometry(QRect(20, 228, 111, 20))
+        self.stats_pushButton = QPushButton(self.graph_groupBox)
+        self.stats_pushButton.setObjectName(u"stats_pushButton")
+        self.stats_pushButton.setGeometry(QRect(140, 228, 75, 20))
         self.command_groupBox = QGroupBox(formWidget)
         self.command_groupBox.setObjectName(u"command_groupBox")
         self.command_groupBox.setGeometry(QRect(10, 550, 571, 101))
@@ -74,6 +83,9 @@ class Ui_formWidget(object):
         self.reset_pushButton = QPushButton(self.command_groupBox)
         self.reset_pushButton.setObjectName(u"reset_pushButton")
         self.reset_pushButton.setGeometry(QRect(480, 40, 75, 24))
+        self.calibrate_pushButton = QPushButton(self.command_groupBox)
+        self.calibrate_pushButton.setObjectName(u"calibrate_pushButton")
+        self.calibrate_pushButton.setGeometry(QRect(480, 70, 75, 24))
         self.control_groupBox = QGroupBox(formWidget)
         self.control_groupBox.setObjectName(u"control_groupBox")
         self.control_groupBox.setGeometry(QRect(380, 0, 251, 80))
@@ -83,6 +95,12 @@ class Ui_formWidget(object):
         self.select_pushButton = QPushButton(self.control_groupBox)
         self.select_pushButton.setObjectName(u"select_pushButton")
         self.select_pushButton.setGeometry(QRect(160, 30, 75, 24))
+        self.sampleTrigger_checkBox = QCheckBox(self.control_groupBox)
+        self.sampleTrigger_checkBox.setObjectName(u"sampleTrigger_checkBox")
+        self.sampleTrigger_checkBox.setGeometry(QRect(20, 56, 131, 20))
+        self.tune_pushButton = QPushButton(self.control_groupBox)
+        self.tune_pushButton.setObjectName(u"tune_pushButton")
+        self.tune_pushButton.setGeometry(QRect(160, 56, 75, 20))
         self.save_groupBox = QGroupBox(formWidget)
         self.save_groupBox.setObjectName(u"save_groupBox")
         self.save_groupBox.setGeometry(QRect(610, 550, 181, 101))
@@ -95,6 +113,24 @@ class Ui_formWidget(object):
         self.save_pushButton = QPushButton(self.save_groupBox)
         self.save_pushButton.setObjectName(u"save_pushButton")
         self.save_pushButton.setGeometry(QRect(100, 40, 75, 24))
+        self.replay_pushButton = QPushButton(self.save_groupBox)
+        self.replay_pushButton.setObjectName(u"replay_pushButton")
+        self.replay_pushButton.setGeometry(QRect(100, 70, 75, 24))
+        self.telemetry_groupBox = QGroupBox(formWidget)
+        self.telemetry_groupBox.setObjectName(u"telemetry_groupBox")
+        self.telemetry_groupBox.setGeometry(QRect(640, 0, 161, 80))
+        self.b0_pushButton = QPushButton(self.telemetry_groupBox)
+        self.b0_pushButton.setObjectName(u"b0_pushButton")
+        self.b0_pushButton.setGeometry(QRect(10, 30, 65, 24))
+        self.b1_pushButton = QPushButton(self.telemetry_groupBox)
+        self.b1_pushButton.setObjectName(u"b1_pushButton")
+        self.b1_pushButton.setGeometry(QRect(85, 30, 65, 24))
+        self.raw_checkBox = QCheckBox(self.telemetry_groupBox)
+        self.raw_checkBox.setObjectName(u"raw_checkBox")
+        self.raw_checkBox.setGeometry(QRect(10, 56, 65, 20))
+        self.aggregate_comboBox = QComboBox(self.telemetry_groupBox)
+        self.aggregate_comboBox.setObjectName(u"aggregate_comboBox")
+        self.aggregate_comboBox.setGeometry(QRect(85, 56, 65, 20))
 
         self.retranslateUi(formWidget)
 
@@ -104,9 +140,12 @@ class Ui_formWidget(object):
     def retranslateUi(self, formWidget):
         formWidget.setWindowTitle(QCoreApplication.translate("formWidget", u"Form", None))
         self.port_groupBox.setTitle(QCoreApplication.translate("formWidget", u"Port", None))
+        self.refresh_pushButton.setText(QCoreApplication.translate("formWidget", u"refresh", None))
         self.connect_Button.setText(QCoreApplication.translate("formWidget", u"connect", None))
         self.disconnect_Button.setText(QCoreApplication.translate("formWidget", u"disconnect", None))
         self.graph_groupBox.setTitle(QCoreApplication.translate("formWidget", u"Graph", None))
+        self.history_checkBox.setText(QCoreApplication.translate("formWidget", u"Full history", None))
+        self.stats_pushButton.setText(QCoreApplication.translate("formWidget", u"Stats", None))
         self.command_groupBox.setTitle(QCoreApplication.translate("formWidget", u"Command", None))
         self.a0_pushButton.setText(QCoreApplication.translate("formWidget", u"A0", None))
         self.a1_pushButton.setText(QCoreApplication.translate("formWidget", u"A1", None))
@@ -115,11 +154,19 @@ class Ui_formWidget(object):
         self.speed_pushButton.setText(QCoreApplication.translate("formWidget", u"Set mortor speed", None))
         self.sampling_pushButton.setText(QCoreApplication.translate("formWidget", u"Set Sampling", None))
         self.reset_pushButton.setText(QCoreApplication.translate("formWidget", u"Reset", None))
+        self.calibrate_pushButton.setText(QCoreApplication.translate("formWidget", u"Calibrate", None))
         self.control_groupBox.setTitle(QCoreApplication.translate("formWidget", u"Control", None))
         self.select_pushButton.setText(QCoreApplication.translate("formWidget", u"select", None))
+        self.sampleTrigger_checkBox.setText(QCoreApplication.translate("formWidget", u"Per sample", None))
+        self.tune_pushButton.setText(QCoreApplication.translate("formWidget", u"Tune", None))
         self.save_groupBox.setTitle(QCoreApplication.translate("formWidget", u"Save", None))
         self.stop_pushButton.setText(QCoreApplication.translate("formWidget", u"Stop", None))
         self.start_pushButton.setText(QCoreApplication.translate("formWidget", u"Start", None))
         self.save_pushButton.setText(QCoreApplication.translate("formWidget", u"Save", None))
+        self.replay_pushButton.setText(QCoreApplication.translate("formWidget", u"Replay", None))
+        self.telemetry_groupBox.setTitle(QCoreApplication.translate("formWidget", u"Telemetry", None))
+        self.b0_pushButton.setText(QCoreApplication.translate("formWidget", u"B0", None))
+        self.b1_pushButton.setText(QCoreApplication.translate("formWidget", u"B1", None))
+        self.raw_checkBox.setText(QCoreApplication.translate("formWidget", u"Raw", None))
     # retranslateUi
 
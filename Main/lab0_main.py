@@ -1,28 +1,62 @@
+import sys
+import startup
+if '--startup-report' in sys.argv:
+    startup.enable()  # Before the other imports, so they are timed
 from lab0 import Ui_formWidget as lab0_form
 from PySide6 import QtCore, QtGui, QtWidgets
-from PySide6.QtWidgets import QMainWindow, QApplication, QMessageBox, QFileDialog
-import sys
-import serial.tools.list_ports as list_ports
+from PySide6.QtWidgets import QMainWindow, QApplication, QMessageBox, QFileDialog, QInputDialog
+import argparse
 import serial
 import time
 import threading
 import numpy as np
-import matplotlib
-matplotlib.use('Qt5Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+# matplotlib, the port list, autotune and sysid are imported when first needed
 from PySide6.QtCore import QTimer
 from queue import Queue
-import csv
+import os
 from P_Controller import P_Controller
 from PI_Cotroller import PI_Controller
 from PID_Controller import PID_Controller
+from serial_reader import SerialReader
+from control_loop import ControlLoop, SampleTrigger
+from telemetry_worker import TelemetryWorker
+from blit_plot import BlitPlot, HistoryPlot
+from history import MinMaxPyramid
+from recorder import Recorder, RECORD_DTYPE, to_records, open_records, \
+    EXTENSION as RECORDING_EXTENSION, export as export_recording
+from session import open_session, Replayer
+from bounded_queue import BoundedQueue, DROP_OLDEST, POLICIES
+from ring_buffer import RingBuffer
+from command_writer import CommandWriter
+from calibration import Calibration, CalibrationSweep, load_calibration, CALIBRATION_PATH
+from acquisition import AcquisitionProcess, control_command
+from telemetry import as_samples
+from window_aggregator import WindowAggregator, METHODS as AGGREGATIONS
+from metrics import Registry, MetricsServer
+from stats_panel import StatsPanel
+
+startup.mark("imports done")
 
 class MyMainWindow(QMainWindow):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, history_length=100, control_rate=20.0, sample_triggered=False,
+                 queue_size=1000, queue_policy=DROP_OLDEST, plot_rate=10.0, record_dir='recordings',
+                 plant_model=None, calibration_path=CALIBRATION_PATH, process_mode=False, metrics_port=None,
+                 aggregate_window=50, aggregate_step=10, aggregation='max'):
         super(MyMainWindow, self).__init__(parent)
         self.ui = lab0_form()
         self.ui.setupUi(self)
+
+        # Pipeline metrics: Stats button, and a Prometheus endpoint on localhost with metrics_port
+        self.metrics = Registry()
+        self.stats_panel = None
+        self.metrics_server = None
+        if metrics_port is not None:
+            self.metrics_server = MetricsServer(self.metrics, metrics_port)
+            self.metrics_server.start()
+
+        # Number of samples visible in the plots
+        self.history_length = history_length
+        self.plot_x = np.arange(history_length)
         self.Kp = 1.0
         self.Ki = 0.1
         self.Kd = 0.05
@@ -30,46 +64,112 @@ class MyMainWindow(QMainWindow):
         # Scaling factor for converting RPM to PWM (0-255)
         # Based on observed behavior: 100 PWM ≈ 10,000 RPM, so PWM = RPM * 0.01
         self.rpm_to_pwm_scale = 0.01
+
+        # Measured PWM <-> RPM tables (Calibrate button); the linear scale above until a sweep is saved
+        self.calibration_path = calibration_path
+        self.calibration = (load_calibration(calibration_path) if os.path.exists(calibration_path)
+                            else Calibration.linear(self.rpm_to_pwm_scale))
+        self.calibration_sweep = None
+        self.calibration_result = None
         
         # Initialize controller variables
         self.controller = None
         self.controller_type = None
         self.setpoint = 0
-        self.last_time = time.time()
+        # Last PWM sent with "s,N"; recorded with every sample for system identification
+        self.command_pwm = 0
+        # Last direction sent with "d,N"; selects the calibration table
+        self.direction = 0
+        self.rpm_setpoint = 0
+
+        # Process mode: acquisition and control run in a child process (acquisition.py);
+        # this process only reads sample snapshots from its shared-memory ring
+        self.process_mode = process_mode
+        self.acquisition = None
         self.using_controller = False
 
-        # Initialize matplotlib figures for motorSpeed and current
-        self.motorSpeed_fig = Figure()
-        self.motorSpeed_canvas = FigureCanvas(self.motorSpeed_fig)
-        self.ui.motorSpeed_widget.layout = QtWidgets.QVBoxLayout(self.ui.motorSpeed_widget)
-        self.ui.motorSpeed_widget.layout.addWidget(self.motorSpeed_canvas)
-        self.motorSpeed_ax = self.motorSpeed_fig.add_subplot(111)
-        self.motorSpeed_data = np.zeros(100)  # Preallocate array for performance
+        # Messages from background threads, shown by the GUI thread:
+        # (QMessageBox function, title, message, disconnect afterwards)
+        self.control_events = Queue()
 
-        self.current_fig = Figure()
-        self.current_canvas = FigureCanvas(self.current_fig)
-        self.ui.current_widget.layout = QtWidgets.QVBoxLayout(self.ui.current_widget)
-        self.ui.current_widget.layout.addWidget(self.current_canvas)
-        self.current_ax = self.current_fig.add_subplot(111)
-        self.current_data = np.zeros(100)  # Preallocate array for performance
+        # The matplotlib figures are created by ensure_plots() when the first data is drawn
+        self.motorSpeed_plot = None
+        self.current_plot = None
+        self.motorSpeed_data = RingBuffer(history_length)  # Preallocated, written in place
+        self.current_data = RingBuffer(history_length)  # Preallocated, written in place
+        # Newest raw speed in RPM for the controller; in raw mode the plot buffers hold the aggregate
+        self.latest_speed = None
 
-        # Queue for incoming data
-        self.data_queue = Queue()
+        # Queue for incoming data (one item per serial read), bounded so a stalled
+        # consumer cannot grow memory or build up a stale backlog
+        self.data_queue = BoundedQueue(queue_size, queue_policy)
+        self.metrics.gauge('queue_depth', "Serial reads waiting to be parsed", self.data_queue.qsize)
+        self.metrics.gauge('queue_high_water', "Largest queue depth seen", lambda: self.data_queue.high_water)
+        self.metrics.counter('queue_dropped_oldest_total', "Queued reads discarded to make room",
+                             lambda: self.data_queue.dropped_oldest)
+        self.metrics.counter('queue_dropped_newest_total', "Reads discarded because the queue was full",
+                             lambda: self.data_queue.dropped_newest)
         
         # Thread safety lock for shared data
         self.data_lock = threading.Lock()
 
+        # Bumped by the telemetry worker whenever the plot buffers change
+        self.data_version = 0
+        self.drawn_version = 0
+
+        # Whole-run history with min/max decimation, browsable in the plots. Only the
+        # coarse levels stay in memory; zoomed-in detail is read back from the recording
+        self.motorSpeed_history = MinMaxPyramid(
+            source=lambda start, stop: self.read_history('speed', 100.0, start, stop))
+        self.current_history = MinMaxPyramid(
+            source=lambda start, stop: self.read_history('current', 1.0, start, stop))
+        self.history_source = None      # (recording path, history index of its first record)
+        self.history_records = None     # (path, memory map) of that recording, reopened as it grows
+        self.motorSpeed_history_plot = None
+        self.current_history_plot = None
+        self.ui.history_checkBox.toggled.connect(self.set_history_view)
+
         # State variables
         self.is_plotting = True  # To control plotting
-        self.saved_data = []  # To store data for saving
+
+        # Every sample is streamed to a recording file; Save exports it. The file is
+        # created when the first samples arrive, so a launch without data leaves none
+        self.record_dir = record_dir
+        self.recorder = None
+        self.recording_failed = False
+
+        # Replays a recorded session through the same worker/plot/controller pipeline
+        self.replayer = None
         
         # Flag to control the receive thread
         self.keep_receiving = False
 
-        # Populate available ports
-        available_ports = list_ports.comports()
-        for port in available_ports:
-            self.ui.port_select_comboBox.addItem(port.device)
+        # Telemetry format: ASCII "dir,speed,current" lines or binary frames ("b,1")
+        self.binary_mode = False
+
+        # Raw telemetry ("w,1"): the controller and the recording get every sample,
+        # the plots a rolling aggregate of them like the firmware's window maxima
+        self.raw_mode = False
+        self.plot_aggregator = WindowAggregator(aggregate_window, aggregate_step, aggregation)
+        self.ui.aggregate_comboBox.addItems(AGGREGATIONS)
+        self.ui.aggregate_comboBox.setCurrentText(aggregation)
+        self.ui.aggregate_comboBox.currentTextChanged.connect(self.set_aggregation)
+        self.ui.raw_checkBox.toggled.connect(self.set_raw_mode)
+        self.serial_reader = None
+        self.metrics.counter('serial_bytes_total', "Bytes read from the port (this connection)",
+                             lambda: self.serial_reader.bytes_read if self.serial_reader else 0)
+        self.metrics.counter('serial_reads_total', "Port reads that returned data (this connection)",
+                             lambda: self.serial_reader.reads if self.serial_reader else 0)
+        self.serial_errors = self.metrics.counter('serial_errors_total', "Receive threads ended by a port error")
+
+        # Commands go out on a writer thread: superseded speeds are coalesced, replies timed
+        self.command_writer = None
+
+        # Populate available ports on a background thread; enumeration can take seconds
+        self.found_ports = None
+        self.port_scan_thread = None
+        self.ui.refresh_pushButton.clicked.connect(self.refresh_ports)
+        self.refresh_ports()
 
         # Populate Controller options
         self.ui.control_comboBox.addItem("None")
@@ -77,6 +177,16 @@ class MyMainWindow(QMainWindow):
         self.ui.control_comboBox.addItem("PI_Controller")
         self.ui.control_comboBox.addItem("PID_Controller")
         self.ui.select_pushButton.clicked.connect(self.selectController)
+        self.ui.tune_pushButton.clicked.connect(self.tune_controller)
+
+        # Autotuning runs in the background; the GUI thread applies the result.
+        # plant_model: identified model (sysid.py) to tune against instead of the default motor
+        self.plant_model = None
+        if plant_model:
+            from sysid import load_model
+            self.plant_model = load_model(plant_model)
+        self.tuning_thread = None
+        self.tuned_gains = None
 
         # Connect signals and slots
         self.ui.connect_Button.clicked.connect(self.connectSerialPort)
@@ -86,27 +196,131 @@ class MyMainWindow(QMainWindow):
         self.ui.d0_pushButton.clicked.connect(self.sendCommand)
         self.ui.d1_pushButton.clicked.connect(self.sendCommand)
         self.ui.reset_pushButton.clicked.connect(self.sendCommand)
+        self.ui.calibrate_pushButton.clicked.connect(self.calibrate_motor)
         self.ui.speed_pushButton.clicked.connect(self.sendCommand)
         self.ui.sampling_pushButton.clicked.connect(self.sendCommand)
+        self.ui.b0_pushButton.clicked.connect(self.sendCommand)
+        self.ui.b1_pushButton.clicked.connect(self.sendCommand)
         self.ui.stop_pushButton.clicked.connect(self.stop_plotting)
         self.ui.start_pushButton.clicked.connect(self.start_plotting)
         self.ui.save_pushButton.clicked.connect(self.save_data)
+        self.ui.replay_pushButton.clicked.connect(self.replay_session)
+        self.ui.stats_pushButton.clicked.connect(self.show_stats)
 
         # Timer for refreshing plots
         self.plot_timer = QTimer(self)
         self.plot_timer.timeout.connect(self.refresh_plots)
-        self.plot_timer.start(100)  # Refresh every 100ms
+        self.plot_timer.start(int(1000 / plot_rate))  # Refresh every 100ms by default
         
-        # Timer for controller execution
-        self.controller_timer = QTimer(self)
-        self.controller_timer.timeout.connect(self.execute_controller)
-        self.controller_timer.start(50)  # Execute controller every 50ms
+        # Controller runs on its own fixed-rate thread, independent of plotting
+        self.control_loop = ControlLoop(self.execute_controller, rate_hz=control_rate, metrics=self.metrics)
+        self.control_loop.start()
+
+        # Alternative mode: one controller step per received sample, dt from sample timestamps
+        self.sample_triggered = sample_triggered
+        self.sample_trigger = SampleTrigger(self.execute_controller_on_samples)
+        self.metrics.counter('control_samples_total', "Control steps run per sample",
+                             lambda: self.sample_trigger.samples)
+        self.metrics.counter('control_duplicate_samples_total', "Samples skipped as duplicates or out of order",
+                             lambda: self.sample_trigger.duplicates)
+        self.ui.sampleTrigger_checkBox.setChecked(sample_triggered)
+        self.ui.sampleTrigger_checkBox.toggled.connect(self.set_sample_triggered)
+
+        # Parses incoming batches and updates the buffers off the GUI thread
+        self.telemetry_worker = TelemetryWorker(self.data_queue, self.process_samples, on_text=self.handle_replies,
+                                                metrics=self.metrics)
+        self.metrics.counter('recorded_samples_total', "Samples written to the recording (this recording)",
+                             lambda: self.recorder.samples_written if self.recorder else 0)
+
+        # Plot cost on the GUI thread
+        self.render_histogram = self.metrics.histogram('plot_render_seconds', "Time to redraw the plots once")
+        self.telemetry_worker.start()
+
+        # Timer for showing controller messages and loop statistics
+        self.control_status_timer = QTimer(self)
+        self.control_status_timer.timeout.connect(self.update_control_status)
+        self.control_status_timer.start(200)
 
         self.receive_thread = None
         self.serial_port = None
         
         # No automatic controller initialization
 
+    @property
+    def using_controller(self):
+        return self._using_controller
+
+    @using_controller.setter
+    def using_controller(self, enabled):
+        self._using_controller = enabled
+        if self.acquisition is not None:
+            self.sync_controller()
+
+    def sync_controller(self):
+        """Process mode: give the child a copy of the current controller, or disable it."""
+        if self.using_controller and self.controller:
+            self.acquisition.configure_controller(self.controller, self.rpm_setpoint, self.calibration)
+        else:
+            self.acquisition.configure_controller(None)
+
+    def ensure_plots(self):
+        """Create the matplotlib figures; deferred until something is drawn, as matplotlib is slow to import."""
+        if self.motorSpeed_plot is not None:
+            return
+        import matplotlib
+        matplotlib.use('Qt5Agg')
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        # Initialize matplotlib figures for motorSpeed and current
+        self.motorSpeed_fig = Figure()
+        self.motorSpeed_canvas = FigureCanvas(self.motorSpeed_fig)
+        self.ui.motorSpeed_widget.layout = QtWidgets.QVBoxLayout(self.ui.motorSpeed_widget)
+        self.ui.motorSpeed_widget.layout.addWidget(self.motorSpeed_canvas)
+        self.motorSpeed_ax = self.motorSpeed_fig.add_subplot(111)
+        self.motorSpeed_plot = BlitPlot(self.motorSpeed_canvas, self.motorSpeed_ax, self.plot_x, "Motor Speed")
+
+        self.current_fig = Figure()
+        self.current_canvas = FigureCanvas(self.current_fig)
+        self.ui.current_widget.layout = QtWidgets.QVBoxLayout(self.ui.current_widget)
+        self.ui.current_widget.layout.addWidget(self.current_canvas)
+        self.current_ax = self.current_fig.add_subplot(111)
+        self.current_plot = BlitPlot(self.current_canvas, self.current_ax, self.plot_x, "Current", color='orange')
+
+        self.motorSpeed_history_plot = HistoryPlot(self.motorSpeed_plot, self.motorSpeed_history, self.data_lock)
+        self.current_history_plot = HistoryPlot(self.current_plot, self.current_history, self.data_lock)
+        if self.ui.history_checkBox.isChecked():
+            self.motorSpeed_history_plot.show()
+            self.current_history_plot.show()
+        startup.mark("plots created")
+
+    def refresh_ports(self):
+        """List the serial ports on a background thread (refresh button)."""
+        if self.port_scan_thread is not None and self.port_scan_thread.is_alive():
+            return
+        self.ui.refresh_pushButton.setEnabled(False)
+        self.port_scan_thread = threading.Thread(target=self.scan_ports, daemon=True)
+        self.port_scan_thread.start()
+
+    def scan_ports(self):
+        """Background thread: enumerate the ports; the GUI thread fills the combo box."""
+        import serial.tools.list_ports as list_ports
+        try:
+            self.found_ports = [port.device for port in list_ports.comports()]
+        except Exception as e:
+            self.control_events.put((QMessageBox.warning, "Ports", f"Failed to list serial ports: {e}", False))
+            self.found_ports = []
+
+    def apply_ports(self, ports):
+        """Show the enumerated ports, keeping the current choice if it is still there (GUI thread)."""
+        current = self.ui.port_select_comboBox.currentText()
+        self.ui.port_select_comboBox.clear()
+        self.ui.port_select_comboBox.addItems(ports)
+        if current in ports:
+            self.ui.port_select_comboBox.setCurrentText(current)
+        self.ui.refresh_pushButton.setEnabled(True)
+        startup.mark(f"ports listed ({len(ports)})")
+
     def initialize_controller(self):
         """Initialize the controller based on the selected type."""
         if not self.controller_type:
@@ -114,8 +328,9 @@ class MyMainWindow(QMainWindow):
             return
             
         # Convert PWM setpoint to RPM equivalent for controller
-        rpm_setpoint = self.setpoint / self.rpm_to_pwm_scale
-        # print(f"Converting setpoint: {self.setpoint} PWM → {rpm_setpoint:.2f} RPM (scale factor: {self.rpm_to_pwm_scale})")
+        rpm_setpoint = self.calibration.pwm_to_rpm(self.setpoint, self.direction)
+        self.rpm_setpoint = rpm_setpoint
+        # print(f"Converting setpoint: {self.setpoint} PWM → {rpm_setpoint:.2f} RPM ({self.calibration.source} calibration)")
             
         if self.controller_type == "P_Controller":
             self.controller = P_Controller(self.Kp, rpm_setpoint)
@@ -126,88 +341,374 @@ class MyMainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, "Warning", "Unknown controller type.")
             self.using_controller = False
+            return
+
+        if self.acquisition is not None:
+            self.sync_controller()
+
+    def controller_active(self):
+        if self.acquisition is not None:
+            return False  # The acquisition process runs the controller
+        if self.replayer is not None:
+            # Replay: the controller runs on recorded data, its output is not sent
+            return bool(self.using_controller and self.controller)
+        return (self.using_controller and self.controller and hasattr(self, 'serial_port')
+                and self.serial_port and self.serial_port.is_open)
 
-    def execute_controller(self):
-        """Execute the control loop if controller is active."""
-        if not self.using_controller or not self.controller or not hasattr(self, 'serial_port') or not self.serial_port or not self.serial_port.is_open:
+    def execute_controller(self, dt):
+        """Execute the control loop if controller is active (timer mode).
+
+        Runs on the ControlLoop thread: no Qt calls here, problems are reported
+        through self.control_events instead.
+        """
+        if self.sample_triggered or not self.controller_active():
             return
             
-        # Get current speed from the data (most recent value) with thread safety
-        current_speed = None
+        # Get current speed (most recent raw sample, in RPM) with thread safety
         with self.data_lock:
-            if len(self.motorSpeed_data) > 0 and np.any(self.motorSpeed_data):
-                # Convert back from display value to actual RPM for controller
-                current_speed = self.motorSpeed_data[-1] * 100.0
+            current_speed = self.latest_speed
         
         if current_speed is None:
             return  # No valid speed data available
-            
-        # Calculate time delta for controllers that need it
-        current_time = time.time()
-        dt = current_time - self.last_time
-        self.last_time = current_time
-        
-        # Compute control output based on controller type
+
+        control_output = self.compute_control_output(current_speed, dt)
+        if control_output is not None:
+            self.send_control_output(control_output)
+
+    def execute_controller_on_samples(self, dts, speeds):
+        """Run one controller step per new sample (sample-triggered mode).
+
+        Runs on the telemetry worker thread, from process_samples(). dts come from
+        the sample timestamps; only the output for the newest sample is sent,
+        earlier ones are already superseded.
+        """
+        if not self.sample_triggered or not self.controller_active():
+            return
+
+        control_output = self.compute_control_output(speeds, dts)
+        if control_output is not None:
+            self.send_control_output(control_output)
+
+    def compute_control_output(self, current_speed, dt):
+        """Controller update: measured speed(s) in RPM -> motor command in PWM (see control_command)."""
         try:
-            if self.controller_type == "P_Controller":
-                rpm_correction = self.controller.compute(current_speed)
-            elif self.controller_type == "PI_Controller":
-                rpm_correction = self.controller.compute(current_speed, dt)
-            elif self.controller_type == "PID_Controller":
-                rpm_correction = self.controller.compute(current_speed, dt)
-            else:
-                return
-                
-            # Convert RPM correction back to PWM and add to base setpoint
-            control_output = self.setpoint + (rpm_correction * self.rpm_to_pwm_scale)
-            
-            # Debug output for monitoring
-            # print(f"Controller: Current={current_speed:.1f} RPM, Correction={rpm_correction:.1f} RPM, Output={control_output:.1f} PWM")
-            
+            control_output = control_command(self.controller, self.calibration, self.rpm_setpoint,
+                                             self.direction, current_speed, dt)
         except Exception as e:
             # print(f"Error in controller computation: {e}")
             self.using_controller = False
-            QMessageBox.warning(self, "Controller Error", 
-                               f"Controller computation failed: {e}\nController has been disabled.")
-            return
+            self.control_events.put((QMessageBox.warning, "Controller Error",
+                                     f"Controller computation failed: {e}\nController has been disabled.", False))
+            return None
             
-        # Ensure control output is within valid range for motor speed (0-255)
-        control_output = max(0, min(255, int(control_output)))
-        
-        # Safety check: Prevent sending 0 if motor was running (avoid sudden stops)
-        if control_output == 0 and current_speed > 5:  # If motor is running but output is 0
-            control_output = 10  # Minimum safe speed to maintain some movement
-            # print(f"Safety override: Prevented 0 output when motor running at {current_speed} RPM")
-        
         # Store last control output for debugging
         self.last_control_output = control_output
-        
+        return control_output
+
+    def send_control_output(self, control_output):
+        if self.replayer is not None:
+            return  # Nothing to drive during a replay; last_control_output keeps the value
+
         # Send command to motor
         try:
             command = f"s,{control_output}"
-            self.serial_port.write((command + '\n').encode('utf-8'))
+            self.write_command(command)
         except Exception as e:
             # print(f"Error sending control command: {e}")
             self.using_controller = False
-            QMessageBox.warning(self, "Communication Error", 
-                               f"Failed to send control command: {e}\nController has been disabled.")
-            # Try to reconnect
-            self.disconnectSerialPort()
+            # The GUI thread shows the message and disconnects
+            self.control_events.put((QMessageBox.warning, "Communication Error",
+                                     f"Failed to send control command: {e}\nController has been disabled.", True))
+
+    def write_command(self, command, force=False):
+        """Queue one command line for the Arduino and remember the commanded PWM.
+
+        Unchanged speeds are not sent again unless force is set.
+        """
+        if self.acquisition is not None:
+            self.acquisition.send(command, force)
+        else:
+            self.command_writer.send(command, force)
+        if command.startswith('s,'):
+            self.command_pwm = int(command[2:])
+        elif command.startswith('d,'):
+            self.direction = int(command[2:])
+
+    def command_write_failed(self, error):
+        """Writer thread: a serial write failed; the GUI thread shows it and disconnects."""
+        self.using_controller = False
+        self.control_events.put((QMessageBox.warning, "Communication Error",
+                                 f"Failed to send command: {error}\nController has been disabled.", True))
+
+    def handle_replies(self, lines, arrival_time):
+        """Telemetry worker thread: firmware reply lines acknowledge sent commands."""
+        writer = self.command_writer
+        if writer is not None:
+            for line in lines:
+                writer.on_reply(line, arrival_time)
+
+    def update_control_status(self):
+        """Show messages from the control thread and its timing statistics (GUI thread)."""
+        while not self.control_events.empty():
+            show, title, message, disconnect = self.control_events.get()
+            show(self, title, message)
+            if disconnect:
+                # Try to reconnect
+                self.disconnectSerialPort()
+
+        # Process mode: errors and statistics come from the acquisition process
+        remote = {}
+        if self.acquisition is not None:
+            for title, message, disconnect in self.acquisition.poll_events():
+                # The child has disabled its controller already
+                self.using_controller = False
+                QMessageBox.warning(self, title, message)
+                if disconnect:
+                    self.disconnectSerialPort()
+                    break
+        if self.acquisition is not None:
+            remote = self.acquisition.status
+            self.last_control_output = remote.get('control_output', 0)
+
+        if self.found_ports is not None:
+            self.apply_ports(self.found_ports)
+            self.found_ports = None
+
+        if self.tuned_gains is not None:
+            self.apply_tuned_gains(self.tuned_gains)
+            self.tuned_gains = None
+
+        if self.calibration_result is not None:
+            self.apply_calibration(*self.calibration_result)
+            self.calibration_result = None
+
+        if self.sample_triggered:
+            status = remote.get('trigger') or self.sample_trigger.status()
+            message = (f"Control per sample | dt {status['last_dt'] * 1000:.1f} ms | "
+                       f"samples {status['samples']} | duplicates {status['duplicates']}")
+        else:
+            status = remote.get('control') or self.control_loop.status()
+            message = (f"Control {status['rate_hz']:.0f} Hz | dt {status['last_dt'] * 1000:.1f} ms | "
+                       f"late max {status['max_lateness'] * 1000:.1f} ms | "
+                       f"missed {status['missed_deadlines']} | overruns {status['overruns']}")
+
+        if self.replayer is not None:
+            if self.replayer.finished:
+                self.replayer = None
+            else:
+                speed = f"{self.replayer.speed:g}x" if self.replayer.speed else "max"
+                message = f"Replay {self.replayer.session.name} {self.replayer.progress:.0%} at {speed} | " + message
+
+        if self.calibration_sweep is not None:
+            message = f"Calibrating {self.calibration_sweep.progress:.0%} | " + message
+
+        if self.acquisition is not None:
+            message = f"Acquisition process | ring lost {self.acquisition.lost} | " + message
+
+        queue_status = remote.get('queue') or self.data_queue.status()
+        message += (f" | queue {queue_status['depth']}/{queue_status['maxsize']} "
+                    f"(max {queue_status['high_water']}) | "
+                    f"dropped {queue_status['dropped_oldest'] + queue_status['dropped_newest']}")
+        command_status = remote.get('commands') or (self.command_writer.status() if self.command_writer else None)
+        if command_status is not None:
+            message += (f" | commands {command_status['sent']} (coalesced {command_status['coalesced']}, "
+                        f"unchanged {command_status['suppressed']}) | "
+                        f"reply {command_status['last_latency'] * 1000:.0f} ms "
+                        f"(max {command_status['max_latency'] * 1000:.0f} ms)")
+        self.statusBar().showMessage(message)
+
+    def tune_controller(self):
+        """Search Kp, Ki, Kd on the motor model in the background (Tune button)."""
+        if self.tuning_thread is not None and self.tuning_thread.is_alive():
+            QMessageBox.information(self, "Autotune", "Tuning is already running.")
+            return
+        methods = {"Relay / Ziegler-Nichols + refinement": "zn", "Grid search": "grid", "Random search": "random"}
+        choice, ok = QInputDialog.getItem(self, "Autotune", "Method:", list(methods), 0, False)
+        if not ok:
+            return
+
+        # Tune for the current control period and setpoint
+        dt = 1.0 / self.control_loop.status()['rate_hz']
+        plant = self.plant_model.plant(dt) if self.plant_model else {'dt': dt}
+        # The measured PWM <-> RPM mapping the controllers use
+        plant['calibration'] = self.calibration.table(self.direction)
+        if self.setpoint and self.setpoint > 0:
+            plant['setpoint'] = self.setpoint
+        self.ui.tune_pushButton.setEnabled(False)
+        self.tuning_thread = threading.Thread(target=self.run_autotune, args=(plant, methods[choice]), daemon=True)
+        self.tuning_thread.start()
+
+    def run_autotune(self, plant, method):
+        """Background thread: run the (process pool) search and hand the result to the GUI thread."""
+        try:
+            from autotune import autotune
+            self.tuned_gains = autotune(plant, method)
+        except Exception as e:
+            self.control_events.put((QMessageBox.critical, "Autotune", f"Tuning failed: {e}", False))
+            self.tuned_gains = False
+
+    def apply_tuned_gains(self, best):
+        """Load autotuned gains into the controller (GUI thread)."""
+        self.ui.tune_pushButton.setEnabled(True)
+        if not best:
+            return
+        self.Kp, self.Ki, self.Kd = best['Kp'], best['Ki'], best['Kd']
+        if self.using_controller and self.controller_type:
+            self.initialize_controller()
+        metrics = best['metrics']
+        QMessageBox.information(
+            self, "Autotune",
+            f"Kp = {self.Kp:.4g}, Ki = {self.Ki:.4g}, Kd = {self.Kd:.4g}"
+            f"{' (cached)' if best['cached'] else ''}\n"
+            f"Model: rise {metrics['rise_time']:.2f} s, overshoot {metrics['overshoot']:.1f} %, "
+            f"settling {metrics['settling_time']:.2f} s\n"
+            "The gains are used by the P, PI and PID controllers from now on.")
+
+    def calibrate_motor(self):
+        """Measure the PWM <-> RPM tables with a sweep over 0-255 in both directions (Calibrate button)."""
+        if self.calibration_sweep is not None:
+            # Second press stops a running sweep
+            self.calibration_sweep.stop()
+            return
+        if not self.serial_port or not self.serial_port.is_open:
+            QMessageBox.warning(self, "Warning", "Please connect to a port first.")
+            return
+        answer = QMessageBox.question(
+            self, "Calibrate",
+            "The motor will step from stop to full speed in both directions (about 6 minutes).\n"
+            "The controller is disabled meanwhile. Continue?")
+        if answer != QMessageBox.Yes:
+            return
+
+        # The sweep drives the motor directly
+        self.using_controller = False
+        self.calibration_sweep = CalibrationSweep(self.write_command, self.calibration_finished)
+        self.calibration_sweep.start()
+
+    def calibration_finished(self, calibration, error):
+        """Sweep thread: hand the result to the GUI thread."""
+        self.calibration_result = (calibration, error)
+
+    def apply_calibration(self, calibration, error):
+        """Use and save a finished sweep (GUI thread)."""
+        self.calibration_sweep = None
+        # The sweep turned streaming on and left the last direction it measured
+        self.show_streaming(True)
+        self.show_direction(self.direction)
+        if error is not None:
+            QMessageBox.critical(self, "Calibration", f"Calibration failed: {error}")
+            return
+        if calibration is None:
+            QMessageBox.information(self, "Calibration", "Calibration stopped; the previous calibration is kept.")
+            return
+
+        self.calibration = calibration
+        if self.acquisition is not None:
+            self.sync_controller()
+        try:
+            calibration.save(self.calibration_path)
+        except OSError as e:
+            QMessageBox.warning(self, "Calibration", f"Calibration is used but could not be saved: {e}")
+            return
+        QMessageBox.information(
+            self, "Calibration",
+            f"Calibration saved to {self.calibration_path}.\n"
+            f"Full speed: D0 {calibration.pwm_to_rpm(255, 0):.0f} RPM, D1 {calibration.pwm_to_rpm(255, 1):.0f} RPM")
+
+    def show_streaming(self, enabled):
+        """A0/A1 buttons for the firmware's streaming state: only the other state can be picked."""
+        self.ui.a0_pushButton.setEnabled(enabled)
+        self.ui.a1_pushButton.setEnabled(not enabled)
+
+    def show_direction(self, direction):
+        """D0/D1 buttons for the firmware's direction: only the other direction can be picked."""
+        self.ui.d0_pushButton.setEnabled(direction != 0)
+        self.ui.d1_pushButton.setEnabled(direction != 1)
+
+    def set_sample_triggered(self, enabled):
+        """Switch between the fixed-rate control thread and one step per sample."""
+        self.sample_trigger.reset()
+        self.sample_triggered = enabled
+        if self.acquisition is not None:
+            self.acquisition.set_sample_triggered(enabled)
+
+    def set_raw_mode(self, enabled):
+        """Ask the firmware for every sample ("w,1") or for its window maxima ("w,0")."""
+        with self.data_lock:
+            self.raw_mode = enabled
+            self.plot_aggregator.reset()
+        if self.serial_port and self.serial_port.is_open:
+            self.write_command(f"w,{int(enabled)}", force=True)
+
+    def set_aggregation(self, method):
+        """Reduction shown in the plots in raw mode: max, mean or median over the window."""
+        with self.data_lock:
+            aggregator = self.plot_aggregator
+            self.plot_aggregator = WindowAggregator(aggregator.window, aggregator.step, method)
+
+    def closeEvent(self, event):
+        if self.acquisition is not None:
+            self.keep_receiving = False
+            if self.receive_thread and self.receive_thread.is_alive():
+                self.receive_thread.join(timeout=1.0)
+            self.acquisition.close()
+        if self.command_writer is not None:
+            self.command_writer.stop()
+        if self.calibration_sweep is not None:
+            self.calibration_sweep.stop()
+        if self.replayer is not None:
+            self.replayer.stop()
+        self.control_loop.stop()
+        self.telemetry_worker.stop()
+        # Keep the recording on disk; it can be exported or replayed later
+        if self.recorder is not None:
+            self.recorder.stop()
+        if self.stats_panel is not None:
+            self.stats_panel.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        super(MyMainWindow, self).closeEvent(event)
 
     def connectSerialPort(self):
         if self.ui.port_select_comboBox.currentText() == '':
             QMessageBox.warning(self, "Warning", "Please select a port.")
             return
+        if self.replayer is not None:
+            # Live data takes over from a running replay
+            self.replayer.stop()
+            self.replayer = None
         try:
-            self.serial_port = serial.Serial(self.ui.port_select_comboBox.currentText(), 115200, timeout=1)
+            if self.process_mode:
+                # The child opens the port; it reports a failure through its events
+                self.acquisition = AcquisitionProcess(
+                    self.ui.port_select_comboBox.currentText(), control_rate=self.control_loop.rate_hz,
+                    sample_triggered=self.sample_triggered, binary_mode=self.binary_mode,
+                    queue_size=self.data_queue.maxsize, queue_policy=self.data_queue.policy)
+                self.serial_port = self.acquisition
+                receive = self.follow_acquisition
+            else:
+                self.serial_port = serial.Serial(self.ui.port_select_comboBox.currentText(), 115200, timeout=1)
+                self.serial_reader = SerialReader(self.serial_port, binary_mode=self.binary_mode)
+                self.command_writer = CommandWriter(self.serial_port, on_error=self.command_write_failed,
+                                                    metrics=self.metrics)
+                self.command_writer.start()
+                receive = self.receive_data
             self.ui.port_select_comboBox.setEnabled(False)
             self.ui.connect_Button.setEnabled(False)
 
+            # The firmware starts in ASCII, windowed mode after the reset on connect
+            with self.data_lock:
+                self.plot_aggregator.reset()
+            if self.binary_mode:
+                self.write_command('b,1', force=True)
+            if self.raw_mode:
+                self.write_command('w,1', force=True)
+
             # Set flag to enable data reception
             self.keep_receiving = True
             
             # Start the receive_data thread
-            self.receive_thread = threading.Thread(target=self.receive_data, daemon=True)
+            self.receive_thread = threading.Thread(target=receive, daemon=True)
             self.receive_thread.start()
 
         except Exception as e:
@@ -221,22 +722,33 @@ class MyMainWindow(QMainWindow):
             # First stop the motor by sending speed 0 command
             if hasattr(self, 'serial_port') and self.serial_port and self.serial_port.is_open:
                 # Send command to stop motor
-                self.serial_port.write(('s,0\n').encode('utf-8'))
-                time.sleep(0.1)
+                self.write_command('s,0', force=True)
                 
                 # Send command to disable data streaming
-                self.serial_port.write(('a,0\n').encode('utf-8'))
-                time.sleep(0.1)
+                self.write_command('a,0')
+
+                # The writer sends what is queued before it stops; no need to wait for replies
+                if self.command_writer is not None:
+                    self.command_writer.stop()
                 
                 # Update UI to reflect data streaming is disabled
                 self.ui.a0_pushButton.setEnabled(True)
                 self.ui.a1_pushButton.setEnabled(True)
                 
-                # Stop the receive thread
+                # Stop the receive thread; it returns within one read timeout
                 self.keep_receiving = False
+                if self.receive_thread and self.receive_thread.is_alive():
+                    self.receive_thread.join(timeout=1.0)
                 
-                # Close the serial port
+                # Close the serial port (process mode: stop the acquisition process)
                 self.serial_port.close()
+            if self.acquisition is not None:
+                # The process may have exited on its own; the ring still has to be freed
+                self.keep_receiving = False
+                if self.receive_thread and self.receive_thread.is_alive():
+                    self.receive_thread.join(timeout=1.0)
+                self.acquisition.close()
+                self.acquisition = None
                 
             self.ui.port_select_comboBox.setEnabled(True)
             self.ui.connect_Button.setEnabled(True)
@@ -273,14 +785,13 @@ class MyMainWindow(QMainWindow):
                     # print(f"Using UI input: {current_setpoint}")
                     
             # Priority 3: Use current motor speed (PREVENT STOPPING)
-            elif len(self.motorSpeed_data) > 0 and np.any(self.motorSpeed_data):
+            elif self.latest_speed is not None:
                 with self.data_lock:  # Thread-safe access
-                    # Convert back from display value to actual RPM
-                    motor_speed = self.motorSpeed_data[-1] * 100.0
+                    motor_speed = self.latest_speed
                 
                 if motor_speed > 0:  # Only if motor is running
                     # Convert to PWM with minimum threshold to ensure movement
-                    current_setpoint = min(255, max(30, int(motor_speed * self.rpm_to_pwm_scale)))
+                    current_setpoint = min(255, max(30, int(self.calibration.rpm_to_pwm(motor_speed, self.direction))))
                     # print(f"Using current motor speed: {motor_speed} RPM → {current_setpoint} PWM")
                 else:
                     current_setpoint = 50  # Safe low speed instead of 0
@@ -291,7 +802,7 @@ class MyMainWindow(QMainWindow):
             if hasattr(self, 'serial_port') and self.serial_port and self.serial_port.is_open:
                 try:
                     command = f"s,{current_setpoint}"
-                    self.serial_port.write((command + '\n').encode('utf-8'))
+                    self.write_command(command)
                     # QMessageBox.information(self, "Info", f"Controller disabled. Motor running at speed: {current_setpoint}")
                 except Exception as e:
                     # print(f"Error sending motor command: {e}")
@@ -318,11 +829,10 @@ class MyMainWindow(QMainWindow):
                 self.ui.speed_lineEdit.setText(str(self.setpoint))
                 setpoint_determined = True
                 # print(f"Using last control output as setpoint: {self.setpoint}")
-            elif len(self.motorSpeed_data) > 0 and np.any(self.motorSpeed_data):
+            elif self.latest_speed is not None:
                 # No previous controller data, but motor is running - require user input
                 with self.data_lock:  # Thread-safe access
-                    # Convert back from display value to actual RPM
-                    current_speed = self.motorSpeed_data[-1] * 100.0
+                    current_speed = self.latest_speed
                 
                 if current_speed > 0:  # Motor is running but no previous controller data
                     QMessageBox.warning(self, "Input Required", "Please input speed before start running")
@@ -342,10 +852,9 @@ class MyMainWindow(QMainWindow):
         if self.using_controller and self.controller:
             # This would require adding code to store the last output in your controller classes
             # For now, we'll estimate it based on the current speed
-            if len(self.motorSpeed_data) > 0 and np.any(self.motorSpeed_data):
-                # Convert back from display value to actual RPM
-                motor_speed_rpm = self.motorSpeed_data[-1] * 100.0
-                last_control_output = min(255, max(0, int(motor_speed_rpm * self.rpm_to_pwm_scale)))
+            if self.latest_speed is not None:
+                motor_speed_rpm = self.latest_speed
+                last_control_output = min(255, max(0, int(self.calibration.rpm_to_pwm(motor_speed_rpm, self.direction))))
         
         # Initialize the new controller with validation
         if setpoint_determined:
@@ -363,7 +872,7 @@ class MyMainWindow(QMainWindow):
                     # Ensure setpoint is within valid range before sending
                     safe_setpoint = min(255, max(0, int(self.setpoint)))
                     command = f"s,{safe_setpoint}"
-                    self.serial_port.write((command + '\n').encode('utf-8'))
+                    self.write_command(command)
                     # print(f"Sent initial command: {command}")
                 except Exception as e:
                     # print(f"Error sending initial control command: {e}")
@@ -371,9 +880,9 @@ class MyMainWindow(QMainWindow):
                                        f"Failed to send initial command: {e}")
                     return
             
-            # Activate the controller
+            # Activate the controller; the next sample only starts the sample clock
+            self.sample_trigger.reset()
             self.using_controller = True
-            self.last_time = time.time()  # Reset timer for dt calculations
             
             # Success message with details
             QMessageBox.information(self, "Controller Activated", 
@@ -387,16 +896,103 @@ class MyMainWindow(QMainWindow):
 
 
     def receive_data(self):
-        while self.keep_receiving:
+        try:
+            # Blocks on the port and handles one batch of lines/frames per read
+            self.serial_reader.run(lambda: self.keep_receiving, self.handle_batch)
+        except Exception as e:
+            # If an exception occurs, likely the port was closed; unexpected unless we are disconnecting
+            if self.keep_receiving:
+                self.serial_errors.inc()
+                self.control_events.put((QMessageBox.warning, "Communication Error",
+                                         f"Stopped receiving data: {e}\nPlease disconnect and reconnect.", False))
+            self.keep_receiving = False
+
+    def follow_acquisition(self):
+        """Receive thread (process mode): copy new records out of the shared ring."""
+        acquisition = self.acquisition
+        while self.keep_receiving and acquisition.is_open:
+            records = acquisition.read_new()
+            if len(records):
+                self.process_samples(as_samples(records), records)
+            else:
+                time.sleep(0.01)
+
+    def handle_batch(self, batch):
+        """Receive thread: stamp a raw batch and pass it to the telemetry worker."""
+        self.data_queue.put((batch, time.perf_counter()))
+
+    def process_samples(self, samples, records=None):
+        """Telemetry worker thread: store parsed samples and, per sample, drive the controller.
+
+        records: the samples with their commanded PWM, if already known (process mode).
+        In raw mode the live plots get the rolling aggregate, everything else the raw
+        samples, so history indices match the records of the recording.
+        """
+        # Replays are already on disk. A new recording is opened here, outside the data lock
+        recording = self.replayer is None and not self.recording_failed
+        new_recorder = None
+        if recording and self.recorder is None:
             try:
-                if self.serial_port and self.serial_port.is_open and self.serial_port.in_waiting > 0:
-                    data = self.serial_port.readline().decode('utf-8').strip()
-                    self.data_queue.put(data)  # Add data to the queue
+                new_recorder = self.new_recorder()
             except Exception as e:
-                # If an exception occurs, likely the port was closed
-                self.keep_receiving = False
-                break
-            time.sleep(0.01)  # Small delay to prevent CPU hogging
+                self.recording_error(e)
+                recording = False
+
+        with self.data_lock:
+            self.latest_speed = float(samples['speed'][-1])
+            if new_recorder is not None:
+                self.recorder = new_recorder
+                self.history_source = (new_recorder.path, len(self.motorSpeed_history))
+            plotted = self.plot_aggregator.feed(samples) if self.raw_mode else samples
+            # Divide motor speed by 100 for better graph visualization
+            self.motorSpeed_data.extend(plotted['speed'] / 100.0)
+            self.current_data.extend(plotted['current'])
+            self.motorSpeed_history.extend(samples['speed'] / 100.0)
+            self.current_history.extend(samples['current'])
+
+            # Record original data for exporting (keep original RPM values)
+            recorder = self.recorder
+            if recording and recorder is not None:
+                try:
+                    recorder.write(records if records is not None else to_records(samples, self.command_pwm))
+                except Exception as e:
+                    self.recording_error(e)
+            self.data_version += 1
+
+        sweep = self.calibration_sweep
+        if sweep is not None:
+            sweep.feed(samples)
+
+        if self.sample_triggered and self.controller_active():
+            self.sample_trigger.feed(samples['timestamp'], samples['speed'])
+
+    def read_history(self, column, scale, start, stop):
+        """History source (under the data lock): samples [start, stop) of column / scale from the recording.
+
+        Returns None while they are not on disk yet, or if the history does not
+        come from a recording; the history then draws its coarser levels.
+        """
+        if self.history_source is None:
+            return None
+        path, first = self.history_source
+        if start < first:
+            return None
+        if self.history_records is None or self.history_records[0] != path \
+                or len(self.history_records[1]) < stop - first:
+            try:
+                self.history_records = (path, open_records(path))
+            except (OSError, ValueError):
+                return None
+        records = self.history_records[1]
+        if len(records) < stop - first:
+            return None
+        return records[column][start - first:stop - first] / scale
+
+    def recording_error(self, error):
+        """Telemetry worker thread: plots and control carry on without the recording; say so once."""
+        self.recording_failed = True
+        self.control_events.put((QMessageBox.warning, "Recording Error",
+                                 f"{error}\nSamples are no longer recorded. Press Start for a new recording.", False))
 
     def stop_plotting(self):
         """Stop updating the plots."""
@@ -405,93 +1001,153 @@ class MyMainWindow(QMainWindow):
     def start_plotting(self):
         """Clear data and resume plotting."""
         with self.data_lock:
-            self.motorSpeed_data = np.zeros(100)
-            self.current_data = np.zeros(100)
-        self.saved_data = []  # Clear saved data
+            self.motorSpeed_data.clear()
+            self.current_data.clear()
+            self.latest_speed = None
+            self.motorSpeed_history.clear()
+            self.current_history.clear()
+            self.history_source = None
+            self.history_records = None
+            # Clear saved data: the next samples start a new recording, the old one is thrown away
+            old_recorder = self.recorder
+            self.recorder = None
+            self.recording_failed = False
+            self.data_version += 1
+        if old_recorder is not None:
+            old_recorder.discard()
+        if self.motorSpeed_plot is None:
+            pass  # Nothing drawn yet
+        elif self.ui.history_checkBox.isChecked():
+            self.motorSpeed_history_plot.show_all()
+            self.current_history_plot.show_all()
+        else:
+            self.motorSpeed_plot.reset_limits()
+            self.current_plot.reset_limits()
         self.is_plotting = True
 
-    def save_data(self):
-        """Open File Explorer to save data in .csv format."""
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Data", "", "CSV Files (*.csv)")
-        if file_path:
-            try:
-                with open(file_path, 'w', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(["Motor Direction", "Motor Speed", "Current"])
-                    writer.writerows(self.saved_data)
-                QMessageBox.information(self, "Success", "Data saved successfully!")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to save data: {e}")
+    def new_recorder(self):
+        """Start streaming samples to a new, timestamped recording file (telemetry worker thread)."""
+        path = os.path.join(self.record_dir, time.strftime("session_%Y%m%d_%H%M%S") + RECORDING_EXTENSION)
+        recorder = Recorder(path, dtype=RECORD_DTYPE, metadata={'history_length': self.history_length})
+        recorder.start()
+        return recorder
 
-    def refresh_plots(self):
-        """Refresh the plots if plotting is enabled."""
-        if not self.is_plotting:
+    def replay_session(self):
+        """Pick a recording and play it back through the telemetry pipeline."""
+        if self.replayer is not None:
+            # Second press stops a running replay
+            self.replayer.stop()
+            self.replayer = None
+            return
+        if self.serial_port and self.serial_port.is_open:
+            QMessageBox.warning(self, "Warning", "Please disconnect the port before replaying a session.")
             return
 
-        # Process all data in the queue
-        while not self.data_queue.empty():
-            data = self.data_queue.get()
-            self.plot_data(data)
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Replay Session", self.record_dir, f"Recordings (*{RECORDING_EXTENSION})")
+        if not file_path:
+            return
+        speeds = {"1x": 1.0, "10x": 10.0, "100x": 100.0, "max": None}
+        choice, ok = QInputDialog.getItem(self, "Replay Speed", "Speed:", list(speeds), 0, False)
+        if not ok:
+            return
+
+        try:
+            session = open_session(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to open session: {e}")
+            return
 
-        # Redraw the plots
-        self.motorSpeed_canvas.draw_idle()
-        self.current_canvas.draw_idle()
+        with self.data_lock:
+            self.motorSpeed_data.clear()
+            self.current_data.clear()
+            self.latest_speed = None
+            self.motorSpeed_history.clear()
+            self.current_history.clear()
+            self.history_source = (session.path, 0)
+            self.history_records = None
+            self.data_version += 1
+        self.sample_trigger.reset()
+        self.is_plotting = True
+
+        # Replayed batches wait for room in the queue instead of being dropped
+        self.replayer = Replayer(session, lambda batch: self.data_queue.put_wait((batch, time.perf_counter())),
+                                 speed=speeds[choice])
+        self.replayer.start()
 
-    def plot_data(self, data):
+    def save_data(self):
+        """Open File Explorer to save data in .csv, .npy or columnar .npz format."""
+        recorder = self.recorder
+        if recorder is None:
+            QMessageBox.warning(self, "Warning", "No data has been recorded yet.")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Data", "", "CSV Files (*.csv);;NumPy Files (*.npy);;Columnar NumPy Files (*.npz)")
+        if not file_path:
+            return
+
+        # Export from the recording file in the background; the GUI stays responsive
+        threading.Thread(target=self.export_data, args=(recorder, file_path), daemon=True).start()
+
+    def export_data(self, recorder, file_path):
+        """Background thread: flush the recording and convert it to file_path."""
         try:
-            # Check if the data has the expected format with commas
-            if ',' not in data:
-                return
-                
-            parts = data.split(',')
-            if len(parts) != 3:
-                return
-                
-            motorDirection, motorSpeed, current = parts
-            motorSpeed = float(motorSpeed)
-            current = float(current)
+            recorder.sync()
+            export_recording(recorder.path, file_path)
+            self.control_events.put((QMessageBox.information, "Success", "Data saved successfully!", False))
+        except Exception as e:
+            self.control_events.put((QMessageBox.critical, "Error", f"Failed to save data: {e}", False))
 
-            # Divide motor speed by 100 for better graph visualization
-            motorSpeed_display = motorSpeed / 100.0
+    def refresh_plots(self):
+        """Refresh the plots if plotting is enabled and new data has arrived."""
+        if not self.is_plotting:
+            return
 
-            # Save original data for exporting (keep original RPM values)
-            self.saved_data.append([motorDirection, motorSpeed, current])
+        if self.data_version == self.drawn_version:
+            return
+        self.ensure_plots()
 
-            # Update motorSpeed and current data with thread safety
-            with self.data_lock:
-                # Update motorSpeed data (use divided value for display)
-                self.motorSpeed_data = np.roll(self.motorSpeed_data, -1)
-                self.motorSpeed_data[-1] = motorSpeed_display
+        # Take a ready-to-draw copy of the windows; parsing already happened on the worker
+        with self.data_lock:
+            if self.data_version == self.drawn_version:
+                return
+            self.drawn_version = self.data_version
+            if self.motorSpeed_history_plot.active:
+                motorSpeed = current = None
+            else:
+                motorSpeed = self.motorSpeed_data.view().copy()
+                current = self.current_data.view().copy()
 
-                # Update current data
-                self.current_data = np.roll(self.current_data, -1)
-                self.current_data[-1] = current
+        start = time.perf_counter()
+        if motorSpeed is None:
+            # History view: re-query the visible range so new samples show up
+            self.motorSpeed_history_plot.refresh()
+            self.current_history_plot.refresh()
+        else:
+            # One blit per line; full redraws only when the y-limits have to grow
+            self.motorSpeed_plot.update(motorSpeed)
+            self.current_plot.update(current)
+        self.render_histogram.observe(time.perf_counter() - start)
 
-            # Update plots with thread-safe data access
-            with self.data_lock:
-                # Update motorSpeed plot
-                if not hasattr(self, 'motorSpeed_line'):
-                    self.motorSpeed_line, = self.motorSpeed_ax.plot(self.motorSpeed_data, label="Motor Speed")
-                    self.motorSpeed_ax.legend(loc='upper left', fontsize = 'x-small')
-                else:
-                    self.motorSpeed_line.set_data(range(len(self.motorSpeed_data)), self.motorSpeed_data)
-                    self.motorSpeed_ax.relim()
-                    self.motorSpeed_ax.autoscale_view()
-
-                # Update current plot
-                if not hasattr(self, 'current_line'):
-                    self.current_line, = self.current_ax.plot(self.current_data, label="Current", color='orange')
-                    self.current_ax.legend(loc='upper left', fontsize = 'x-small')
-                else:
-                    self.current_line.set_data(range(len(self.current_data)), self.current_data)
-                    self.current_ax.relim()
-                    self.current_ax.autoscale_view()
+    def show_stats(self):
+        """Open the pipeline statistics window (Stats button)."""
+        if self.stats_panel is None:
+            self.stats_panel = StatsPanel(self.metrics, self.metrics_server.address if self.metrics_server else None)
+        self.stats_panel.show()
+        self.stats_panel.raise_()
 
-        except ValueError:
-            # Invalid data format - just ignore
-            pass
-        except Exception as e:
-            print(f"Error in plot_data: {e}")
+    def set_history_view(self, enabled):
+        """Switch both plots between the live window and the zoomable whole-run history."""
+        if self.motorSpeed_plot is None:
+            # ensure_plots() opens the view that is selected
+            self.ensure_plots()
+            return
+        for history_plot in (self.motorSpeed_history_plot, self.current_history_plot):
+            if enabled:
+                history_plot.show()
+            else:
+                history_plot.hide()
+        self.drawn_version = -1  # Redraw on the next refresh
 
     def sendCommand(self):
         if not hasattr(self, 'serial_port') or not self.serial_port or not self.serial_port.is_open:
@@ -535,27 +1191,37 @@ class MyMainWindow(QMainWindow):
                     QMessageBox.information(self, "Info", f"Reset encoder. Controller {previous_controller} disabled.")
                 case 'a0':
                     command = 'a,0'
-                    self.ui.a0_pushButton.setEnabled(False)
-                    self.ui.a1_pushButton.setEnabled(True)
+                    self.show_streaming(False)
                 case 'a1':
                     command = 'a,1'
-                    self.ui.a1_pushButton.setEnabled(False)
-                    self.ui.a0_pushButton.setEnabled(True)
+                    self.show_streaming(True)
                 case 'd0':
                     command = 'd,0'
-                    self.ui.d0_pushButton.setEnabled(False)
-                    self.ui.d1_pushButton.setEnabled(True)
+                    self.show_direction(0)
                 case 'd1':
                     command = 'd,1'
-                    self.ui.d1_pushButton.setEnabled(False)
-                    self.ui.d0_pushButton.setEnabled(True)
+                    self.show_direction(1)
+                case 'b0':
+                    command = 'b,0'
+                    self.binary_mode = False
+                    if self.serial_reader:
+                        self.serial_reader.set_binary_mode(False)
+                    self.ui.b0_pushButton.setEnabled(False)
+                    self.ui.b1_pushButton.setEnabled(True)
+                case 'b1':
+                    command = 'b,1'
+                    self.binary_mode = True
+                    if self.serial_reader:
+                        self.serial_reader.set_binary_mode(True)
+                    self.ui.b1_pushButton.setEnabled(False)
+                    self.ui.b0_pushButton.setEnabled(True)
                 case _:
                     QMessageBox.warning(self, "Warning", "Unknown command.")
                     return
 
         try:
-            self.serial_port.write((command + '\n').encode('utf-8'))
-            time.sleep(0.1)
+            # Buttons always send, even if the speed is unchanged
+            self.write_command(command, force=True)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to send command: {e}")
             # Try to reconnect or handle the error
@@ -563,7 +1229,45 @@ class MyMainWindow(QMainWindow):
 
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    MainWindow = MyMainWindow()
+    parser = argparse.ArgumentParser(description="DC motor control GUI")
+    parser.add_argument('--history', type=int, default=100, help="number of samples shown in the plots")
+    parser.add_argument('--plot-rate', type=float, default=10.0, help="plot refresh rate in Hz")
+    parser.add_argument('--control-rate', type=float, default=20.0, help="controller update rate in Hz")
+    parser.add_argument('--sample-triggered', action='store_true',
+                        help="run one controller step per received sample instead of at --control-rate")
+    parser.add_argument('--record-dir', default='recordings', help="directory for the streamed recordings")
+    parser.add_argument('--queue-size', type=int, default=1000, help="max. serial reads waiting to be parsed")
+    parser.add_argument('--queue-policy', choices=POLICIES, default=DROP_OLDEST,
+                        help="what to do when the telemetry queue is full")
+    parser.add_argument('--calibration', default=CALIBRATION_PATH,
+                        help="PWM <-> RPM calibration file (written by the Calibrate button)")
+    parser.add_argument('--process', action='store_true',
+                        help="run acquisition and control in a separate process (shared-memory telemetry)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="print startup phase times and the slowest imports")
+    parser.add_argument('--aggregation', choices=AGGREGATIONS, default='max',
+                        help="rolling reduction plotted in raw telemetry mode")
+    parser.add_argument('--aggregate-window', type=int, default=50, help="samples per plotted aggregate in raw mode")
+    parser.add_argument('--aggregate-step', type=int, default=10,
+                        help="raw samples per plotted point (1 = a rolling value for every sample)")
+    parser.add_argument('--plant-model', help="identified plant model (.model.json from sysid.py) for the Tune button")
+    args, qt_args = parser.parse_known_args()
+    if args.aggregate_window < 1 or args.aggregate_step < 1:
+        parser.error("--aggregate-window and --aggregate-step must be at least 1")
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    MainWindow = MyMainWindow(history_length=args.history, control_rate=args.control_rate,
+                              sample_triggered=args.sample_triggered, queue_size=args.queue_size,
+                              queue_policy=args.queue_policy, plot_rate=args.plot_rate,
+                              record_dir=args.record_dir, plant_model=args.plant_model,
+                              calibration_path=args.calibration, process_mode=args.process,
+                              metrics_port=args.metrics_port, aggregation=args.aggregation,
+                              aggregate_window=args.aggregate_window, aggregate_step=args.aggregate_step)
     MainWindow.show()
+    startup.mark("window shown")
+    if args.startup_report:
+        # After the first pass of the event loop, i.e. once the window is painted
+        QTimer.singleShot(0, lambda: (startup.mark("event loop running"), print(startup.report())))
     sys.exit(app.exec())
\ No newline at end of file
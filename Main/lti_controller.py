@@ -0,0 +1,152 @@
+import numpy as np
+
+
+class LTIController:
+    """Discrete-time PID / lead-lag controller: one engine for every controller type.
+
+    With e = setpoint - process_variable, each step evaluates the difference
+    equations
+
+        integral[k] = integral[k-1] + e[k] dt
+        D[k]        = (Tf D[k-1] + e[k] - e[k-1]) / (Tf + dt)       (Tf = 0: plain difference)
+        v[k]        = Kp e[k] + Ki integral[k] + Kd D[k]
+        u[k]        = (lag u[k-1] + (lead + dt) v[k] - lead v[k-1]) / (lag + dt)
+
+    The last line is the lead-lag (1 + lead s) / (1 + lag s), only used when
+    lead or lag is set. P, PI and PID are Ki = Kd = 0, Kd = 0 and Tf = 0.
+    With limits=(low, high) on v, the integral stops growing while v is
+    saturated in the direction of the error (anti-windup) and v is clipped.
+    The state starts at zero, as in the original controller classes.
+    """
+
+    __slots__ = ('Kp', 'Ki', 'Kd', 'setpoint', 'Tf', 'limits', 'lead', 'lag', 'dt',
+                 'integral', 'previous_error', 'derivative', 'previous_v', 'output')
+
+    def __init__(self, Kp=0.0, Ki=0.0, Kd=0.0, setpoint=0.0, Tf=0.0, limits=None, lead=None, lag=None, dt=0.05):
+        self.Kp = Kp
+        self.Ki = Ki
+        self.Kd = Kd
+        self.setpoint = setpoint
+        self.Tf = Tf            # Derivative filter time constant in seconds
+        self.limits = limits    # (low, high) on the PID output, or None
+        self.lead = lead        # Lead-lag time constants in seconds, or None
+        self.lag = lag
+        self.dt = dt            # Used when step() is called without dt
+        self.reset()
+
+    def reset(self):
+        self.integral = 0
+        self.previous_error = 0
+        self.derivative = 0
+        self.previous_v = 0
+        self.output = 0
+
+    @property
+    def lead_lag(self):
+        return self.lead is not None or self.lag is not None
+
+    def step(self, process_variable, dt=None):
+        """One update for a new measurement; returns the controller output."""
+        if dt is None:
+            dt = self.dt
+        error = self.setpoint - process_variable
+
+        integral = self.integral + error * dt
+        if self.Tf:
+            derivative = (self.Tf * self.derivative + error - self.previous_error) / (self.Tf + dt)
+        elif self.Kd:
+            derivative = (error - self.previous_error) / dt
+        else:
+            derivative = 0
+        v = self.Kp * error + self.Ki * integral + self.Kd * derivative
+
+        if self.limits is not None:
+            low, high = self.limits
+            if (v > high and error > 0) or (v < low and error < 0):
+                # Saturated: do not wind the integral up any further
+                v -= self.Ki * (integral - self.integral)
+                integral = self.integral
+            v = min(max(v, low), high)
+
+        if self.lead is not None or self.lag is not None:
+            lead, lag = self.lead or 0.0, self.lag or 0.0
+            output = (lag * self.output + (lead + dt) * v - lead * self.previous_v) / (lag + dt)
+        else:
+            output = v
+
+        self.integral = integral
+        self.derivative = derivative
+        self.previous_error = error
+        self.previous_v = v
+        self.output = output
+        return output
+
+    def step_batch(self, process_variables, dt=None):
+        """Outputs for a whole array of measurements, as step() one by one would give.
+
+        dt may be a scalar or one value per measurement. The linear cases are
+        evaluated with NumPy (cumulative sums, differences and block-wise
+        first-order filters); anti-windup limits, and filters with varying
+        dt, are stepped sample by sample. The state ends as after the last
+        step(), so step() and step_batch() can be mixed.
+        """
+        pv = np.asarray(process_variables, dtype=np.float64)
+        if dt is None:
+            dt = self.dt
+        dt = np.asarray(dt, dtype=np.float64)
+        if len(pv) == 0:
+            return np.empty(0)
+        if self.limits is not None or (dt.ndim and (self.Tf or self.lead_lag)):
+            dts = np.broadcast_to(dt, pv.shape).tolist()
+            return np.array([self.step(value, step_dt) for value, step_dt in zip(pv.tolist(), dts)])
+
+        error = self.setpoint - pv
+        # Same summation order as repeated step() calls
+        integral = np.cumsum(np.concatenate(([self.integral], error * dt)))[1:]
+        change = np.diff(error, prepend=self.previous_error)
+        if self.Tf:
+            derivative = _first_order(self.Tf / (self.Tf + dt), change / (self.Tf + dt), self.derivative)
+        elif self.Kd:
+            derivative = change / dt
+        else:
+            derivative = np.zeros(len(pv))
+        v = self.Kp * error + self.Ki * integral + self.Kd * derivative
+
+        if self.lead_lag:
+            lead, lag = self.lead or 0.0, self.lag or 0.0
+            drive = ((lead + dt) * v - lead * np.concatenate(([self.previous_v], v[:-1]))) / (lag + dt)
+            output = _first_order(lag / (lag + dt), drive, self.output)
+        else:
+            output = v
+
+        self.integral = float(integral[-1])
+        self.derivative = float(derivative[-1])
+        self.previous_error = float(error[-1])
+        self.previous_v = float(v[-1])
+        self.output = float(output[-1])
+        return output
+
+
+def _first_order(a, x, y0, block=128):
+    """y[k] = a y[k-1] + x[k] with y[-1] = y0, for a constant 0 <= a < 1.
+
+    Inside a block of samples the response is a matrix product with the powers
+    of a; only the block boundaries are carried over in Python.
+    """
+    a = float(a)
+    count = len(x)
+    blocks = -(-count // block)
+    padded = np.zeros(blocks * block)
+    padded[:count] = x
+    lags = np.subtract.outer(np.arange(block), np.arange(block))
+    powers = a ** np.maximum(lags, 0)
+    response = np.where(lags >= 0, powers, 0.0)
+    carry = a ** np.arange(1, block + 1)
+
+    forced = padded.reshape(blocks, block) @ response.T
+    out = np.empty((blocks, block))
+    state = y0
+    for i in range(blocks):
+        out[i] = forced[i] + carry * state
+        state = out[i, -1]
+    return out.ravel()[:count]
@@ -0,0 +1,226 @@
+"""Pipeline metrics: counters, gauges and fixed-bucket histograms.
+
+Most numbers already exist as plain counters on the pipeline objects
+(reader bytes, parsed samples, queue drops, ...). Those are registered with
+a function and only read when the metrics are collected, so they cost
+nothing while data flows. Only timing distributions are observed as they
+happen, into histograms with fixed bucket bounds (one bisect and a few
+additions per observation).
+
+    registry = Registry()
+    registry.counter('serial_bytes_total', "Bytes read from the port", lambda: reader.bytes_read)
+    latency = registry.histogram('command_write_seconds', "Duration of one port write")
+    latency.observe(0.0004)
+
+registry.text() is the Prometheus text exposition format; MetricsServer
+serves it on localhost for a Prometheus scraper (or curl).
+"""
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = 'dcmotor_'
+
+# Seconds: 100 us to 1 s
+TIME_BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+
+class Counter:
+    """Monotonic count; resets (e.g. a new connection) are fine for rate()."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, function=None):
+        self.name = name
+        self.help = help
+        self.function = function
+        self._value = 0
+
+    def inc(self, amount=1):
+        self._value += amount
+
+    @property
+    def value(self):
+        return self.function() if self.function is not None else self._value
+
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value):
+        self._value = value
+
+
+class Histogram:
+    """Distribution over fixed bucket bounds (upper bounds, +Inf implied)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=TIME_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.sum = 0.0
+            self.count = 0
+            self.max = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self):
+        """(cumulative bucket counts, sum, count, max), consistent with each other."""
+        with self._lock:
+            counts, total, count, maximum = list(self.counts), self.sum, self.count, self.max
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count, maximum
+
+    def quantile(self, q, snapshot=None):
+        """Upper bound of the bucket holding the q-quantile (max for the +Inf bucket)."""
+        cumulative, _, count, maximum = snapshot or self.snapshot()
+        if count == 0:
+            return 0.0
+        index = bisect.bisect_left(cumulative, q * count)
+        return self.buckets[index] if index < len(self.buckets) else maximum
+
+
+class Registry:
+    """Named metrics. Asking for an existing name returns it (a new function replaces the old one)."""
+
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **options)
+            elif not isinstance(metric, cls) or metric.kind != cls.kind:
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            elif options.get('function') is not None:
+                metric.function = options['function']
+            return metric
+
+    def counter(self, name, help, function=None):
+        return self._get(Counter, name, help, function=function)
+
+    def gauge(self, name, help, function=None):
+        return self._get(Gauge, name, help, function=function)
+
+    def histogram(self, name, help, buckets=TIME_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def text(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics():
+            name = self.prefix + metric.name
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            if metric.kind == 'histogram':
+                cumulative, total, count, _ = metric.snapshot()
+                for bound, running in zip(metric.buckets, cumulative):
+                    lines.append(f'{name}_bucket{{le="{bound:g}"}} {running}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {count}')
+                lines.append(f"{name}_sum {total!r}")
+                lines.append(f"{name}_count {count}")
+            else:
+                lines.append(f"{name} {_number(_read(metric))}")
+        return '\n'.join(lines) + '\n'
+
+    def table(self):
+        """Human-readable summary for the stats panel."""
+        lines = []
+        for metric in self.metrics():
+            if metric.kind == 'histogram':
+                snapshot = metric.snapshot()
+                _, total, count, maximum = snapshot
+                mean = total / count if count else 0.0
+                lines.append(f"{metric.name:<40} n {count:<9} mean {mean * 1000:8.3f} ms  "
+                             f"p50 <{metric.quantile(0.5, snapshot) * 1000:7.2f} ms  "
+                             f"p99 <{metric.quantile(0.99, snapshot) * 1000:7.2f} ms  "
+                             f"max {maximum * 1000:8.3f} ms")
+            else:
+                lines.append(f"{metric.name:<40} {_number(_read(metric))}")
+        return '\n'.join(lines)
+
+
+def _read(metric):
+    try:
+        return metric.value
+    except Exception:
+        return None  # E.g. the object behind a function is gone
+
+
+def _number(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value) if isinstance(value, float) else str(int(value))
+
+
+class MetricsServer:
+    """Serves registry.text() at http://host:port/metrics on its own thread (localhost only by default)."""
+
+    def __init__(self, registry, port=9100, host='127.0.0.1'):
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # No line per scrape on the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
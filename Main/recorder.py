@@ -0,0 +1,248 @@
+import json
+import os
+import struct
+import threading
+import time
+from queue import Queue, Empty
+
+import numpy as np
+
+from telemetry import SAMPLE_DTYPE
+
+# Recording file layout:
+#   magic      8 bytes  b'DCMREC01'
+#   length     uint32   size of the JSON metadata that follows
+#   metadata   JSON     dtype description, start time, ... padded with spaces so
+#                       the records start at a multiple of 64 bytes
+#   records    fixed-size rows of the recorded dtype, appended in chunks
+# A file cut short by a crash is still readable up to its last complete record.
+MAGIC = b'DCMREC01'
+EXTENSION = '.dcmrec'
+CSV_HEADER = "Motor Direction,Motor Speed,Current"
+
+# What the GUI records: the samples plus the PWM commanded when they arrived
+RECORD_DTYPE = np.dtype(SAMPLE_DTYPE.descr + [('pwm', '<f8')])
+
+
+def _dtype_to_json(dtype):
+    return [[name, dtype.fields[name][0].str] for name in dtype.names]
+
+
+def _dtype_from_json(descr):
+    return np.dtype([(name, fmt) for name, fmt in descr])
+
+
+def to_records(samples, pwm):
+    """SAMPLE_DTYPE samples -> RECORD_DTYPE rows with the given commanded PWM."""
+    records = np.empty(len(samples), dtype=RECORD_DTYPE)
+    for name in SAMPLE_DTYPE.names:
+        records[name] = samples[name]
+    records['pwm'] = pwm
+    return records
+
+
+def write_header(file, dtype, metadata=None):
+    meta = dict(metadata or {})
+    meta['dtype'] = _dtype_to_json(dtype)
+    text = json.dumps(meta).encode('utf-8')
+    length = -(-(len(MAGIC) + 4 + len(text)) // 64) * 64 - len(MAGIC) - 4
+    file.write(MAGIC + struct.pack('<I', length) + text.ljust(length))
+    return len(MAGIC) + 4 + length
+
+
+def read_header(path):
+    """Return (metadata, dtype, offset of the first record)."""
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a recording file")
+        length, = struct.unpack('<I', file.read(4))
+        metadata = json.loads(file.read(length).decode('utf-8'))
+    return metadata, _dtype_from_json(metadata['dtype']), len(MAGIC) + 4 + length
+
+
+def open_records(path):
+    """Memory-map the complete records of a recording (read-only, nothing is loaded)."""
+    metadata, dtype, offset = read_header(path)
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def recover(path):
+    """Cut off a partially written last record (e.g. after a crash). Returns the record count."""
+    _, dtype, offset = read_header(path)
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    with open(path, 'r+b') as file:
+        file.truncate(offset + count * dtype.itemsize)
+    return count
+
+
+def export(path, out_path, chunk_size=1_000_000):
+    """Write a recording to .csv, .npy or columnar .npz, chosen by out_path's extension.
+
+    Records are processed in chunks straight from the memory map, so exporting
+    a long run never needs the whole run in memory.
+    """
+    records = open_records(path)
+    extension = os.path.splitext(out_path)[1].lower()
+
+    if extension == '.npy':
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=records.dtype, shape=records.shape)
+        for start in range(0, len(records), chunk_size):
+            out[start:start + chunk_size] = records[start:start + chunk_size]
+        out.flush()
+        del out
+    elif extension == '.npz':
+        # One array per column
+        np.savez(out_path, **{name: np.asarray(records[name]) for name in records.dtype.names})
+    else:
+        with open(out_path, 'w', newline='') as file:
+            file.write(CSV_HEADER + '\n')
+            for start in range(0, len(records), chunk_size):
+                chunk = records[start:start + chunk_size]
+                np.savetxt(file, np.column_stack((chunk['direction'], chunk['speed'], chunk['current'])),
+                           fmt=['%d', '%.10g', '%.10g'], delimiter=',')
+    return len(records)
+
+
+class Recorder:
+    """Streams samples to a recording file on a background thread.
+
+    write() only queues the array, so producers never wait for the disk.
+    The thread appends every queued chunk as raw records and flushes the file
+    to disk at least every flush_interval seconds. After a crash the file is
+    complete up to the last flush.
+
+    start(background=False) skips the thread: write() then appends on the
+    caller's thread, for an event loop that owns many recorders.
+
+    If writing fails (disk full, wrong dtype) the recording stops: the error
+    is kept in `error`, and write() and sync() raise it from then on.
+    """
+
+    def __init__(self, path, dtype=SAMPLE_DTYPE, flush_interval=1.0, metadata=None):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.flush_interval = flush_interval
+        self.metadata = metadata
+        self._queue = Queue()
+        self._thread = None
+        self._file = None
+        self._last_flush = 0.0
+        self.samples_written = 0
+        self.bytes_written = 0
+        self.error = None
+
+    def start(self, background=True):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'wb')
+        meta = dict(self.metadata or {})
+        meta.setdefault('started', time.strftime('%Y-%m-%dT%H:%M:%S'))
+        self.bytes_written = write_header(self._file, self.dtype, meta)
+        self._file.flush()
+        self._last_flush = time.monotonic()
+        if background:
+            self._thread = threading.Thread(target=self._run, name="Recorder", daemon=True)
+            self._thread.start()
+
+    def write(self, samples):
+        """Queue an array of samples for writing (any thread; without background, the owner's)."""
+        self._check()
+        if not len(samples):
+            return
+        if self._thread is not None:
+            self._queue.put(samples)
+        elif self._file is not None:
+            try:
+                self._append(samples)
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush()
+            except Exception as e:
+                self.error = e
+                self._check()
+
+    def sync(self):
+        """Block until everything queued so far is written and flushed."""
+        self._check()
+        thread = self._thread
+        if thread is None:
+            if self._file is not None:
+                self._flush()
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(0.5):
+            if not thread.is_alive():
+                break
+        self._check()
+
+    def _check(self):
+        if self.error is not None:
+            raise RuntimeError(f"Recording to {self.path} failed: {self.error}") from self.error
+
+    def stop(self):
+        """Write what is queued, flush and close the file."""
+        if self._thread is None:
+            if self._file is not None:
+                try:
+                    if self.error is None:
+                        self._flush()
+                finally:
+                    self._file.close()
+                    self._file = None
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file = None
+
+    def discard(self):
+        """Stop and delete the recording file."""
+        self.stop()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _run(self):
+        try:
+            self._write_queued()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._file.close()
+
+    def _write_queued(self):
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except Empty:
+                item = False
+
+            if item is None:
+                running = False
+            elif isinstance(item, threading.Event):
+                self._flush()
+                last_flush = time.monotonic()
+                item.set()
+                continue
+            elif item is not False:
+                self._append(item)
+
+            if not running or time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+
+    def _append(self, samples):
+        data = np.ascontiguousarray(samples, dtype=self.dtype).tobytes()
+        self._file.write(data)
+        self.samples_written += len(samples)
+        self.bytes_written += len(data)
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        self._file.flush()
+        os.fsync(self._file.fileno())
@@ -0,0 +1,162 @@
+"""Compact dashboard for many rigs: one table row per motor.
+
+    python rig_dashboard.py COM3 COM4:120 COM5 --controller PID --setpoint 80
+
+The rigs run on a RigManager (rig_manager.py): one event loop thread for
+all of them. The table is refreshed from status snapshots; the controls
+below it act on the selected rig.
+"""
+import argparse
+import sys
+
+import serial.tools.list_ports as list_ports
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (QApplication, QComboBox, QHBoxLayout, QHeaderView, QLabel, QMessageBox,
+                               QPushButton, QSpinBox, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget)
+
+from controllers import CONTROLLERS
+from rig_manager import Rig, RigManager, add_arguments, build_rigs, rig_settings
+
+COLUMNS = ("Rig", "Port", "State", "Control", "Setpoint", "PWM", "Speed (RPM)", "Current",
+           "Samples/s", "Late max (ms)", "Reply (ms)", "Error")
+
+
+class RigDashboard(QWidget):
+    def __init__(self, manager, rig_settings=None, refresh_rate=4.0, parent=None):
+        super(RigDashboard, self).__init__(parent)
+        self.manager = manager
+        self.rig_settings = rig_settings or {}   # Used for rigs added from the dashboard
+        self.setWindowTitle("Motor rigs")
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+
+        # Controls for the selected rig
+        self.controller_comboBox = QComboBox()
+        self.controller_comboBox.addItems(CONTROLLERS)
+        self.setpoint_spinBox = QSpinBox()
+        self.setpoint_spinBox.setRange(0, 255)
+        self.apply_pushButton = QPushButton("Apply")
+        self.apply_pushButton.clicked.connect(self.apply_setpoint)
+        self.stop_pushButton = QPushButton("Stop motor")
+        self.stop_pushButton.clicked.connect(self.stop_motor)
+        self.restart_pushButton = QPushButton("Reconnect")
+        self.restart_pushButton.clicked.connect(self.restart_rig)
+        self.remove_pushButton = QPushButton("Remove")
+        self.remove_pushButton.clicked.connect(self.remove_rig)
+
+        # Adding a rig
+        self.port_comboBox = QComboBox()
+        self.port_comboBox.setEditable(True)
+        for port in list_ports.comports():
+            self.port_comboBox.addItem(port.device)
+        self.add_pushButton = QPushButton("Add rig")
+        self.add_pushButton.clicked.connect(self.add_rig)
+
+        controls = QHBoxLayout()
+        for widget in (QLabel("Controller:"), self.controller_comboBox, QLabel("Setpoint (PWM):"),
+                       self.setpoint_spinBox, self.apply_pushButton, self.stop_pushButton,
+                       self.restart_pushButton, self.remove_pushButton):
+            controls.addWidget(widget)
+        controls.addStretch()
+        controls.addWidget(self.port_comboBox)
+        controls.addWidget(self.add_pushButton)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addLayout(controls)
+        self.resize(1000, 300)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(int(1000 / refresh_rate))
+
+    def selected_rig(self):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            QMessageBox.warning(self, "Warning", "Please select a rig.")
+            return None
+        return self.table.item(rows[0].row(), 0).text()
+
+    def refresh(self):
+        """Redraw the table from the rigs' status snapshots."""
+        statuses = self.manager.snapshot()
+        self.table.setRowCount(len(statuses))
+        for row, status in enumerate(statuses):
+            commands = status['commands']
+            values = (
+                status['name'], status['port'], status['state'], status['controller'],
+                str(status['setpoint']), str(status['pwm']),
+                f"{status['speed']:.0f}" if status['speed'] is not None else "-",
+                f"{status['current']:.2f}" if status['current'] is not None else "-",
+                f"{status['sample_rate']:.1f}", f"{status['max_lateness'] * 1000:.1f}",
+                f"{commands['last_latency'] * 1000:.0f}" if commands else "-",
+                status['error'] or "",
+            )
+            for column, value in enumerate(values):
+                item = self.table.item(row, column)
+                if item is None:
+                    self.table.setItem(row, column, QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
+
+    def apply_setpoint(self):
+        name = self.selected_rig()
+        if name:
+            self.manager.set_setpoint(name, self.setpoint_spinBox.value(), self.controller_comboBox.currentText())
+
+    def stop_motor(self):
+        """Disable the controller and stop the selected motor; the rig keeps streaming."""
+        name = self.selected_rig()
+        if name:
+            self.manager.set_setpoint(name, 0, 'none')
+
+    def restart_rig(self):
+        name = self.selected_rig()
+        if name:
+            self.manager.restart(name)
+
+    def remove_rig(self):
+        name = self.selected_rig()
+        if name:
+            self.manager.remove(name)
+
+    def add_rig(self):
+        port = self.port_comboBox.currentText().strip()
+        if not port:
+            QMessageBox.warning(self, "Warning", "Please select a port.")
+            return
+        number = len(self.manager.rigs) + 1
+        while f"rig{number}" in self.manager.rigs:
+            number += 1
+        self.manager.add(Rig(f"rig{number}", port, **self.rig_settings))
+
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        # Stops every motor and closes the ports
+        self.manager.stop()
+        super(RigDashboard, self).closeEvent(event)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dashboard for several motor rigs")
+    add_arguments(parser)
+    parser.add_argument('--refresh-rate', type=float, default=4.0, help="table refresh rate in Hz")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    # Rigs added from the dashboard get the same settings as the command line ones
+    settings = rig_settings(args)
+    manager = RigManager()
+    for rig in build_rigs(args.rigs, settings):
+        manager.add(rig)
+    manager.start()
+    dashboard = RigDashboard(manager, settings, refresh_rate=args.refresh_rate)
+    dashboard.show()
+    sys.exit(app.exec())
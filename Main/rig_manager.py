@@ -0,0 +1,541 @@
+"""Drive many motor rigs at once from one asyncio event loop.
+
+    python rig_manager.py COM3 COM4:120 COM5 --controller PID --setpoint 80
+
+Every rig has its own pipeline (reader, parser, controller, command writer,
+recorder and statistics), but they all run as callbacks and tasks on a
+single event loop: adding a rig adds no OS thread. Ports are read when the
+loop reports them readable (add_reader); where the loop cannot watch a
+serial port (Windows), each rig polls its port from a task instead.
+Commands are written without blocking (PortOutput), so a stalled port
+only holds up its own rig. rig_dashboard.py shows all rigs in one window.
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+import serial
+
+from acquisition import control_command
+from calibration import Calibration, load_calibration, CALIBRATION_PATH
+from command_writer import CommandWriter
+from control_loop import SampleTrigger
+from controllers import make_controller, CONTROLLERS
+from recorder import Recorder, RECORD_DTYPE, to_records, EXTENSION as RECORDING_EXTENSION
+from serial_reader import SerialReader
+from telemetry import BatchParser
+
+POLL_INTERVAL = 0.005       # Seconds between reads when the port cannot be watched
+RATE_WINDOW = 2.0           # Seconds over which the sample rate is measured
+RATE_INTERVAL = 0.5         # Seconds between sample rate updates
+CLOSE_TIMEOUT = 0.5         # Seconds the final commands may take when a rig stops
+
+
+class PortOutput:
+    """Non-blocking writes to a serial port, for a CommandWriter on an event loop.
+
+    write() sends what the port takes right away and keeps the rest. With
+    `watch` the loop reports when the port can take more (add_writer) and
+    the rest goes out from there; otherwise the owner retries with flush()
+    (the rig's poll task). Once everything is out, on_drained() is called
+    so the CommandWriter can write the commands it held back (and coalesced)
+    meanwhile. A failed write in the background goes to on_error(exception).
+    """
+
+    def __init__(self, port, loop, watch, on_drained, on_error):
+        self.port = port
+        self.loop = loop
+        self.fd = port.fileno() if watch else None
+        self.on_drained = on_drained
+        self.on_error = on_error
+        self.pending = bytearray()
+        self._watching = False
+
+    def write(self, data):
+        """Called by CommandWriter; raises if the port fails."""
+        self.pending += data
+        self._send()
+        return len(data)
+
+    def flush(self):
+        """Send more of what is left (loop callback or poll task)."""
+        try:
+            self._send()
+        except Exception as e:
+            self.on_error(e)
+            return
+        if not self.pending:
+            self.on_drained()
+
+    def close(self):
+        """Stop watching the port and give what is left CLOSE_TIMEOUT to go out."""
+        self._watch(False)
+        if self.pending:
+            try:
+                self.port.write_timeout = CLOSE_TIMEOUT
+                self.port.write(bytes(self.pending))
+            except Exception:
+                pass  # The port is being released anyway
+            self.pending.clear()
+
+    def _send(self):
+        while self.pending:
+            written = self._write_some(self.pending)
+            if not written:
+                break
+            del self.pending[:written]
+        self._watch(bool(self.pending))
+
+    def _write_some(self, data):
+        if self.fd is None:
+            # write_timeout=0: returns what the driver accepted without waiting
+            return self.port.write(bytes(data))
+        # pyserial retries EAGAIN in a loop even without a write timeout; go to the fd directly
+        try:
+            return os.write(self.fd, data)
+        except BlockingIOError:
+            return 0
+
+    def _watch(self, enabled):
+        if self.fd is None or enabled == self._watching:
+            return
+        if enabled:
+            self.loop.add_writer(self.fd, self.flush)
+        else:
+            self.loop.remove_writer(self.fd)
+        self._watching = enabled
+
+
+class Rig:
+    """One motor: serial port, telemetry parser, controller, recorder and statistics.
+
+    All methods run on the manager's event loop, except status(), which
+    returns a snapshot that any thread may read.
+    """
+
+    def __init__(self, name, port_name, controller='none', setpoint=0, Kp=1.0, Ki=0.1, Kd=0.05, direction=0,
+                 interval=None, control_rate=20.0, sample_triggered=False, binary_mode=False,
+                 calibration=None, record_dir='recordings'):
+        self.name = name
+        self.port_name = port_name
+        self.controller_type = controller
+        self.setpoint = setpoint
+        self.gains = (Kp, Ki, Kd)
+        self.direction = direction
+        self.interval = interval
+        self.control_period = 1.0 / control_rate
+        self.sample_triggered = sample_triggered
+        self.binary_mode = binary_mode
+        self.calibration = calibration or Calibration.linear(0.01)
+        self.record_dir = record_dir
+
+        self.state = 'stopped'
+        self.error = None
+        self.port = None
+        self.controller = None
+        self.rpm_setpoint = 0
+        self.command_pwm = 0
+        self.latest_speed = None
+        self.latest_current = None
+        self.last_control_output = 0
+        self._tasks = []
+        self._watching = False
+        self.sample_rate = 0.0      # Samples/s over the last RATE_WINDOW, updated on the loop
+
+        # Counters
+        self.samples = 0
+        self.control_ticks = 0
+        self.missed_deadlines = 0
+        self.last_dt = 0.0
+        self.max_lateness = 0.0
+
+    def start(self, loop):
+        """Open the port and start the rig's pipeline on the running loop."""
+        self.error = None
+        try:
+            self.port = serial.Serial(self.port_name, 115200, timeout=0, write_timeout=0)
+        except Exception as e:
+            self.fail(f"Failed to open port: {e}")
+            return
+        self.reader = SerialReader(self.port, read_timeout=0, binary_mode=self.binary_mode)
+        self.parser = BatchParser(on_text=self.handle_replies)
+        self.sample_trigger = SampleTrigger(self.step_on_samples)
+        path = os.path.join(self.record_dir, f"{self.name}_" + time.strftime("session_%Y%m%d_%H%M%S")
+                            + RECORDING_EXTENSION)
+        self.recorder = Recorder(path, dtype=RECORD_DTYPE, metadata={'rig': self.name, 'port': self.port_name})
+        self.recorder.start(background=False)
+        self.state = 'running'
+
+        try:
+            loop.add_reader(self.port.fileno(), self.read)
+            self._watching = True
+        except (NotImplementedError, AttributeError, OSError, ValueError):
+            self._tasks.append(loop.create_task(self._poll()))
+        self.output = PortOutput(self.port, loop, self._watching, self.write_commands, self.write_failed)
+        self.writer = CommandWriter(self.output, on_error=self.write_failed)
+        if not self.sample_triggered:
+            self._tasks.append(loop.create_task(self._control_loop()))
+        self._tasks.append(loop.create_task(self._measure_rate()))
+
+        # Same start-up sequence as the GUI buttons; the setpoint is the feedforward command
+        self.send(f'd,{self.direction}', force=True)
+        if self.interval is not None:
+            self.send(f'i,{self.interval}', force=True)
+        if self.binary_mode:
+            self.send('b,1', force=True)
+        self.send('a,1', force=True)
+        self.set_setpoint(self.setpoint)
+
+    def stop(self):
+        """Stop the motor and streaming, then release the port and the recording."""
+        if self.port is None:
+            return
+        if self.state == 'running':
+            self.controller = None
+            self.send('s,0', force=True)
+            self.send('a,0')
+        self._release()
+        if self.state == 'running':
+            self.state = 'stopped'
+
+    def fail(self, message):
+        self.state = 'error'
+        self.error = message
+        self._release()
+
+    def _release(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._watching:
+            asyncio.get_running_loop().remove_reader(self.port.fileno())
+            self._watching = False
+        if self.port is not None:
+            self.recorder.stop()
+            self.output.close()
+            self.port.close()
+            self.port = None
+        self.sample_rate = 0.0
+
+    def set_setpoint(self, setpoint, controller_type=None):
+        """New PWM setpoint (and controller); the controller starts from zero state."""
+        self.setpoint = setpoint
+        if controller_type is not None:
+            self.controller_type = controller_type
+        if self.port is None:
+            return  # Applied when the rig starts
+        self.rpm_setpoint = self.calibration.pwm_to_rpm(setpoint, self.direction)
+        self.controller = make_controller(self.controller_type, *self.gains, self.rpm_setpoint)
+        self.sample_trigger.reset()
+        self.send(f's,{setpoint}', force=True)
+
+    def send(self, command, force=False):
+        if self.port is None:
+            return
+        self.writer.send(command, force)
+        if command.startswith('s,'):
+            self.command_pwm = int(command[2:])
+        elif command.startswith('d,'):
+            self.direction = int(command[2:])
+        elif command.startswith('b,'):
+            self.reader.set_binary_mode(command == 'b,1')
+        self.write_commands()
+
+    def write_commands(self):
+        """Hand queued commands to the port, unless it is still busy with earlier ones.
+
+        While the port is busy, speed commands stay in the CommandWriter, where
+        newer ones replace older ones; they go out once the port has drained.
+        """
+        if self.port is not None and not self.output.pending:
+            self.writer.write_pending()
+
+    def write_failed(self, error):
+        self.fail(f"Failed to send command: {error}")
+
+    # --- telemetry ---
+
+    def read(self):
+        """Loop callback: the port has data."""
+        try:
+            batch = self.reader.read_batch()
+        except Exception as e:
+            self.fail(f"Lost the serial port: {e}")
+            return
+        if batch is not None:
+            self.handle_batch(batch, time.perf_counter())
+
+    async def _poll(self):
+        while self.port is not None:
+            self.read()
+            if self.port is not None and self.output.pending:
+                self.output.flush()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def handle_batch(self, batch, arrival_time):
+        samples = self.parser.parse(batch, arrival_time)
+        if len(samples) == 0:
+            return
+        if self.recorder.error is None:
+            try:
+                self.recorder.write(to_records(samples, self.command_pwm))
+            except Exception as e:
+                # The motor keeps running under control; the error shows in the status
+                self.error = str(e)
+        self.samples += len(samples)
+        self.latest_speed = float(samples['speed'][-1])
+        self.latest_current = float(samples['current'][-1])
+        if self.sample_triggered and self.controller is not None:
+            self.sample_trigger.feed(samples['timestamp'], samples['speed'])
+
+    def handle_replies(self, lines, arrival_time):
+        for line in lines:
+            self.writer.on_reply(line, arrival_time)
+
+    # --- control ---
+
+    async def _control_loop(self):
+        """Fixed-rate control on absolute deadlines, like ControlLoop but as a task."""
+        loop = asyncio.get_running_loop()
+        last_tick = loop.time()
+        deadline = last_tick + self.control_period
+        while True:
+            await asyncio.sleep(deadline - loop.time())
+            now = loop.time()
+            self.max_lateness = max(self.max_lateness, now - deadline)
+            self.last_dt = now - last_tick
+            last_tick = now
+            self.control_ticks += 1
+            if self.controller is not None and self.latest_speed is not None:
+                self.control(self.latest_speed, self.last_dt)
+
+            deadline += self.control_period
+            behind = loop.time() - deadline
+            if behind > 0:
+                missed = int(behind // self.control_period) + 1
+                self.missed_deadlines += missed
+                deadline += missed * self.control_period
+
+    def step_on_samples(self, dts, speeds):
+        self.control_ticks += len(dts)
+        self.last_dt = float(dts[-1])
+        self.control(speeds, dts)
+
+    def control(self, current_speed, dt):
+        try:
+            control_output = control_command(self.controller, self.calibration, self.rpm_setpoint,
+                                             self.direction, current_speed, dt)
+        except Exception as e:
+            self.controller = None
+            self.error = f"Controller computation failed: {e}; controller disabled"
+            return
+        self.last_control_output = control_output
+        self.send(f"s,{control_output}")
+
+    # --- statistics ---
+
+    async def _measure_rate(self):
+        """Publish the sample rate as a plain float, so status() only reads it."""
+        marks = deque([(time.monotonic(), self.samples)])
+        self.sample_rate = 0.0
+        while True:
+            await asyncio.sleep(RATE_INTERVAL)
+            now = time.monotonic()
+            marks.append((now, self.samples))
+            while len(marks) > 2 and now - marks[0][0] > RATE_WINDOW:
+                marks.popleft()
+            (first_time, first_samples), (last_time, last_samples) = marks[0], marks[-1]
+            self.sample_rate = (last_samples - first_samples) / (last_time - first_time)
+
+    def status(self):
+        """Snapshot for the dashboard (any thread)."""
+        writer = getattr(self, 'writer', None)
+        recorder = getattr(self, 'recorder', None)
+        return {
+            'name': self.name,
+            'port': self.port_name,
+            'state': self.state,
+            'error': self.error,
+            'controller': self.controller_type if self.controller is not None else 'none',
+            'setpoint': self.setpoint,
+            'pwm': self.command_pwm,
+            'speed': self.latest_speed,
+            'current': self.latest_current,
+            'samples': self.samples,
+            'sample_rate': self.sample_rate,
+            'malformed_lines': self.parser.malformed_lines if hasattr(self, 'parser') else 0,
+            'control_ticks': self.control_ticks,
+            'missed_deadlines': self.missed_deadlines,
+            'last_dt': self.last_dt,
+            'max_lateness': self.max_lateness,
+            'commands': writer.status() if writer is not None else None,
+            'recording': recorder.path if recorder is not None else None,
+        }
+
+
+class RigManager:
+    """Owns the event loop and the rigs on it.
+
+    start() runs the loop on one background thread for all rigs; the other
+    methods may be called from any thread (the GUI) and are handed to the
+    loop with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self.rigs = {}
+        self.loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._stop = None
+
+    def start(self):
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="RigManager", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    async def run(self):
+        """Serve the rigs until stop(); usable directly with asyncio.run()."""
+        self.loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        for rig in self.rigs.values():
+            rig.start(self.loop)
+        self._ready.set()
+        try:
+            await self._stop.wait()
+        finally:
+            for rig in self.rigs.values():
+                rig.stop()
+            # Let the final commands reach the ports
+            await asyncio.sleep(0)
+
+    def stop(self, timeout=3.0):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _call(self, function, *args):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(function, *args)
+
+    def add(self, rig):
+        """Add a rig; started at once if the loop is running."""
+        if rig.name in self.rigs:
+            raise ValueError(f"Rig {rig.name} already exists")
+        self.rigs[rig.name] = rig
+        self._call(rig.start, self.loop)
+
+    def remove(self, name):
+        rig = self.rigs.pop(name)
+        self._call(rig.stop)
+
+    def restart(self, name):
+        rig = self.rigs[name]
+        self._call(lambda: (rig.stop(), rig.start(self.loop)))
+
+    def send(self, name, command):
+        """A command from the user to one rig (always sent)."""
+        self._call(self.rigs[name].send, command, True)
+
+    def set_setpoint(self, name, setpoint, controller_type=None):
+        self._call(self.rigs[name].set_setpoint, setpoint, controller_type)
+
+    def snapshot(self):
+        return [rig.status() for rig in list(self.rigs.values())]
+
+
+def parse_rig(spec):
+    """'PORT' or 'PORT:SETPOINT' (the last ':' separates the setpoint) -> (port, setpoint or None)."""
+    port, _, setpoint = spec.rpartition(':')
+    if port and setpoint.isdigit():
+        return port, int(setpoint)
+    return spec, None
+
+
+def format_table(statuses):
+    lines = [f"{'rig':<10} {'state':<8} {'ctrl':<5} {'set':>4} {'pwm':>4} {'speed':>9} {'current':>8} "
+             f"{'rate/s':>7} {'late ms':>8} {'reply ms':>8}"]
+    for status in statuses:
+        speed = status['speed'] if status['speed'] is not None else float('nan')
+        current = status['current'] if status['current'] is not None else float('nan')
+        reply = status['commands']['last_latency'] * 1000 if status['commands'] else float('nan')
+        lines.append(f"{status['name']:<10} {status['state']:<8} {status['controller']:<5} "
+                     f"{status['setpoint']:>4} {status['pwm']:>4} {speed:>9.1f} {current:>8.2f} "
+                     f"{status['sample_rate']:>7.1f} {status['max_lateness'] * 1000:>8.1f} {reply:>8.1f}"
+                     + (f"  {status['error']}" if status['error'] else ""))
+    return '\n'.join(lines)
+
+
+def rig_settings(args):
+    """Rig keyword arguments from the command line options (all but name and port)."""
+    calibration = (load_calibration(args.calibration) if os.path.exists(args.calibration)
+                   else Calibration.linear(0.01))
+    return {'controller': args.controller, 'setpoint': args.setpoint, 'Kp': args.kp, 'Ki': args.ki, 'Kd': args.kd,
+            'interval': args.interval, 'control_rate': args.control_rate, 'sample_triggered': args.sample_triggered,
+            'binary_mode': args.binary, 'calibration': calibration, 'record_dir': args.record_dir}
+
+
+def build_rigs(specs, settings):
+    """Rigs named rig1, rig2, ... for 'PORT[:SETPOINT]' specs, sharing the other settings."""
+    rigs = []
+    for number, spec in enumerate(specs, 1):
+        port, setpoint = parse_rig(spec)
+        options = dict(settings)
+        if setpoint is not None:
+            options['setpoint'] = setpoint
+        rigs.append(Rig(f"rig{number}", port, **options))
+    return rigs
+
+
+def add_arguments(parser):
+    """Command line options shared by rig_manager.py and rig_dashboard.py."""
+    parser.add_argument('rigs', nargs='*', help="serial ports, optionally with a PWM setpoint: PORT[:SETPOINT]")
+    parser.add_argument('--controller', choices=CONTROLLERS, default='none')
+    parser.add_argument('--setpoint', type=int, default=0, help="PWM setpoint (0-255) for rigs without one")
+    parser.add_argument('--kp', type=float, default=1.0)
+    parser.add_argument('--ki', type=float, default=0.1)
+    parser.add_argument('--kd', type=float, default=0.05)
+    parser.add_argument('--interval', type=int, default=None, help="firmware sampling interval in ms")
+    parser.add_argument('--control-rate', type=float, default=20.0, help="controller update rate in Hz")
+    parser.add_argument('--sample-triggered', action='store_true',
+                        help="run one controller step per received sample instead of at --control-rate")
+    parser.add_argument('--binary', action='store_true', help="binary telemetry frames instead of ASCII lines")
+    parser.add_argument('--record-dir', default='recordings', help="directory for the streamed recordings")
+    parser.add_argument('--calibration', default=CALIBRATION_PATH, help="PWM <-> RPM calibration file")
+
+
+async def print_stats(manager, stats_interval, duration):
+    start = time.monotonic()
+    while duration is None or time.monotonic() - start < duration:
+        await asyncio.sleep(stats_interval)
+        print(format_table(manager.snapshot()) + '\n', flush=True)
+    manager.stop()
+
+
+async def main(args):
+    manager = RigManager()
+    for rig in build_rigs(args.rigs, rig_settings(args)):
+        manager.add(rig)
+    stats = asyncio.create_task(print_stats(manager, args.stats_interval, args.duration))
+    try:
+        await manager.run()
+    finally:
+        stats.cancel()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Drive several motor rigs from one event loop")
+    add_arguments(parser)
+    parser.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    parser.add_argument('--stats-interval', type=float, default=1.0, help="seconds between status tables")
+    args = parser.parse_args()
+    if not args.rigs:
+        parser.error("at least one port is required")
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size history of samples with a write index.
+
+    Storage is preallocated once. Every sample is written twice, at `index` and
+    at `index + capacity`, so the last `capacity` samples in time order are always
+    one contiguous slice. view() can therefore hand that slice to the plots
+    without copying or rolling anything.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(2 * self.capacity, dtype=self.dtype)
+        self.index = 0     # Position of the oldest sample / next write
+        self.count = 0     # Number of valid samples (saturates at capacity)
+        self.total = 0     # Number of samples ever appended
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        """Add a single sample."""
+        self._data[self.index] = value
+        self._data[self.index + self.capacity] = value
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+
+    def extend(self, values):
+        """Add a batch of samples with at most four slice assignments."""
+        values = np.asarray(values, dtype=self.dtype).reshape(-1)
+        n = len(values)
+        if n == 0:
+            return
+        self.total += n
+
+        # Only the newest `capacity` samples can survive
+        if n > self.capacity:
+            values = values[-self.capacity:]
+            n = self.capacity
+
+        start = self.index
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = values[:first]
+        self._data[start + self.capacity:start + self.capacity + first] = values[:first]
+
+        rest = n - first
+        if rest:
+            self._data[:rest] = values[first:]
+            self._data[self.capacity:self.capacity + rest] = values[first:]
+
+        self.index = (start + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def view(self):
+        """Whole window in time order (oldest first), unfilled slots are zero. No copy."""
+        return self._data[self.index:self.index + self.capacity]
+
+    def valid(self):
+        """Only the samples written so far, in time order. No copy."""
+        return self.view()[self.capacity - self.count:]
+
+    def latest(self, default=None):
+        """Most recent sample in O(1), or `default` if nothing was appended yet."""
+        if self.count == 0:
+            return default
+        return self._data[self.index + self.capacity - 1]
+
+    def clear(self):
+        self._data[:] = 0
+        self.index = 0
+        self.count = 0
+        self.total = 0
@@ -0,0 +1,83 @@
+from telemetry import FrameDecoder
+
+
+class LineSplitter:
+    """Reassembles newline-terminated text lines from arbitrary chunks of bytes."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def reset(self):
+        self.buffer.clear()
+
+    def feed(self, data):
+        """Append raw bytes and return every complete, non-empty line (stripped)."""
+        self.buffer += data
+        end = self.buffer.rfind(b'\n')
+        if end < 0:
+            return []
+        complete = bytes(self.buffer[:end])
+        del self.buffer[:end + 1]
+        lines = complete.decode('utf-8', errors='replace').split('\n')
+        return [line.strip() for line in lines if line.strip()]
+
+
+class SerialReader:
+    """Bulk reader for the telemetry stream of lab1.ino.
+
+    Instead of polling in_waiting and sleeping, each read blocks on the port for
+    at most `read_timeout` seconds and then takes every byte that is already
+    available. Complete ASCII lines or binary frames are split out of persistent
+    reassembly buffers and handed over as one batch per read: a list of strings
+    in ASCII mode, a FRAME_DTYPE array in binary mode.
+    """
+
+    def __init__(self, port, read_timeout=0.02, binary_mode=False):
+        self.port = port
+        self.port.timeout = read_timeout
+        self.lines = LineSplitter()
+        self.frames = FrameDecoder()
+
+        # Requested by the GUI thread, applied by the reader thread
+        self.binary_mode = binary_mode
+        self._active_binary_mode = binary_mode
+
+        # Counters
+        self.bytes_read = 0
+        self.reads = 0
+
+    def set_binary_mode(self, enabled):
+        """Switch between ASCII lines and binary frames (takes effect on the next read)."""
+        self.binary_mode = enabled
+
+    def read_batch(self):
+        """Block for up to one read timeout and return the decoded batch, or None."""
+        # Wait for the first byte, then take everything else that has arrived
+        chunk = self.port.read(self.port.in_waiting or 1)
+        if not chunk:
+            return None
+        waiting = self.port.in_waiting
+        if waiting:
+            # The rest of a burst that woke an idle port
+            chunk += self.port.read(waiting)
+        self.bytes_read += len(chunk)
+        self.reads += 1
+
+        if self.binary_mode != self._active_binary_mode:
+            # Partial data from the previous format is meaningless now
+            self._active_binary_mode = self.binary_mode
+            self.lines.reset()
+            self.frames.reset()
+
+        if self._active_binary_mode:
+            frames = self.frames.feed(chunk)
+            return frames if len(frames) else None
+        lines = self.lines.feed(chunk)
+        return lines or None
+
+    def run(self, keep_running, on_batch):
+        """Read until keep_running() turns False, passing each batch to on_batch."""
+        while keep_running():
+            batch = self.read_batch()
+            if batch is not None:
+                on_batch(batch)
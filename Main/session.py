@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from recorder import open_records, read_header
+from telemetry import as_samples
+
+
+class Session:
+    """A recorded run, memory-mapped with np.memmap.
+
+    Opening a session reads only the header. Slicing `records` (or calling
+    between()) pages in just the part of the file that is touched, so
+    multi-gigabyte runs can be browsed and replayed without loading them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.metadata, self.dtype, self.offset = read_header(path)
+        self.records = open_records(path)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def name(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    @property
+    def duration(self):
+        if len(self.records) < 2:
+            return 0.0
+        return float(self.records['timestamp'][-1] - self.records['timestamp'][0])
+
+    def between(self, start, stop):
+        """Records with start <= timestamp - first timestamp < stop (a view, no copy)."""
+        timestamps = self.records['timestamp']
+        if len(timestamps) == 0:
+            return self.records
+        first = timestamps[0]
+        i, j = np.searchsorted(timestamps, [first + start, first + stop])
+        return self.records[i:j]
+
+
+def open_session(path):
+    return Session(path)
+
+
+class Replayer:
+    """Feeds a recorded session back into the live pipeline on its own thread.
+
+    on_batch(samples) receives SAMPLE_DTYPE arrays, just like the telemetry
+    worker's queue receives reader batches. With speed=1.0 the samples come out
+    at their recorded pace, speed=N runs N times faster and speed=None runs as
+    fast as the consumer accepts them. Gaps longer than max_gap seconds and
+    jumps back in time (e.g. a switch between ASCII and binary time bases) are
+    not waited out.
+    """
+
+    def __init__(self, session, on_batch, speed=1.0, max_gap=1.0, chunk_size=4096, tick=0.01):
+        self.session = session
+        self.on_batch = on_batch
+        self.speed = speed
+        self.max_gap = max_gap
+        self.chunk_size = chunk_size
+        self.tick = tick
+        self.position = 0
+        self.finished = False
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def progress(self):
+        return self.position / len(self.session) if len(self.session) else 1.0
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="Replayer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        records = self.session.records
+        timestamps = records['timestamp']
+        count = len(records)
+
+        clock = time.perf_counter
+        start_clock = clock()
+        base = timestamps[0] if count else 0.0
+
+        while self.position < count and not self._stop_event.is_set():
+            index = self.position
+            if self.speed is None:
+                end = min(index + self.chunk_size, count)
+            else:
+                due = base + (clock() - start_clock) * self.speed
+                ahead = timestamps[index] - due
+                behind_previous = index > 0 and timestamps[index] < timestamps[index - 1]
+                if ahead > self.max_gap or behind_previous:
+                    # Do not wait out long pauses or time base jumps: make this sample due now
+                    base += ahead
+                    due = timestamps[index]
+                elif ahead > 0:
+                    self._stop_event.wait(min(ahead / self.speed, self.tick))
+                    continue
+                end = index + int(np.searchsorted(timestamps[index:index + self.chunk_size], due, side='right'))
+                end = max(end, index + 1)
+
+            self.on_batch(as_samples(records[index:end]))
+            self.position = end
+
+        self.finished = True
@@ -0,0 +1,90 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from recorder import RECORD_DTYPE
+
+HEADER_SIZE = 64    # Bytes before the records: written count and capacity (int64), padding
+
+
+class SharedRing:
+    """Ring buffer of records in multiprocessing.shared_memory: one writer process, any number of readers.
+
+    The header holds `written`, the total number of records ever written,
+    which doubles as the sequence counter. The writer stores the records
+    first and advances `written` afterwards. A reader copies the range it
+    wants and then reads `written` again; records the writer may have
+    overwritten meanwhile (index < written - capacity) are dropped and
+    counted as lost. Readers never block the writer.
+
+    Create with a capacity in the owning process and attach elsewhere with
+    the segment's name (and the same dtype).
+    """
+
+    def __init__(self, capacity=None, dtype=RECORD_DTYPE, name=None):
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * self.dtype.itemsize)
+        else:
+            try:
+                # Attached segments belong to the owner (Python 3.13+)
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = shared_memory.SharedMemory(name=name)
+        self.header = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self.header[:] = (0, capacity)
+        self.capacity = int(self.header[1])
+        self.records = np.ndarray((self.capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=HEADER_SIZE)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def written(self):
+        return int(self.header[0])
+
+    def write(self, records):
+        """Append records (writer process only)."""
+        written = self.written
+        count = len(records)
+        if count > self.capacity:
+            # Only the newest capacity records can be kept
+            written += count - self.capacity
+            records = records[-self.capacity:]
+            count = self.capacity
+        start = written % self.capacity
+        first = min(count, self.capacity - start)
+        self.records[start:start + first] = records[:first]
+        self.records[:count - first] = records[first:]
+        self.header[0] = written + count
+
+    def read_since(self, sequence):
+        """Copy of the records written after `sequence`: returns (records, new sequence, lost count)."""
+        end = self.written
+        start = max(sequence, end - self.capacity)
+        lost = start - sequence
+        indices = np.arange(start, end) % self.capacity
+        records = self.records[indices]
+
+        # Anything the writer got to while we were copying is not trustworthy
+        overwritten = self.written - self.capacity - start
+        if overwritten > 0:
+            records = records[overwritten:]
+            lost += overwritten
+        return records, end, lost
+
+    def latest(self, count):
+        """Copy of the newest `count` records (fewer if not written yet)."""
+        written = self.written
+        records, _, _ = self.read_since(max(0, written - count))
+        return records
+
+    def close(self):
+        # The array views must go before the mapping can be closed
+        self.header = self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
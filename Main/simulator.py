@@ -0,0 +1,157 @@
+import numpy as np
+
+from calibration import Calibration
+
+
+class SimulationResult:
+    """Closed-loop responses of many scenarios: arrays of shape (scenarios, steps)."""
+
+    def __init__(self, t, speed, measured, pwm, target):
+        self.t = t                  # Time of each step in seconds, shape (steps,)
+        self.speed = speed          # True motor speed in RPM
+        self.measured = measured    # Speed the controller saw (delayed), in RPM
+        self.pwm = pwm              # Command sent to the motor (0-255)
+        self.target = target        # Target speed in RPM per scenario, shape (scenarios,)
+
+    def metrics(self, settle_band=0.02):
+        return step_metrics(self.t, self.speed, self.target, settle_band)
+
+
+def simulate(Kp, Ki=0.0, Kd=0.0, setpoint=100, duration=5.0, dt=0.05, gain=100.0, tau=0.15,
+             deadband=10, delay=1, rpm_to_pwm_scale=0.01, initial_speed=0.0, calibration=None):
+    """Simulate the GUI's speed loop for every combination of the given parameters.
+
+    The controller is the same law as P_Controller / PI_Controller /
+    PID_Controller (P: Ki = Kd = 0, PI: Kd = 0), applied the way
+    MyMainWindow.compute_control_output does: the setpoint in PWM is turned
+    into an RPM target with rpm_to_pwm_scale, the RPM correction is scaled back
+    to PWM and added to the setpoint, truncated to int, clipped to 0-255 and
+    kept at 10 if it would stop a running motor. With a calibration table
+    ({'pwm': [...], 'rpm': [...]}, see Calibration.table()) the setpoint and
+    the corrected target go through the measured mapping instead, as
+    acquisition.control_command does.
+
+    The plant is a first-order DC motor (gain RPM per PWM step, time constant
+    tau, no motion below deadband). The controller sees the speed at the end of
+    the previous control period, `delay` further periods late.
+
+    Any argument may be an array; all are broadcast together and every element
+    is one scenario. The time loop runs once for all scenarios, so thousands of
+    gain sets cost about as much as one Python loop over the time steps.
+    """
+    params = np.broadcast_arrays(*[np.atleast_1d(np.asarray(value, dtype=np.float64)) for value in
+                                   (Kp, Ki, Kd, setpoint, gain, tau, deadband, rpm_to_pwm_scale, initial_speed)])
+    Kp, Ki, Kd, setpoint, gain, tau, deadband, scale, initial_speed = [param.ravel() for param in params]
+
+    steps = int(round(duration / dt))
+    count = len(Kp)
+    delay = int(delay)
+
+    if calibration is not None:
+        calibration = Calibration(calibration['pwm'], {0: calibration['rpm']})
+        target = calibration.pwm_to_rpm(setpoint) * np.ones(count)    # Controller setpoint in RPM
+    else:
+        target = setpoint / scale
+    alpha = 1.0 - np.exp(-dt / tau)             # Exact first-order discretization
+
+    speed = np.empty((count, steps))
+    measured = np.empty((count, steps))
+    pwm = np.empty((count, steps))
+
+    state = initial_speed.copy()
+    integral = np.zeros(count)
+    previous_error = np.zeros(count)
+    # Measurements in flight: the controller reads history[0]
+    history = np.repeat(state[:, None], delay + 1, axis=1)
+
+    for k in range(steps):
+        seen = history[:, 0]
+
+        # Controller (same arithmetic as the controller classes)
+        error = target - seen
+        integral += error * dt
+        correction = Kp * error + Ki * integral + Kd * (error - previous_error) / dt
+        previous_error = error
+
+        # compute_control_output: back to PWM, int(), clip, do not stop a running motor
+        if calibration is not None:
+            command = np.clip(np.trunc(calibration.rpm_to_pwm(target + correction)), 0, 255)
+        else:
+            command = np.clip(np.trunc(setpoint + correction * scale), 0, 255)
+        command[(command == 0) & (seen > 5)] = 10
+
+        # Plant
+        drive = np.where(command > deadband, command, 0.0)
+        state = state + (gain * drive - state) * alpha
+
+        speed[:, k] = state
+        measured[:, k] = seen
+        pwm[:, k] = command
+
+        history[:, :-1] = history[:, 1:]
+        history[:, -1] = state
+
+    t = np.arange(1, steps + 1) * dt
+    return SimulationResult(t, speed, measured, pwm, target)
+
+
+def step_metrics(t, y, target, settle_band=0.02):
+    """Step-response metrics for each row of y (responses to a step at t = 0).
+
+    rise_time      10% -> 90% of target, in seconds (inf if never reached)
+    overshoot      peak above target, in percent of target
+    settling_time  time after which y stays within settle_band of target
+                   (inf if it is still outside at the end)
+    iae            integral of |target - y| dt
+    steady_state_error  target - y at the last step
+    """
+    y = np.atleast_2d(y)
+    target = np.broadcast_to(np.asarray(target, dtype=np.float64), (y.shape[0],))[:, None]
+    dt = np.diff(t, prepend=0.0)
+
+    def first_time(mask):
+        reached = mask.any(axis=1)
+        return np.where(reached, t[mask.argmax(axis=1)], np.inf)
+
+    reach_90 = first_time(y >= 0.9 * target)
+    rise_time = np.where(np.isinf(reach_90), np.inf, reach_90 - first_time(y >= 0.1 * target))
+
+    overshoot = np.maximum(0.0, (y.max(axis=1) - target[:, 0]) / np.abs(target[:, 0]) * 100.0)
+
+    outside = np.abs(y - target) > settle_band * np.abs(target)
+    # Index of the last step outside the band; the response settles one step later
+    last_outside = y.shape[1] - 1 - outside[:, ::-1].argmax(axis=1)
+    settling_time = np.where(~outside.any(axis=1), 0.0,
+                             np.where(outside[:, -1], np.inf, t[np.minimum(last_outside + 1, len(t) - 1)]))
+
+    iae = (np.abs(target - y) * dt).sum(axis=1)
+    steady_state_error = target[:, 0] - y[:, -1]
+
+    return {
+        'rise_time': rise_time,
+        'overshoot': overshoot,
+        'settling_time': settling_time,
+        'iae': iae,
+        'steady_state_error': steady_state_error,
+    }
+
+
+def simulate_controller(controller, setpoint=100, duration=5.0, dt=0.05, gain=100.0,
+                        tau=0.15, deadband=10, delay=1, rpm_to_pwm_scale=0.01):
+    """Reference loop driving one real P/PI/PID_Controller instance (slow, for checking simulate())."""
+    steps = int(round(duration / dt))
+    alpha = 1.0 - np.exp(-dt / tau)
+    state = 0.0
+    history = [0.0] * (delay + 1)
+    speed = np.empty(steps)
+    for k in range(steps):
+        seen = history[0]
+        correction = controller.step(seen, dt)
+        command = max(0, min(255, int(setpoint + correction * rpm_to_pwm_scale)))
+        if command == 0 and seen > 5:
+            command = 10
+        drive = command if command > deadband else 0
+        state += (gain * drive - state) * alpha
+        speed[k] = state
+        history = history[1:] + [state]
+    return np.arange(1, steps + 1) * dt, speed
@@ -0,0 +1,76 @@
+"""Startup timing for lab0_main.py.
+
+    python lab0_main.py --startup-report
+
+prints each startup phase as it is reached (milliseconds since lab0_main.py
+began importing) and, once the window is up, the slowest imports in the
+format of `python -X importtime`: self and cumulative time in microseconds.
+Imports can only be timed if enable() runs before them, so lab0_main.py
+checks sys.argv for the flag before its other imports.
+"""
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+
+_start = time.perf_counter()
+_enabled = False
+_original_import = None
+_stack = []         # Time spent in nested imports, one entry per import in progress
+_imports = []       # (depth, name, self seconds, cumulative seconds), in completion order
+
+
+def enable():
+    """Time every import on the main thread from now on and print marks."""
+    global _enabled, _original_import
+    if _enabled:
+        return
+    _enabled = True
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if threading.current_thread() is not threading.main_thread():
+        return _original_import(name, globals, locals, fromlist, level)
+    loaded = len(sys.modules)
+    _stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        if len(sys.modules) != loaded:
+            # Only imports that actually loaded something
+            _imports.append((len(_stack), _module_name(name, globals, level), elapsed - nested, elapsed))
+
+
+def _module_name(name, globals, level):
+    """Absolute name for the report; `from . import x` is reported as the package."""
+    if level:
+        try:
+            return importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+        except (ImportError, ValueError):
+            return '.' * level + name
+    return name
+
+
+def mark(label):
+    """Note that a startup phase was reached (printed if enabled)."""
+    if _enabled:
+        print(f"startup: {(time.perf_counter() - _start) * 1000:8.1f} ms  {label}", flush=True)
+
+
+def report(limit=30):
+    """The slowest top-level and nested imports so far, like -X importtime."""
+    slowest = sorted(_imports, key=lambda entry: entry[3], reverse=True)[:limit]
+    lines = ["import time: self [us] | cumulative | imported package"]
+    for depth, name, own, cumulative in slowest:
+        lines.append(f"import time: {own * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {'  ' * depth}{name}")
+    total = sum(entry[3] for entry in _imports if entry[0] == 0)
+    lines.append(f"import time: {len(_imports)} imports, {total * 1000:.1f} ms at top level")
+    return '\n'.join(lines)
@@ -0,0 +1,34 @@
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QFontDatabase
+from PySide6.QtWidgets import QLabel, QPlainTextEdit, QVBoxLayout, QWidget
+
+
+class StatsPanel(QWidget):
+    """Window with the current pipeline metrics (metrics.Registry), refreshed once per second."""
+
+    def __init__(self, registry, endpoint=None, refresh_interval=1000, parent=None):
+        super(StatsPanel, self).__init__(parent)
+        self.registry = registry
+        self.setWindowTitle("Pipeline statistics")
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.text)
+        if endpoint:
+            layout.addWidget(QLabel(f"Prometheus endpoint: {endpoint}"))
+        self.resize(900, 520)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(refresh_interval)
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible() and self.text.toPlainText():
+            return
+        scroll = self.text.verticalScrollBar().value()
+        self.text.setPlainText(self.registry.table())
+        self.text.verticalScrollBar().setValue(scroll)
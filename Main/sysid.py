@@ -0,0 +1,322 @@
+"""System identification: fit plant models to recorded runs.
+
+    python sysid.py recordings/session_*.dcmrec --kind fopdt
+
+Recordings made by the GUI store the commanded PWM next to every sample
+(recorder.RECORD_DTYPE), so any run with speed changes can be used. Each run
+is fitted, the fit quality is printed and the model is saved next to the
+recording as <name>.model.json. load_model(path).plant(dt) gives the
+parameters simulator.simulate() and autotune.autotune() take.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from session import open_session
+
+MODEL_EXTENSION = '.model.json'
+KINDS = ('fopdt', 'sopdt', 'arx')
+
+
+class PlantModel:
+    """A fitted discrete-time model y[k] = sum a_i y[k-i] + sum b_j u[k-1-delay-j] + c.
+
+    y is the speed in RPM, u the commanded PWM and one step is dt seconds.
+    FOPDT and SOPDT are the na = 1 and na = 2 cases with a single b.
+    """
+
+    def __init__(self, kind, dt, a, b, delay, c=0.0, fit=None, source=None):
+        self.kind = kind
+        self.dt = float(dt)
+        self.a = np.asarray(a, dtype=np.float64)
+        self.b = np.asarray(b, dtype=np.float64)
+        self.delay = int(delay)     # Dead time in steps
+        self.c = float(c)           # Constant term (friction / deadband)
+        self.fit = fit or {}
+        self.source = source
+
+    @property
+    def gain(self):
+        """Steady-state RPM per PWM step."""
+        return float(self.b.sum() / (1.0 - self.a.sum()))
+
+    @property
+    def offset(self):
+        """Steady-state RPM at zero PWM (negative: the motor needs some PWM to start)."""
+        return float(self.c / (1.0 - self.a.sum()))
+
+    @property
+    def poles(self):
+        return np.roots(np.concatenate(([1.0], -self.a)))
+
+    @property
+    def stable(self):
+        return bool(np.all(np.abs(self.poles) < 1.0))
+
+    @property
+    def time_constants(self):
+        """Continuous-time constants of the poles in seconds (complex for oscillating modes)."""
+        return -self.dt / np.log(self.poles.astype(complex))
+
+    @property
+    def tau(self):
+        """Sum of the time constants: the first-order lag with the same mean response time."""
+        return float(np.real(self.time_constants.sum()))
+
+    @property
+    def dead_time(self):
+        return self.delay * self.dt
+
+    @property
+    def deadband(self):
+        """PWM below which the fitted steady state is at or below zero speed."""
+        if self.gain <= 0 or self.offset >= 0:
+            return 0.0
+        return -self.offset / self.gain
+
+    def plant(self, dt=0.05):
+        """First-order plant parameters for simulator.simulate() / autotune() at control period dt."""
+        return {
+            'gain': self.gain,
+            'tau': self.tau,
+            'deadband': self.deadband,
+            'delay': int(round(self.dead_time / dt)),
+            'dt': dt,
+        }
+
+    def simulate(self, u, y_init):
+        """Free-run speed for the PWM sequence u, starting from the outputs y_init."""
+        return simulate_arx(self.a, self.b, self.delay, self.c, u, y_init)
+
+    def report(self):
+        lines = [f"{self.kind.upper()} model, dt {self.dt * 1000:.1f} ms" + (f" ({self.source})" if self.source else ""),
+                 f"  gain {self.gain:.4g} RPM/PWM, tau {self.tau:.4g} s, dead time {self.dead_time:.4g} s, "
+                 f"deadband {self.deadband:.3g} PWM"]
+        if self.fit:
+            lines.append(f"  fit {self.fit['fit_percent']:.1f} %, one-step R2 {self.fit['r2']:.4f}, "
+                         f"RMSE {self.fit['rmse']:.4g} RPM, {self.fit['samples']} samples"
+                         + ("" if self.stable else ", UNSTABLE"))
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return {
+            'kind': self.kind, 'dt': self.dt, 'a': self.a.tolist(), 'b': self.b.tolist(),
+            'delay': self.delay, 'c': self.c, 'fit': self.fit, 'source': self.source,
+            # Derived values, for reading the file by eye
+            'gain': self.gain, 'tau': self.tau, 'dead_time': self.dead_time, 'deadband': self.deadband,
+        }
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+
+def load_model(path):
+    with open(path) as file:
+        data = json.load(file)
+    return PlantModel(data['kind'], data['dt'], data['a'], data['b'], data['delay'], data['c'],
+                      data.get('fit'), data.get('source'))
+
+
+def resample(t, u, y, dt=None):
+    """Put a run on a uniform time grid: the speed is interpolated, the PWM command is held.
+
+    If the time stamps jump back (e.g. a switch between ASCII and binary time
+    bases), the longest increasing stretch is used. Returns (t, u, y, dt).
+    """
+    t = np.asarray(t, dtype=np.float64)
+    breaks = np.flatnonzero(np.diff(t) <= 0) + 1
+    edges = np.concatenate(([0], breaks, [len(t)]))
+    longest = int(np.argmax(np.diff(edges)))
+    part = slice(edges[longest], edges[longest + 1])
+    t, u, y = t[part], np.asarray(u, dtype=np.float64)[part], np.asarray(y, dtype=np.float64)[part]
+    if len(t) < 2:
+        raise ValueError("Not enough samples to identify a model")
+
+    if dt is None:
+        dt = float(np.median(np.diff(t)))
+    grid = np.arange(t[0], t[-1], dt)
+    # The tolerance keeps grid points that land a rounding error before a sample on that sample
+    held = np.searchsorted(t, grid + dt * 1e-6, side='right') - 1
+    return grid, u[held], np.interp(grid, t, y), dt
+
+
+def _lagged_gram(u, y, na, lags, offset, start, chunk_size=65536):
+    """Normal equations for the regressor holding every lag any candidate delay needs.
+
+    Columns: y[k-1] .. y[k-na], u[k-1] .. u[k-lags], then 1 if offset. Rows are
+    k = start .. len(y)-1. The data is processed in chunks, so only
+    chunk_size x columns values are in memory at once.
+    Returns (Z^T Z, Z^T y, y^T y, sum y, rows).
+    """
+    columns = na + lags + (1 if offset else 0)
+    gram = np.zeros((columns, columns))
+    cross = np.zeros(columns)
+    yy = total = 0.0
+    for k0 in range(start, len(y), chunk_size):
+        k1 = min(k0 + chunk_size, len(y))
+        parts = [y[k0 - i:k1 - i] for i in range(1, na + 1)] + [u[k0 - m:k1 - m] for m in range(1, lags + 1)]
+        if offset:
+            parts.append(np.ones(k1 - k0))
+        z = np.stack(parts, axis=1)
+        target = y[k0:k1]
+        gram += z.T @ z
+        cross += z.T @ target
+        yy += target @ target
+        total += target.sum()
+    return gram, cross, yy, total, len(y) - start
+
+
+def fit_arx(t, u, y, na=2, nb=2, max_dead_time=1.0, offset=True, dt=None, kind='arx'):
+    """Least-squares ARX fit with the dead time chosen by the smallest residual.
+
+    The normal equations are accumulated once for all lags; every candidate
+    delay (0 .. max_dead_time) is then a small sub-system of them, and all
+    are solved together. Cost is one pass over the data whatever the length
+    of the log. Returns a PlantModel with its fit quality.
+    """
+    t, u, y, dt = resample(t, u, y, dt)
+    if np.ptp(u) == 0:
+        raise ValueError("The PWM command never changes in this run; nothing to identify")
+
+    max_delay = max(0, int(round(max_dead_time / dt)))
+    lags = max_delay + nb
+    start = max(na, lags)
+    if len(y) <= start + na + nb + 1:
+        raise ValueError("Run too short for this model order and dead time")
+    gram, cross, yy, total, rows = _lagged_gram(u, y, na, lags, offset, start)
+
+    # Column indices of each candidate delay's regressor
+    delays = np.arange(max_delay + 1)
+    index = np.concatenate([np.broadcast_to(np.arange(na), (len(delays), na)),
+                            na + delays[:, None] + np.arange(nb)], axis=1)
+    if offset:
+        index = np.concatenate([index, np.full((len(delays), 1), gram.shape[0] - 1)], axis=1)
+    sub_gram = gram[index[:, :, None], index[:, None, :]]
+    sub_cross = cross[index]
+    theta = np.einsum('dij,dj->di', np.linalg.pinv(sub_gram), sub_cross)
+    sse = yy - 2 * np.einsum('di,di->d', theta, sub_cross) + np.einsum('di,dij,dj->d', theta, sub_gram, theta)
+
+    best = int(np.argmin(sse))
+    coefficients = theta[best]
+    model = PlantModel(kind, dt, coefficients[:na], coefficients[na:na + nb], delays[best],
+                       coefficients[-1] if offset else 0.0)
+
+    # Fit quality: one-step-ahead R2 and a free-run simulation from the first outputs
+    variance = yy - total * total / rows
+    with np.errstate(over='ignore', invalid='ignore'):
+        simulated = model.simulate(u, y[:start])
+        error = np.linalg.norm(y[start:] - simulated[start:])
+    spread = np.linalg.norm(y[start:] - y[start:].mean())
+    fit_percent = 100.0 * (1.0 - error / spread) if np.isfinite(error) else -np.inf
+    model.fit = {
+        'fit_percent': float(fit_percent),
+        'r2': float(1.0 - max(sse[best], 0.0) / variance),
+        'rmse': float(error / np.sqrt(len(y) - start)),
+        'samples': int(len(y)),
+    }
+    return model
+
+
+def fit_fopdt(t, u, y, **options):
+    """First order plus dead time: y[k] = a y[k-1] + b u[k-1-delay] + c."""
+    return fit_arx(t, u, y, na=1, nb=1, kind='fopdt', **options)
+
+
+def fit_sopdt(t, u, y, **options):
+    """Second order plus dead time: y[k] = a1 y[k-1] + a2 y[k-2] + b u[k-1-delay] + c."""
+    return fit_arx(t, u, y, na=2, nb=1, kind='sopdt', **options)
+
+
+def simulate_arx(a, b, delay, c, u, y_init, block=256):
+    """Free-run output of y[k] = sum a_i y[k-i] + sum b_j u[k-1-delay-j] + c.
+
+    y_init holds the first outputs (at least len(a) and delay + len(b)). The
+    recursion is evaluated block by block: inside a block the response is a
+    matrix product with the model's impulse response, and only the block
+    boundaries are stepped in Python, so long runs stay fast.
+    """
+    a = np.atleast_1d(np.asarray(a, dtype=np.float64))
+    b = np.atleast_1d(np.asarray(b, dtype=np.float64))
+    u = np.asarray(u, dtype=np.float64)
+    y_init = np.asarray(y_init, dtype=np.float64)
+    na, n, start = len(a), len(u), len(y_init)
+    block = max(block, na)
+
+    # Input part of each step
+    drive = np.full(n, float(c))
+    for j, coefficient in enumerate(b):
+        lag = 1 + delay + j
+        drive[lag:] += coefficient * u[:n - lag]
+    drive = drive[start:]
+    blocks = -(-len(drive) // block)
+    drive = np.concatenate((drive, np.zeros(blocks * block - len(drive)))).reshape(blocks, block)
+
+    # Companion form: state = (y[k], y[k-1], ..., y[k-na+1])
+    companion = np.zeros((na, na))
+    companion[0] = a
+    companion[1:, :-1] = np.eye(na - 1)
+    impulse = np.empty(block)
+    free = np.empty((block, na))
+    power = np.eye(na)
+    for i in range(block):
+        impulse[i] = power[0, 0]
+        power = companion @ power
+        free[i] = power[0]
+    lag_matrix = np.subtract.outer(np.arange(block), np.arange(block))
+    toeplitz = np.where(lag_matrix >= 0, impulse[np.maximum(lag_matrix, 0)], 0.0)
+
+    forced = drive @ toeplitz.T
+    out = np.empty((blocks, block))
+    state = y_init[::-1][:na]
+    for i in range(blocks):
+        out[i] = forced[i] + free @ state
+        state = out[i, ::-1][:na]
+    return np.concatenate((y_init, out.ravel()))[:n]
+
+
+def identify(path, kind='fopdt', **options):
+    """Fit a model to a recording that has the commanded PWM (see recorder.RECORD_DTYPE)."""
+    session = open_session(path)
+    if 'pwm' not in session.records.dtype.names:
+        raise ValueError(f"{path} has no commanded PWM; record it with the current GUI")
+    records = session.records
+    if kind == 'fopdt':
+        model = fit_fopdt(records['timestamp'], records['pwm'], records['speed'], **options)
+    elif kind == 'sopdt':
+        model = fit_sopdt(records['timestamp'], records['pwm'], records['speed'], **options)
+    elif kind == 'arx':
+        model = fit_arx(records['timestamp'], records['pwm'], records['speed'], **options)
+    else:
+        raise ValueError(f"Unknown model kind: {kind}")
+    model.source = os.path.basename(path)
+    return model
+
+
+def model_path(recording_path):
+    return os.path.splitext(recording_path)[0] + MODEL_EXTENSION
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fit plant models to recorded runs")
+    parser.add_argument('recordings', nargs='+', help="recording files (.dcmrec)")
+    parser.add_argument('--kind', choices=KINDS, default='fopdt')
+    parser.add_argument('--na', type=int, default=2, help="ARX output order")
+    parser.add_argument('--nb', type=int, default=2, help="ARX input order")
+    parser.add_argument('--max-dead-time', type=float, default=1.0, help="longest dead time tried, in seconds")
+    parser.add_argument('--dt', type=float, default=None, help="resampling period (default: median sample period)")
+    args = parser.parse_args()
+
+    options = {'max_dead_time': args.max_dead_time, 'dt': args.dt}
+    if args.kind == 'arx':
+        options.update(na=args.na, nb=args.nb)
+    for path in args.recordings:
+        try:
+            model = identify(path, args.kind, **options)
+        except ValueError as e:
+            print(f"{path}: {e}")
+            continue
+        model.save(model_path(path))
+        print(model.report())
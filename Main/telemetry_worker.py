@@ -0,0 +1,93 @@
+import threading
+import time
+from queue import Empty
+
+import numpy as np
+
+from telemetry import BatchParser
+
+
+class TelemetryWorker:
+    """Turns raw reader batches into typed sample arrays on its own thread.
+
+    The queue holds (batch, arrival_time) items as produced by the serial
+    reader: a list of ASCII lines or an array of binary frames (or already
+    parsed samples from a replay). Everything that is waiting is drained and
+    parsed together by a telemetry.BatchParser, and on_samples(samples) is called
+    once with a single SAMPLE_DTYPE array, so string handling and buffer updates
+    never run on the GUI thread. Text lines that are not samples (firmware
+    replies) go to on_text(lines, arrival_time) if it is given. With a
+    metrics.Registry, the time to parse and hand on each batch is recorded.
+    """
+
+    def __init__(self, data_queue, on_samples, poll_timeout=0.1, on_text=None, metrics=None):
+        self.data_queue = data_queue
+        self.on_samples = on_samples
+        self.parser = BatchParser(on_text)
+        self.poll_timeout = poll_timeout
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # Counters
+        self.batches = 0
+        self.samples = 0
+        self.errors = 0             # Exceptions raised by on_samples
+
+        self.parse_histogram = self.handle_histogram = None
+        if metrics is not None:
+            self.parse_histogram = metrics.histogram('telemetry_parse_seconds', "Time to parse one drained batch")
+            self.handle_histogram = metrics.histogram('telemetry_handle_seconds',
+                                                      "Time to store parsed samples (buffers, recorder, controller)")
+            metrics.counter('telemetry_batches_total', "Reader batches parsed", lambda: self.batches)
+            metrics.counter('telemetry_samples_total', "Samples (lines or frames) parsed", lambda: self.samples)
+            metrics.counter('telemetry_malformed_lines_total', "Lines that were not valid samples",
+                            lambda: self.malformed_lines)
+            metrics.counter('telemetry_errors_total', "Errors while handling parsed samples", lambda: self.errors)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="TelemetryWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def malformed_lines(self):
+        return self.parser.malformed_lines
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                items = [self.data_queue.get(timeout=self.poll_timeout)]
+            except Empty:
+                continue
+
+            # Take everything else that piled up meanwhile and handle it as one batch
+            while True:
+                try:
+                    items.append(self.data_queue.get_nowait())
+                except Empty:
+                    break
+
+            start = time.perf_counter()
+            parsed = [self.parser.parse(batch, arrival_time) for batch, arrival_time in items]
+            samples = parsed[0] if len(parsed) == 1 else np.concatenate(parsed)
+            self.batches += len(items)
+            if len(samples) == 0:
+                continue
+            self.samples += len(samples)
+            parsed_time = time.perf_counter()
+            try:
+                self.on_samples(samples)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error in telemetry worker: {e}")
+            if self.parse_histogram is not None:
+                self.parse_histogram.observe(parsed_time - start)
+                self.handle_histogram.observe(time.perf_counter() - parsed_time)
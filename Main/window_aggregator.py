@@ -0,0 +1,71 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+METHODS = ('max', 'mean', 'median')
+
+# Plain and NaN-skipping reductions; the latter only while the window is still filling
+_REDUCE = {
+    'max': (np.max, np.nanmax),
+    'mean': (np.mean, np.nanmean),
+    'median': (np.median, np.nanmedian),
+}
+
+
+class WindowAggregator:
+    """Rolling max, mean or median over raw samples, computed on the host.
+
+    In raw mode ("w,1") lab1.ino sends every sample. This does what the
+    firmware does in windowed mode, but per batch and with a choice of
+    reduction: after every `step` samples, speed and current are reduced over
+    the last `window` samples. The last window - 1 samples are carried over
+    between batches, so the output does not depend on how the stream was
+    split into reads. Only the windows that produce an output are reduced,
+    as rows of one sliding_window_view, so a batch costs a few NumPy calls
+    however many samples it holds.
+
+    Until `window` samples have arrived the window is padded with NaN and
+    the reduction covers only the samples seen so far.
+    """
+
+    def __init__(self, window=50, step=10, method='max'):
+        if window < 1 or step < 1:
+            raise ValueError("window and step must be at least 1")
+        if method not in METHODS:
+            raise ValueError(f"Unknown aggregation {method!r}, expected one of {', '.join(METHODS)}")
+        self.window = int(window)
+        self.step = int(step)
+        self.method = method
+        self.reset()
+
+    def reset(self):
+        """Forget the carried-over samples (e.g. after reconnecting)."""
+        self._speed = np.full(self.window - 1, np.nan)
+        self._current = np.full(self.window - 1, np.nan)
+        self.count = 0      # Samples fed since the last reset
+
+    def feed(self, samples):
+        """Aggregate a SAMPLE_DTYPE batch; returns one sample per completed step (possibly none).
+
+        Each output sample keeps the timestamp and direction of the newest
+        sample in its window.
+        """
+        n = len(samples)
+        if n == 0:
+            return samples[:0]
+        speed = np.concatenate((self._speed, samples['speed']))
+        current = np.concatenate((self._current, samples['current']))
+        self._speed = speed[n:]
+        self._current = current[n:]
+
+        # Batch indices of the samples that complete a step
+        first = (self.step - 1 - self.count) % self.step
+        filling = self.count < self.window - 1
+        self.count += n
+        ends = np.arange(first, n, self.step)
+        out = samples[ends]     # Copy with the newest sample's timestamp and direction
+        if len(ends):
+            reduce = _REDUCE[self.method][filling]
+            # Window k of the view ends at speed[k + window - 1], i.e. at batch index k
+            out['speed'] = reduce(sliding_window_view(speed, self.window)[ends], axis=1)
+            out['current'] = reduce(sliding_window_view(current, self.window)[ends], axis=1)
+        return out